@@ -9,7 +9,10 @@ from __future__ import absolute_import
 
 import os
 
-from .core import compareAndReport, MyHTTPServer, CORSRequestHandler, plot_funnel
+from .core import compareAndReport, compareFiles, compare, Results
+from .core import FunnelEngine, Funnel, FunnelStream, EditableFunnel
+from .core import find_min_tolerance, compareBands, ReferenceProfile, allocation_stats
+from .core import MyHTTPServer, CORSRequestHandler, plot_funnel
 
 # Version.
 version_path = os.path.abspath(os.path.join(os.path.dirname(__file__), 'VERSION'))
@@ -8,7 +8,10 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 # Python standard library imports.
-from ctypes import cdll, POINTER, c_double, c_int, c_char_p
+from collections import namedtuple
+from ctypes import addressof, byref, cdll, POINTER, Structure, c_char
+from ctypes import c_double, c_int, c_char_p, c_size_t, c_ubyte, c_uint64, c_void_p
+import functools
 import io
 import numbers
 import os
@@ -26,11 +29,28 @@ except ImportError:
     HTTPServer = BaseHTTPServer.HTTPServer
     from SimpleHTTPServer import SimpleHTTPRequestHandler  # Python 2
 # Third-party module or package imports.
+import numpy as np
 import six
 # Code repository sub-package imports.
 
 
-__all__ = ['compareAndReport', 'MyHTTPServer', 'CORSRequestHandler', 'plot_funnel']
+__all__ = [
+    'compareAndReport',
+    'compareFiles',
+    'compare',
+    'Results',
+    'FunnelEngine',
+    'Funnel',
+    'FunnelStream',
+    'EditableFunnel',
+    'find_min_tolerance',
+    'compareBands',
+    'ReferenceProfile',
+    'allocation_stats',
+    'MyHTTPServer',
+    'CORSRequestHandler',
+    'plot_funnel',
+]
 
 
 #########################################
@@ -70,6 +90,16 @@ def read_config(config_path=CONFIG_PATH, config_default=CONFIG_DEFAULT):
 
 CONFIG = read_config()
 
+# Funnel library loaded at first call of _get_library.
+_LIBRARY = None
+_LIBRARY_LOCK = threading.Lock()
+# Context of the last library call by thread (see allocation_stats).
+_LAST_CONTEXT = threading.local()
+# Size of the message buffer of C struct context (CONTEXT_MESSAGE_SIZE).
+_CONTEXT_MESSAGE_SIZE = 4096
+# Minimum number of unsorted query values sorted before evaluating the funnel bounds.
+_QUERY_SORT_SIZE = 1024
+
 
 def save_config(config_path=CONFIG_PATH, config=CONFIG):
     """Save configuration variables in configuration file."""
@@ -177,6 +207,318 @@ def _get_lib_path(project_name):
     return os.path.abspath(lib_path)
 
 
+def _load_library():
+    """Load the funnel library and declare the prototypes of the exported functions.
+
+    Returns:
+        ctypes.CDLL: funnel library
+    """
+    try:
+        lib_path = _get_lib_path('funnel')
+        lib = cdll.LoadLibrary(lib_path)
+    except Exception as e:
+        raise RuntimeError(
+            "Could not load funnel library with this path: {}. {}".format(
+                lib_path, e))
+
+    # Map arguments.
+    lib.compareAndReport.argtypes = [
+        POINTER(c_double),
+        POINTER(c_double),
+        c_size_t,
+        POINTER(c_double),
+        POINTER(c_double),
+        c_size_t,
+        c_char_p,
+        c_double,
+        c_double,
+        c_double,
+        c_double,
+        c_double,
+        c_double]
+    lib.compareAndReport.restype = c_int
+
+    lib.compareInMemory.argtypes = [
+        POINTER(c_double),
+        POINTER(c_double),
+        c_size_t,
+        POINTER(c_double),
+        POINTER(c_double),
+        c_size_t,
+        c_double,
+        c_double,
+        c_double,
+        c_double,
+        c_double,
+        c_double,
+        POINTER(_Reports),
+        POINTER(_Context)]
+    lib.compareInMemory.restype = c_int
+
+    lib.compareIntoBuffers.argtypes = lib.compareInMemory.argtypes
+    lib.compareIntoBuffers.restype = c_int
+
+    lib.curveCapacity.argtypes = [c_size_t]
+    lib.curveCapacity.restype = c_size_t
+
+    lib.writeReports.argtypes = [
+        c_char_p,
+        POINTER(c_double),
+        POINTER(c_double),
+        c_size_t,
+        POINTER(c_double),
+        POINTER(c_double),
+        c_size_t,
+        POINTER(_Reports),
+        POINTER(_Context)]
+    lib.writeReports.restype = c_int
+
+    lib.freeReports.argtypes = [POINTER(_Reports)]
+    lib.freeReports.restype = None
+
+    lib.buildTube.argtypes = [
+        POINTER(c_double),
+        POINTER(c_double),
+        c_size_t,
+        c_double,
+        c_double,
+        c_double,
+        c_double,
+        c_double,
+        c_double,
+        POINTER(_Tube),
+        POINTER(_Context)]
+    lib.buildTube.restype = c_int
+
+    lib.buildReferenceProfile.argtypes = lib.buildTube.argtypes[:3] + [
+        POINTER(_ReferenceProfile),
+        POINTER(_Context)]
+    lib.buildReferenceProfile.restype = c_int
+
+    lib.buildTubeFromProfile.argtypes = lib.buildTube.argtypes[:3] + [
+        POINTER(_ReferenceProfile)] + lib.buildTube.argtypes[3:]
+    lib.buildTubeFromProfile.restype = c_int
+
+    lib.freeReferenceProfile.argtypes = [POINTER(_ReferenceProfile)]
+    lib.freeReferenceProfile.restype = None
+
+    lib.decimateReference.argtypes = lib.buildTube.argtypes[:9] + [
+        c_double,
+        POINTER(c_double),
+        POINTER(c_double),
+        POINTER(c_size_t),
+        POINTER(_Context)]
+    lib.decimateReference.restype = c_int
+
+    lib.simplifyCurve.argtypes = [POINTER(c_double), POINTER(c_double), c_size_t]
+    lib.simplifyCurve.restype = c_size_t
+
+    lib.validateTube.argtypes = [
+        POINTER(_Tube),
+        POINTER(c_double),
+        POINTER(c_double),
+        c_size_t,
+        POINTER(_ErrorReport),
+        POINTER(_Context)]
+    lib.validateTube.restype = c_int
+
+    lib.freeTube.argtypes = [POINTER(_Tube)]
+    lib.freeTube.restype = None
+
+    lib.summarizeTube.argtypes = lib.validateTube.argtypes[:4] + [
+        c_size_t,
+        POINTER(_ErrorSummary),
+        POINTER(_Context)]
+    lib.summarizeTube.restype = c_int
+
+    lib.validateTubeRange.argtypes = lib.validateTube.argtypes[:4] + [
+        c_double,
+        c_double,
+        POINTER(_ErrorReport),
+        POINTER(_ErrorSummary),
+        c_size_t,
+        POINTER(c_size_t),
+        POINTER(c_size_t),
+        POINTER(_Context)]
+    lib.validateTubeRange.restype = c_int
+
+    lib.boundsTube.argtypes = [
+        POINTER(_Tube),
+        POINTER(c_double),
+        c_size_t,
+        POINTER(c_double),
+        POINTER(c_double),
+        POINTER(_Context)]
+    lib.boundsTube.restype = c_int
+
+    lib.compareSummary.argtypes = lib.compareInMemory.argtypes[:12] + [
+        c_size_t,
+        POINTER(_ErrorSummary),
+        POINTER(_Context)]
+    lib.compareSummary.restype = c_int
+
+    lib.findMinTolerance.argtypes = lib.compareInMemory.argtypes[:12] + [
+        c_int,
+        c_double,
+        POINTER(c_double),
+        POINTER(_Context)]
+    lib.findMinTolerance.restype = c_int
+
+    lib.compareBands.argtypes = lib.compareInMemory.argtypes[:6] + [
+        POINTER(_Tolerances),
+        c_size_t,
+        POINTER(c_int),
+        POINTER(_ErrorSummary),
+        POINTER(_Context)]
+    lib.compareBands.restype = c_int
+
+    lib.initStream.argtypes = [POINTER(_Stream)]
+    lib.initStream.restype = None
+
+    lib.feedStream.argtypes = [
+        POINTER(_Tube),
+        POINTER(_Stream),
+        POINTER(c_double),
+        POINTER(c_double),
+        c_size_t,
+        POINTER(_ErrorReport),
+        c_char_p,
+        POINTER(_Context)]
+    lib.feedStream.restype = c_int
+
+    lib.compareFiles.argtypes = [
+        c_char_p,
+        c_char_p,
+        c_char_p,
+        c_double,
+        c_double,
+        c_double,
+        c_double,
+        c_double,
+        c_double,
+        c_size_t,
+        POINTER(_Context)]
+    lib.compareFiles.restype = c_int
+
+    lib.buildEditableTube.argtypes = lib.buildTube.argtypes[:9] + [
+        POINTER(_EditableTube),
+        POINTER(_Context)]
+    lib.buildEditableTube.restype = c_int
+
+    lib.updateTube.argtypes = [
+        POINTER(_EditableTube),
+        c_size_t,
+        c_size_t,
+        POINTER(c_double),
+        POINTER(c_double),
+        c_size_t,
+        POINTER(_Context)]
+    lib.updateTube.restype = c_int
+
+    lib.freeEditableTube.argtypes = [POINTER(_EditableTube)]
+    lib.freeEditableTube.restype = None
+
+    return lib
+
+
+def _get_library():
+    """Return the funnel library, loading it at first call only.
+
+    Returns:
+        ctypes.CDLL: funnel library
+    """
+    global _LIBRARY
+    with _LIBRARY_LOCK:
+        if _LIBRARY is None:
+            _LIBRARY = _load_library()
+    return _LIBRARY
+
+
+def _as_double_array(values, out=None):
+    """Convert list-like values into a 1-D C-contiguous array of float64.
+
+    Arrays, pandas Series and objects exposing the array interface or the buffer
+    protocol are used without copy if they already are C-contiguous float64 data.
+    Otherwise they are converted only once.
+
+    Args:
+        values (list-like of floats): values to convert
+        out (callable): if provided, out(n) returns a buffer of at least n float64
+            used to store the converted values
+
+    Returns:
+        numpy.ndarray: array of float64 (possibly sharing memory with values)
+    """
+    try:
+        arr = np.asarray(values)
+    except Exception as e:
+        raise TypeError("Input data could not be converted into arrays: {}".format(e))
+    if arr.ndim != 1:
+        raise TypeError("Input data must be one-dimensional, got shape {}.".format(arr.shape))
+    # Test numeric type.
+    if arr.dtype.kind not in 'biuf':
+        non_numeric = [v for v in arr if not isinstance(v, numbers.Real)]
+        if non_numeric:
+            raise TypeError("The following input values are not numeric: {}".format(non_numeric))
+    if out is None or (arr.dtype == np.float64 and arr.flags['C_CONTIGUOUS']):
+        return np.ascontiguousarray(arr, dtype=np.float64)
+    converted = out(len(arr))[:len(arr)]
+    converted[...] = arr
+    return converted
+
+
+def _check_arguments(xReference, yReference, xTest, yTest, tolerances, buffer=None):
+    """Check input data and tolerances.
+
+    Args:
+        xReference, yReference, xTest, yTest (list-like of floats): input data
+        tolerances (dict): tolerance values (or None) by tolerance name
+        buffer (callable): if provided, buffer(name, n) returns a buffer of at least
+            n float64 used to store the input data named name if they need a conversion
+
+    Returns:
+        tuple: input data converted into arrays of float64, dict of tolerances converted into floats
+    """
+    # Value
+    assert len(xReference) == len(yReference),\
+        "xReference and yReference must have the same length."
+    assert len(xTest) == len(yTest),\
+        "xTest and yTest must have the same length."
+
+    # Convert list-like objects into arrays (to support lists, np.array, pd.Series...).
+    data = tuple(
+        _as_double_array(v, out=None if buffer is None else functools.partial(buffer, k))
+        for k, v in zip(('xReference', 'yReference', 'xTest', 'yTest'),
+                        (xReference, yReference, xTest, yTest)))
+
+    return data, _check_tolerances(tolerances)
+
+
+def _check_tolerances(tolerances):
+    """Check tolerances.
+
+    Args:
+        tolerances (dict): tolerance values (or None) by tolerance name
+
+    Returns:
+        dict: tolerances converted into floats
+    """
+    # Convert None tolerance to 0.
+    tol = dict()
+    for k in ('atolx', 'atoly', 'ltolx', 'ltoly', 'rtolx', 'rtoly'):
+        if tolerances[k] is None:
+            tol[k] = 0.0
+        else:
+            try:
+                tol[k] = float(tolerances[k])
+            except BaseException:
+                raise TypeError("Tolerance {} could not be converted to float.".format(k))
+            if tol[k] < 0:
+                raise ValueError("Tolerance {} must be positive.".format(k))
+
+    return tol
+
+
 def compareAndReport(
     xReference,
     yReference,
@@ -188,12 +530,19 @@ def compareAndReport(
     ltolx=None,
     ltoly=None,
     rtolx=None,
-    rtoly=None
+    rtoly=None,
+    summary_only=False,
+    max_violations=None
 ):
     """Run funnel binary with list-like objects as x, y reference and test values.
 
     Output `errors.csv`, `lowerBound.csv`, `upperBound.csv`, `reference.csv`,
     `test.csv` into the output directory (`./results` by default).
+    With `summary_only=True`, no file is output and only the aggregated errors
+    are computed, without allocating any array for the test points.
+    With `max_violations=k`, the validation stops at the k-th violation and the
+    funnel is only built up to the x value where the validation stops: this is
+    the fastest way to get a pass/fail status.
 
     Args:
         xReference (list-like of floats): x reference values
@@ -207,115 +556,384 @@ def compareAndReport(
         ltoly (float): relative tolerance along y axis (relatively to the local value)
         rtolx (float): relative tolerance along x axis (relatively to the range)
         rtoly (float): relative tolerance along y axis (relatively to the range)
+        summary_only (bool): if True, return the aggregated errors instead of writing files
+        max_violations (int): if not None, stop at this number of violations
+            (implies `summary_only=True`)
 
     Returns:
-        None
+        int: status code of the library call, or if `summary_only` is True or `max_violations`
+            is not None,
+            dict: aggregated errors (see `Funnel.validate`), None if the library call fails
 
     Full documentation at https://github.com/lbl-srg/funnel.
     """
+    if summary_only or max_violations is not None:
+        max_violations = _check_max_violations(max_violations)
+        (xReference, yReference, xTest, yTest), tol = _check_arguments(
+            xReference, yReference, xTest, yTest, locals())
+        summary = _ErrorSummary()
+        ctx = _Context()
+        try:
+            _get_library().compareSummary(
+                xReference.ctypes.data_as(POINTER(c_double)),
+                yReference.ctypes.data_as(POINTER(c_double)),
+                len(xReference),
+                xTest.ctypes.data_as(POINTER(c_double)),
+                yTest.ctypes.data_as(POINTER(c_double)),
+                len(xTest),
+                tol['atolx'],
+                tol['atoly'],
+                tol['ltolx'],
+                tol['ltoly'],
+                tol['rtolx'],
+                tol['rtoly'],
+                max_violations,
+                byref(summary),
+                byref(ctx),
+            )
+        except Exception as e:
+            raise RuntimeError("Library call raises exception: {}.".format(e))
+        if ctx.status != 0:
+            print("*** Warning: {}".format(ctx.error_message()))
+            return None
+        return summary.as_dict(len(xTest))
 
     # Check arguments.
     # Type
     if outputDirectory is None:
-        print("Output directory not specified: results are stored in subdirectory `results` by default.")
+        print("Output directory not specified: "
+              "results are stored in subdirectory `results` by default.")
         outputDirectory = "results"
     assert isinstance(outputDirectory, six.string_types),\
         "Path of output directory is not a string type."
-    # Value
-    assert len(xReference) == len(yReference),\
-        "xReference and yReference must have the same length."
-    assert len(xTest) == len(yTest),\
-        "xTest and yTest must have the same length."
+    (xReference, yReference, xTest, yTest), tol = _check_arguments(
+        xReference, yReference, xTest, yTest, locals())
 
-    # Convert arrays into lists (to support np.array and pd.Series).
+    # Load library.
+    lib = _get_library()
+    reports = _Reports()
+    ctx = _Context()
+
+    # Run
     try:
-        xReference = list(xReference)
-        yReference = list(yReference)
-        xTest = list(xTest)
-        yTest = list(yTest)
+        retVal = lib.compareInMemory(
+            xReference.ctypes.data_as(POINTER(c_double)),
+            yReference.ctypes.data_as(POINTER(c_double)),
+            len(xReference),
+            xTest.ctypes.data_as(POINTER(c_double)),
+            yTest.ctypes.data_as(POINTER(c_double)),
+            len(xTest),
+            tol['atolx'],
+            tol['atoly'],
+            tol['ltolx'],
+            tol['ltoly'],
+            tol['rtolx'],
+            tol['rtoly'],
+            byref(reports),
+            byref(ctx),
+        )
+        if retVal == 0:
+            # Encode string arguments (in Python 3 c_char_p takes bytes object).
+            retVal = lib.writeReports(
+                outputDirectory.encode('utf-8'),
+                xReference.ctypes.data_as(POINTER(c_double)),
+                yReference.ctypes.data_as(POINTER(c_double)),
+                len(xReference),
+                xTest.ctypes.data_as(POINTER(c_double)),
+                yTest.ctypes.data_as(POINTER(c_double)),
+                len(xTest),
+                byref(reports),
+                byref(ctx),
+            )
+            lib.freeReports(byref(reports))
     except Exception as e:
-        raise TypeError("Input data could not be converted into lists: {}".format(e))
-    # Test numeric type.
-    all_data = xReference + yReference + xTest + yTest
-    num_check = [isinstance(x, numbers.Real) for x in all_data]
-    if not min(num_check):
-        idx = filter(lambda i: not num_check[i], range(len(num_check)))
-        raise TypeError("The following input values are not numeric: {}".format(
-            [all_data[i] for i in idx]
-        ))
+        raise RuntimeError("Library call raises exception: {}.".format(e))
+    if retVal != 0:
+        print("*** Warning: {}".format(ctx.error_message()))
 
-    # Convert None tolerance to 0.
-    tol = dict()
-    args = locals()
-    for k in ('atolx', 'atoly', 'ltolx', 'ltoly', 'rtolx', 'rtoly'):
-        if args[k] is None:
-            tol[k] = 0.0
-        else:
-            try:
-                tol[k] = float(args[k])
-            except BaseException:
-                raise TypeError("Tolerance {} could not be converted to float.".format(k))
-            if tol[k] < 0:
-                raise ValueError("Tolerance {} must be positive.".format(k))
+    return retVal
 
-    # Configure log file path.
-    log_path = os.path.join(outputDirectory, 'c_funnel.log')
 
-    # Encode string arguments (in Python 3 c_char_p takes bytes object).
-    outputDirectory = outputDirectory.encode('utf-8')
+def compareFiles(
+    referenceFile,
+    testFile,
+    outputDirectory=None,
+    atolx=None,
+    atoly=None,
+    ltolx=None,
+    ltoly=None,
+    rtolx=None,
+    rtoly=None,
+    chunk_size=100000
+):
+    """Run funnel binary with reference and test values read from CSV files chunk by chunk.
 
-    # Load library.
+    Same outputs as `compareAndReport`, for data which do not fit in memory: the files are read
+    by the library (not loaded in Python), the funnel is built over overlapping windows of
+    reference values and the outputs are written incrementally, so that the memory usage is set
+    by `chunk_size` rather than by the file size. If `ltoly` sets the funnel size at some points
+    or if the x values of the reference are not sorted, the funnel is built over all the
+    reference values at once, which are then held in memory.
+    The CSV files must have two columns (x, y): the lines which do not start with two numbers,
+    such as the header, are skipped.
+
+    Args:
+        referenceFile (str): path of CSV file with reference data
+        testFile (str): path of CSV file with test data
+        outputDirectory (str): path of directory to store output files
+        atolx, atoly, ltolx, ltoly, rtolx, rtoly (float): tolerances, see `compareAndReport`
+        chunk_size (int): number of points read at once from each file
+
+    Returns:
+        int: status code of the library call
+    """
+    if outputDirectory is None:
+        print("Output directory not specified: "
+              "results are stored in subdirectory `results` by default.")
+        outputDirectory = "results"
+    for path in (referenceFile, testFile, outputDirectory):
+        assert isinstance(path, six.string_types), "Path {} is not a string type.".format(path)
+    assert int(chunk_size) == chunk_size and chunk_size > 0,\
+        "chunk_size must be a positive integer."
+    tol = _check_tolerances(locals())
+    ctx = _Context()
     try:
-        lib_path = _get_lib_path('funnel')
-        lib = cdll.LoadLibrary(lib_path)
+        retVal = _get_library().compareFiles(
+            referenceFile.encode('utf-8'),
+            testFile.encode('utf-8'),
+            outputDirectory.encode('utf-8'),
+            tol['atolx'],
+            tol['atoly'],
+            tol['ltolx'],
+            tol['ltoly'],
+            tol['rtolx'],
+            tol['rtoly'],
+            int(chunk_size),
+            byref(ctx),
+        )
     except Exception as e:
-        raise RuntimeError(
-            "Could not load funnel library with this path: {}. {}".format(
-                lib_path, e))
+        raise RuntimeError("Library call raises exception: {}.".format(e))
+    if retVal != 0:
+        print("*** Warning: {}".format(ctx.error_message()))
 
-    # Map arguments.
-    lib.compareAndReport.argtypes = [
-        POINTER(c_double),
-        POINTER(c_double),
-        c_int,
-        POINTER(c_double),
-        POINTER(c_double),
-        c_int,
-        c_char_p,
-        c_double,
-        c_double,
-        c_double,
-        c_double,
-        c_double,
-        c_double]
-    lib.compareAndReport.restype = c_int
+    return retVal
+
+
+def compare(
+    xReference,
+    yReference,
+    xTest,
+    yTest,
+    atolx=None,
+    atoly=None,
+    ltolx=None,
+    ltoly=None,
+    rtolx=None,
+    rtoly=None
+):
+    """Run funnel binary and return the results in memory instead of writing files.
+
+    Args:
+        xReference (list-like of floats): x reference values
+        yReference (list-like of floats): y reference values
+        xTest (list-like of floats): x test values
+        yTest (list-like of floats): y test values
+        atolx (float): absolute tolerance along x axis
+        atoly (float): absolute tolerance along y axis
+        ltolx (float): relative tolerance along x axis (relatively to the local value)
+        ltoly (float): relative tolerance along y axis (relatively to the local value)
+        rtolx (float): relative tolerance along x axis (relatively to the range)
+        rtoly (float): relative tolerance along y axis (relatively to the range)
+
+    Returns:
+        Results: funnel curves and errors, see `Results.write` to output them into files
+
+    Full documentation at https://github.com/lbl-srg/funnel.
+    """
+    (xReference, yReference, xTest, yTest), tol = _check_arguments(
+        xReference, yReference, xTest, yTest, locals())
+
+    lib = _get_library()
+    reports = _Reports()
+    ctx = _Context()
 
-    # Run
     try:
-        retVal = lib.compareAndReport(
-            (c_double * len(xReference))(*xReference),
-            (c_double * len(yReference))(*yReference),
+        retVal = lib.compareInMemory(
+            xReference.ctypes.data_as(POINTER(c_double)),
+            yReference.ctypes.data_as(POINTER(c_double)),
             len(xReference),
-            (c_double * len(xTest))(*xTest),
-            (c_double * len(yTest))(*yTest),
+            xTest.ctypes.data_as(POINTER(c_double)),
+            yTest.ctypes.data_as(POINTER(c_double)),
             len(xTest),
-            outputDirectory,
             tol['atolx'],
             tol['atoly'],
             tol['ltolx'],
             tol['ltoly'],
             tol['rtolx'],
             tol['rtoly'],
+            byref(reports),
+            byref(ctx),
         )
     except Exception as e:
         raise RuntimeError("Library call raises exception: {}.".format(e))
     if retVal != 0:
-        with open(log_path) as f:
-            c_stream = f.read()
-        print("*** Warning: funnel binary status code is: {}.\n{}".format(retVal, c_stream))
-    os.unlink(log_path)
+        raise RuntimeError(ctx.error_message())
 
-    return retVal
+    owner = _LibraryData(lib.freeReports, reports)
+    return Results(
+        (xReference, yReference),
+        (xTest, yTest),
+        *(owner.as_data(d) for d in (
+            reports.lower, reports.upper, reports.errors.diff, reports.errors.original)))
+
+
+def compareBands(xReference, yReference, xTest, yTest, bands):
+    """Grade test values with several tolerance bands in a single pass.
+
+    The funnels of all the bands are built with the data characteristics of the reference
+    computed once, and each test value is compared with all the funnels in a single pass
+    over the test values.
+
+    Args:
+        xReference (list-like of floats): x reference values
+        yReference (list-like of floats): y reference values
+        xTest (list-like of floats): x test values
+        yTest (list-like of floats): y test values
+        bands (list of dict): tolerances of each band by tolerance name (see `compare`),
+            ordered from the narrowest to the widest band, e.g. `[dict(atoly=0.1), dict(atoly=0.5)]`
+            for the "ok" and "warning" bands
+
+    Returns:
+        tuple: numpy.ndarray of int holding for each test value the index of the first band
+        containing it (`len(bands)` if the value is outside all the bands), and
+        list of dict holding the aggregated errors of each band (see `Funnel.validate`)
+    """
+    names = ('atolx', 'atoly', 'ltolx', 'ltoly', 'rtolx', 'rtoly')
+    assert len(bands) > 0, "At least one tolerance band is required."
+    tolerances = (_Tolerances * len(bands))()
+    for i, band in enumerate(bands):
+        unknown = set(band) - set(names)
+        assert not unknown, "Invalid tolerance names: {}.".format(sorted(unknown))
+        tol = dict.fromkeys(names)
+        tol.update(band)
+        tol = _check_tolerances(tol)
+        for k in names:
+            setattr(tolerances[i], k, tol[k])
+    (xReference, yReference, xTest, yTest), _ = _check_arguments(
+        xReference, yReference, xTest, yTest, dict.fromkeys(names))
+
+    lib = _get_library()
+    n = len(xTest)
+    band_index = np.empty(n, dtype=np.intc)
+    summaries = (_ErrorSummary * len(bands))()
+    ctx = _Context()
+    try:
+        retVal = lib.compareBands(
+            xReference.ctypes.data_as(POINTER(c_double)),
+            yReference.ctypes.data_as(POINTER(c_double)),
+            len(xReference),
+            xTest.ctypes.data_as(POINTER(c_double)),
+            yTest.ctypes.data_as(POINTER(c_double)),
+            n,
+            tolerances,
+            len(bands),
+            band_index.ctypes.data_as(POINTER(c_int)),
+            summaries,
+            byref(ctx),
+        )
+    except Exception as e:
+        raise RuntimeError("Library call raises exception: {}.".format(e))
+    if retVal != 0:
+        raise RuntimeError(ctx.error_message())
+    return band_index, [summary.as_dict(n) for summary in summaries]
+
+
+def find_min_tolerance(
+    xReference,
+    yReference,
+    xTest,
+    yTest,
+    axis='y',
+    kind='atol',
+    atolx=None,
+    atoly=None,
+    ltolx=None,
+    ltoly=None,
+    rtolx=None,
+    rtoly=None,
+    precision=1e-6
+):
+    """Find the smallest value of a tolerance for which the test values are inside the funnel.
+
+    The tolerance is found by bisection within the library, the other tolerances being fixed:
+    each iteration stops at the first violation, the data characteristics of the reference
+    are computed only once and no file is read or written.
+
+    Args:
+        xReference (list-like of floats): x reference values
+        yReference (list-like of floats): y reference values
+        xTest (list-like of floats): x test values
+        yTest (list-like of floats): y test values
+        axis (str): axis of the tolerance, 'x' or 'y'
+        kind (str): kind of the tolerance, 'atol', 'ltol' or 'rtol'
+        atolx, atoly, ltolx, ltoly, rtolx, rtoly (float): values of the other tolerances,
+            see `compare` (the value of the searched tolerance is ignored)
+        precision (float): relative precision of the tolerance value
+
+    Returns:
+        float: smallest tolerance value (within precision) for which the test passes
+    """
+    names = ['atolx', 'atoly', 'ltolx', 'ltoly', 'rtolx', 'rtoly']
+    assert kind + axis in names, "Invalid tolerance: axis must be 'x' or 'y' and kind 'atol', " \
+        "'ltol' or 'rtol'."
+    assert precision > 0, "precision must be positive."
+    (xReference, yReference, xTest, yTest), tol = _check_arguments(
+        xReference, yReference, xTest, yTest, locals())
+
+    lib = _get_library()
+    tolerance = c_double()
+    ctx = _Context()
+    try:
+        retVal = lib.findMinTolerance(
+            xReference.ctypes.data_as(POINTER(c_double)),
+            yReference.ctypes.data_as(POINTER(c_double)),
+            len(xReference),
+            xTest.ctypes.data_as(POINTER(c_double)),
+            yTest.ctypes.data_as(POINTER(c_double)),
+            len(xTest),
+            tol['atolx'],
+            tol['atoly'],
+            tol['ltolx'],
+            tol['ltoly'],
+            tol['rtolx'],
+            tol['rtoly'],
+            names.index(kind + axis),
+            float(precision),
+            byref(tolerance),
+            byref(ctx),
+        )
+    except Exception as e:
+        raise RuntimeError("Library call raises exception: {}.".format(e))
+    if retVal != 0:
+        raise RuntimeError(ctx.error_message())
+    return tolerance.value
+
+
+def allocation_stats():
+    """Return the allocation statistics of the last function of pyfunnel called by this thread.
+
+    The temporary arrays of a call to the library are allocated from an arena, which is
+    released in one step at the end of the call. Only the arrays returned by the library
+    (such as the curves of a funnel) are allocated separately.
+
+    Returns:
+        dict: `peak_bytes`, maximum size of the temporary memory allocated at the same time,
+            and `allocations`, number of temporary arrays (None if no function was called)
+    """
+    ctx = getattr(_LAST_CONTEXT, 'ctx', None)
+    if ctx is None:
+        return None
+    return dict(peak_bytes=ctx.arena.peakBytes, allocations=ctx.arena.allocations)
 
 
 #####################
@@ -323,6 +941,937 @@ def compareAndReport(
 #####################
 
 
+Data = namedtuple('Data', ['x', 'y'])
+
+
+class _Data(Structure):
+    """Mirror of C struct data."""
+    _fields_ = [
+        ('x', POINTER(c_double)),
+        ('y', POINTER(c_double)),
+        ('n', c_size_t),
+    ]
+
+
+class _ErrorReport(Structure):
+    """Mirror of C struct errorReport."""
+    _fields_ = [
+        ('original', _Data),
+        ('diff', _Data),
+    ]
+
+
+class _Reports(Structure):
+    """Mirror of C struct reports."""
+    _fields_ = [
+        ('lower', _Data),
+        ('upper', _Data),
+        ('errors', _ErrorReport),
+    ]
+
+
+class _Arena(Structure):
+    """Mirror of C struct arena: temporary arrays of a library call."""
+    _fields_ = [
+        ('block', c_void_p),
+        ('bytes', c_size_t),
+        ('peakBytes', c_size_t),
+        ('allocations', c_size_t),
+    ]
+
+
+class _Context(Structure):
+    """Mirror of C struct context: status code and error messages of a library call.
+
+    Each call uses its own context, so that the library can be called concurrently
+    from several threads (the GIL is released during the call).
+    The context created last by a thread is kept to report the allocation statistics
+    of the last library call (see `allocation_stats`).
+    """
+    _fields_ = [
+        ('status', c_int),
+        ('length', c_size_t),
+        ('message', c_char * _CONTEXT_MESSAGE_SIZE),
+        ('arena', _Arena),
+    ]
+
+    def __init__(self, *args, **kwargs):
+        super(_Context, self).__init__(*args, **kwargs)
+        _LAST_CONTEXT.ctx = self
+
+    def error_message(self):
+        """Return the status code and the error messages of the call."""
+        return "Funnel binary status code is: {}.\n{}".format(
+            self.status, self.message.decode('utf-8', 'replace'))
+
+
+def _as_c_data(data):
+    """Return a C struct data pointing to the arrays of data (without copy)."""
+    return _Data(
+        data.x.ctypes.data_as(POINTER(c_double)),
+        data.y.ctypes.data_as(POINTER(c_double)),
+        len(data.x))
+
+
+class _ErrorSummary(Structure):
+    """Mirror of C struct errorSummary."""
+    _fields_ = [
+        ('nPoints', c_size_t),
+        ('nViolations', c_size_t),
+        ('maxError', c_double),
+        ('integral', c_double),
+        ('lengthOutside', c_double),
+        ('fractionOutside', c_double),
+        ('firstX', c_double),
+        ('lastX', c_double),
+        ('lastError', c_double),
+        ('firstViolationX', c_double),
+    ]
+
+    def as_dict(self, n):
+        """Return the aggregated errors as a dict.
+
+        Args:
+            n (int): number of test points
+        """
+        return dict(
+            passed=self.nViolations == 0,
+            violations=self.nViolations,
+            max_error=self.maxError,
+            error_integral=self.integral,
+            fraction_outside=self.fractionOutside,
+            first_violation_x=None if self.nViolations == 0 else self.firstViolationX,
+            complete=self.nPoints == n)
+
+
+def _check_max_violations(max_violations):
+    """Return the maximum number of violations passed to the library (0 for no limit)."""
+    if max_violations is None:
+        return 0
+    assert int(max_violations) == max_violations and max_violations > 0,\
+        "max_violations must be a positive integer."
+    return int(max_violations)
+
+
+class _ZoneMap(Structure):
+    """Mirror of C struct zoneMap."""
+    _fields_ = [
+        ('x', POINTER(c_double)),
+        ('lower', POINTER(c_double)),
+        ('upper', POINTER(c_double)),
+        ('n', c_size_t),
+    ]
+
+
+class _Tube(Structure):
+    """Mirror of C struct tube."""
+    _fields_ = [
+        ('lower', _Data),
+        ('upper', _Data),
+        ('firstX', c_double),
+        ('lastX', c_double),
+        ('zones', _ZoneMap),
+    ]
+
+
+class _TubeCursor(Structure):
+    """Mirror of C struct tubeCursor."""
+    _fields_ = [
+        ('jLower', c_size_t),
+        ('jUpper', c_size_t),
+    ]
+
+
+class _Stream(Structure):
+    """Mirror of C struct stream."""
+    _fields_ = [
+        ('cursor', _TubeCursor),
+        ('summary', _ErrorSummary),
+    ]
+
+
+class _Tolerances(Structure):
+    """Mirror of C struct tolerances."""
+    _fields_ = [(k, c_double) for k in ('atolx', 'atoly', 'ltolx', 'ltoly', 'rtolx', 'rtoly')]
+
+
+class _DataChar(Structure):
+    """Mirror of C struct data_char."""
+    _fields_ = [(k, c_double) for k in ('range_x', 'range_y', 'mag_x', 'mag_y')]
+
+
+class _EditableTube(Structure):
+    """Mirror of C struct editableTube."""
+    _fields_ = [
+        ('tube', _Tube),
+        ('reference', _Data),
+        ('capReference', c_size_t),
+        ('capLower', c_size_t),
+        ('capUpper', c_size_t),
+        ('capZones', c_size_t),
+        ('tolerances', _Tolerances),
+        ('dat_char', _DataChar),
+        ('minY', c_double),
+        ('maxY', c_double),
+    ]
+
+
+class _ReferenceProfile(Structure):
+    """Mirror of C struct referenceProfile."""
+    _fields_ = [
+        ('hash', c_uint64),
+        ('nReference', c_size_t),
+        ('dat_char', _DataChar),
+        ('first', c_size_t),
+        ('firstSign', c_int),
+        ('lastSign', c_int),
+        ('corners', POINTER(c_size_t)),
+        ('kinds', POINTER(c_ubyte)),
+        ('nCorners', c_size_t),
+    ]
+
+
+def _copy_data(data):
+    """Return a copy of the arrays of a C struct data as NumPy arrays."""
+    if data.n == 0:
+        return Data(np.empty(0), np.empty(0))
+    return Data(*(np.ctypeslib.as_array(p, shape=(data.n,)).copy() for p in (data.x, data.y)))
+
+
+def _simplify_curve(lib, data):
+    """Remove in place the points of a funnel curve on the segment between their neighbors.
+
+    The points are removed up to the rounding errors of the interpolation, as for the curves
+    returned by `compare`: the interpolated curve is unchanged.
+
+    Returns:
+        Data: views of the arrays of data with the points left
+    """
+    n = lib.simplifyCurve(
+        data.x.ctypes.data_as(POINTER(c_double)),
+        data.y.ctypes.data_as(POINTER(c_double)),
+        len(data.x),
+    )
+    return Data(data.x[:n], data.y[:n])
+
+
+class _LibraryData(object):
+    """Owner of the arrays of a C struct allocated by the funnel library.
+
+    The arrays are released with the library function `free` when this object
+    is garbage collected, i.e., when no NumPy array created with `as_data` refers
+    to them anymore.
+    """
+
+    def __init__(self, free, struct):
+        self._free = free
+        self._struct = struct
+
+    def __del__(self):
+        try:
+            self._free(byref(self._struct))
+        except Exception:  # Library may be unloaded at interpreter shutdown.
+            pass
+
+    def as_data(self, data):
+        """Wrap C struct data into NumPy arrays keeping a reference to self."""
+        return Data(*(self._as_array(p, data.n) for p in (data.x, data.y)))
+
+    def _as_array(self, pointer, n):
+        if n == 0:
+            return np.empty(0, dtype=np.float64)
+        buffer = (c_double * n).from_address(addressof(pointer.contents))
+        buffer._owner = self  # The array base holds the buffer, which holds self.
+        return np.frombuffer(buffer, dtype=np.float64)
+
+
+class Results(object):
+    """Funnel curves and errors returned by `compare`.
+
+    With `compare`, the arrays are NumPy views on buffers allocated by the funnel library.
+    Those buffers are released when all the arrays referring to them are garbage collected.
+
+    Attributes:
+        reference (Data): x, y reference values
+        test (Data): x, y test values
+        lower (Data): x, y values of the lower bound of the funnel
+        upper (Data): x, y values of the upper bound of the funnel
+        errors (Data): x test values and errors (0 if the test value is inside the funnel)
+        violations (Data): x test values and errors for the test values outside the funnel
+    """
+
+    def __init__(self, reference, test, lower, upper, errors, violations):
+        self.reference = Data(*reference)
+        self.test = Data(*test)
+        self.lower = Data(*lower)
+        self.upper = Data(*upper)
+        self.errors = Data(*errors)
+        self.violations = Data(*violations)
+
+    def write(self, outputDirectory):
+        """Output `errors.csv`, `lowerBound.csv`, `upperBound.csv`, `reference.csv`,
+        `test.csv` into the output directory.
+
+        Args:
+            outputDirectory (str): path of directory to store output files
+        """
+        assert isinstance(outputDirectory, six.string_types),\
+            "Path of output directory is not a string type."
+        data = [Data(*(np.ascontiguousarray(v, dtype=np.float64) for v in d)) for d in (
+            self.reference, self.test, self.lower, self.upper, self.errors, self.violations)]
+        reports = _Reports(
+            _as_c_data(data[2]),
+            _as_c_data(data[3]),
+            _ErrorReport(_as_c_data(data[5]), _as_c_data(data[4])))
+        ctx = _Context()
+        retVal = _get_library().writeReports(
+            outputDirectory.encode('utf-8'),
+            data[0].x.ctypes.data_as(POINTER(c_double)),
+            data[0].y.ctypes.data_as(POINTER(c_double)),
+            len(data[0].x),
+            data[1].x.ctypes.data_as(POINTER(c_double)),
+            data[1].y.ctypes.data_as(POINTER(c_double)),
+            len(data[1].x),
+            byref(reports),
+            byref(ctx),
+        )
+        if retVal != 0:
+            raise IOError("Could not write results into {}: {}".format(
+                outputDirectory, ctx.error_message()))
+
+
+class FunnelEngine(object):
+    """Long-lived engine to run many comparisons with a low fixed overhead.
+
+    The funnel library is loaded and its prototypes are declared only once.
+    The input buffers (used for data that need a conversion) and the output
+    buffers are owned by the engine and reused across calls: they grow
+    geometrically when a call requires more capacity.
+
+    The arrays of the results returned by `compare` are views on the engine buffers,
+    hence they are overwritten by the next call, unless `copy=True` is used.
+    An engine is not thread-safe: use one engine per thread (the library itself is
+    reentrant, so that engines run concurrently in several threads).
+    """
+
+    def __init__(self, growth_factor=2):
+        """Args:
+
+            growth_factor (float): factor applied to the buffer capacity when it must grow
+        """
+        assert growth_factor > 1, "Growth factor must be greater than 1."
+        self._lib = _get_library()
+        self._growth_factor = growth_factor
+        self._buffers = dict()
+
+    def _buffer(self, name, n):
+        """Return the buffer named name, with a capacity of at least n float64."""
+        buffer = self._buffers.get(name)
+        if buffer is None or len(buffer) < n:
+            capacity = n if buffer is None else max(n, int(len(buffer) * self._growth_factor))
+            buffer = np.empty(capacity, dtype=np.float64)
+            self._buffers[name] = buffer
+        return buffer
+
+    def _is_buffer(self, arr):
+        """Test if the array is a view on an engine buffer."""
+        return any(arr.base is b for b in self._buffers.values())
+
+    def compare(
+        self,
+        xReference,
+        yReference,
+        xTest,
+        yTest,
+        atolx=None,
+        atoly=None,
+        ltolx=None,
+        ltoly=None,
+        rtolx=None,
+        rtoly=None,
+        copy=False
+    ):
+        """Same as the function `compare`, with the engine buffers.
+
+        Args:
+            See function `compare`.
+            copy (bool): if True, the returned arrays are copies of the engine buffers
+
+        Returns:
+            Results: funnel curves and errors
+        """
+        (xReference, yReference, xTest, yTest), tol = _check_arguments(
+            xReference, yReference, xTest, yTest, locals(), buffer=self._buffer)
+
+        reports = _Reports()
+        ctx = _Context()
+        capacity = self._lib.curveCapacity(len(xReference))
+        for name, data, n in (
+            ('lower', reports.lower, capacity),
+            ('upper', reports.upper, capacity),
+            ('errors', reports.errors.diff, len(xTest)),
+            ('violations', reports.errors.original, len(xTest)),
+        ):
+            data.x = self._buffer(name + '.x', n).ctypes.data_as(POINTER(c_double))
+            data.y = self._buffer(name + '.y', n).ctypes.data_as(POINTER(c_double))
+            data.n = n
+
+        try:
+            retVal = self._lib.compareIntoBuffers(
+                xReference.ctypes.data_as(POINTER(c_double)),
+                yReference.ctypes.data_as(POINTER(c_double)),
+                len(xReference),
+                xTest.ctypes.data_as(POINTER(c_double)),
+                yTest.ctypes.data_as(POINTER(c_double)),
+                len(xTest),
+                tol['atolx'],
+                tol['atoly'],
+                tol['ltolx'],
+                tol['ltoly'],
+                tol['rtolx'],
+                tol['rtoly'],
+                byref(reports),
+                byref(ctx),
+            )
+        except Exception as e:
+            raise RuntimeError("Library call raises exception: {}.".format(e))
+        if retVal != 0:
+            raise RuntimeError(ctx.error_message())
+
+        outputs = [
+            Data(*(self._buffers['{}.{}'.format(name, ax)][:data.n] for ax in 'xy'))
+            for name, data in (
+                ('lower', reports.lower),
+                ('upper', reports.upper),
+                ('errors', reports.errors.diff),
+                ('violations', reports.errors.original),
+            )]
+        inputs = [Data(xReference, yReference), Data(xTest, yTest)]
+        if copy:
+            outputs = [Data(*(v.copy() for v in d)) for d in outputs]
+            inputs = [Data(*(v.copy() if self._is_buffer(v) else v for v in d)) for d in inputs]
+
+        return Results(*(inputs + outputs))
+
+
+class ReferenceProfile(object):
+    """Analysis of reference values which does not depend on the tolerances.
+
+    The profile stores the data characteristics of the reference values and the slopes
+    and kinds of the corners of the funnel curves. A `Funnel` built with a profile only
+    computes the funnel size and the corner coordinates, which speeds up building several
+    funnels with different tolerances around the same reference values.
+    The profile is keyed by a content hash of the reference values: building a funnel
+    around other values with the profile raises a RuntimeError.
+
+    Attributes:
+        reference (Data): x, y reference values
+    """
+
+    def __init__(self, xReference, yReference):
+        """Args:
+
+            xReference (list-like of floats): x reference values
+            yReference (list-like of floats): y reference values
+        """
+        assert len(xReference) == len(yReference),\
+            "xReference and yReference must have the same length."
+        self.reference = Data(_as_double_array(xReference), _as_double_array(yReference))
+        self._lib = _get_library()
+        profile = _ReferenceProfile()
+        ctx = _Context()
+        retVal = self._lib.buildReferenceProfile(
+            self.reference.x.ctypes.data_as(POINTER(c_double)),
+            self.reference.y.ctypes.data_as(POINTER(c_double)),
+            len(self.reference.x),
+            byref(profile),
+            byref(ctx),
+        )
+        if retVal != 0:
+            raise RuntimeError(ctx.error_message())
+        self._profile = profile
+        self._owner = _LibraryData(self._lib.freeReferenceProfile, profile)
+
+    @property
+    def hash(self):
+        """int: content hash of the reference values."""
+        return self._profile.hash
+
+    def funnel(self, **tolerances):
+        """Build a funnel around the reference values of the profile.
+
+        Args:
+            **tolerances (float): tolerances, see `compare`
+
+        Returns:
+            Funnel: funnel built with the profile
+        """
+        return Funnel(self.reference.x, self.reference.y, profile=self, **tolerances)
+
+
+class Funnel(object):
+    """Funnel built once around reference values, to validate several test values.
+
+    The lower and upper bounds are computed only once by the funnel library:
+    `validate` only runs the comparison of the test values with the stored bounds.
+    A funnel can be used concurrently by several threads.
+
+    Attributes:
+        reference (Data): x, y reference values
+        lower (Data): x, y values of the lower bound of the funnel
+        upper (Data): x, y values of the upper bound of the funnel
+        tolerances (dict): tolerance values by tolerance name
+        decimation (dict): if the reference values are decimated, number of reference points
+            (`reference_points`), number of points kept to build the funnel (`kept_points`)
+            and fraction of points removed (`reduction`), None otherwise
+    """
+
+    def __init__(
+        self,
+        xReference,
+        yReference,
+        atolx=None,
+        atoly=None,
+        ltolx=None,
+        ltoly=None,
+        rtolx=None,
+        rtoly=None,
+        profile=None,
+        decimation=None
+    ):
+        """Args:
+
+            xReference (list-like of floats): x reference values
+            yReference (list-like of floats): y reference values
+            atolx, atoly, ltolx, ltoly, rtolx, rtoly (float): tolerances, see `compare`
+            profile (ReferenceProfile): if not None, analysis of the reference values reused
+                to build the funnel (the reference values must be the values of the profile)
+            decimation (float): if not None, the funnel is built around the reference values
+                without the points within this fraction of the funnel height of the line
+                through their neighbors (e.g. 0.01): the bounds differ by at most this fraction
+                of the funnel height if the funnel size is constant (no `ltolx`, `ltoly`)
+        """
+        assert len(xReference) == len(yReference),\
+            "xReference and yReference must have the same length."
+        self.reference = Data(_as_double_array(xReference), _as_double_array(yReference))
+        self.tolerances = _check_tolerances(locals())
+
+        self._lib = _get_library()
+        tube = _Tube()
+        ctx = _Context()
+        reference = self.reference
+        self.decimation = None
+        if decimation is not None:
+            if profile is not None:
+                raise ValueError("A reference profile cannot be used with decimation.")
+            reference = self._decimate(float(decimation))
+        args = [
+            reference.x.ctypes.data_as(POINTER(c_double)),
+            reference.y.ctypes.data_as(POINTER(c_double)),
+            len(reference.x),
+        ]
+        if profile is None:
+            build = self._lib.buildTube
+        else:
+            build = self._lib.buildTubeFromProfile
+            args.append(byref(profile._profile))
+        args += [self.tolerances[k] for k in ('atolx', 'atoly', 'ltolx', 'ltoly', 'rtolx', 'rtoly')]
+        retVal = build(*(args + [byref(tube), byref(ctx)]))
+        if retVal != 0:
+            raise RuntimeError(ctx.error_message())
+        # The owner releases the tube arrays when the funnel is deleted.
+        self._tube = tube
+        self._owner = _LibraryData(self._lib.freeTube, tube)
+        self.lower = _simplify_curve(self._lib, _copy_data(tube.lower))
+        self.upper = _simplify_curve(self._lib, _copy_data(tube.upper))
+
+    def _decimate(self, fraction):
+        """Decimate the reference values and store the achieved reduction.
+
+        Returns:
+            Data: decimated x, y reference values
+        """
+        n = len(self.reference.x)
+        decimated = Data(np.empty(n), np.empty(n))
+        nDecimated = c_size_t()
+        ctx = _Context()
+        retVal = self._lib.decimateReference(
+            self.reference.x.ctypes.data_as(POINTER(c_double)),
+            self.reference.y.ctypes.data_as(POINTER(c_double)),
+            n,
+            self.tolerances['atolx'],
+            self.tolerances['atoly'],
+            self.tolerances['ltolx'],
+            self.tolerances['ltoly'],
+            self.tolerances['rtolx'],
+            self.tolerances['rtoly'],
+            fraction,
+            decimated.x.ctypes.data_as(POINTER(c_double)),
+            decimated.y.ctypes.data_as(POINTER(c_double)),
+            byref(nDecimated),
+            byref(ctx),
+        )
+        if retVal != 0:
+            raise RuntimeError(ctx.error_message())
+        self.decimation = dict(
+            reference_points=n,
+            kept_points=nDecimated.value,
+            reduction=1 - nDecimated.value / n,
+        )
+        return Data(decimated.x[:nDecimated.value], decimated.y[:nDecimated.value])
+
+    def validate(
+        self, xTest, yTest, summary_only=False, max_violations=None, x_min=None, x_max=None
+    ):
+        """Validate test values against the funnel.
+
+        Args:
+            xTest (list-like of floats): x test values
+            yTest (list-like of floats): y test values
+            summary_only (bool): if True, only the aggregated errors are computed,
+                without allocating any array for the test points
+            max_violations (int): if not None, stop at this number of violations
+                (implies `summary_only=True`): the aggregated errors are then computed
+                up to the last validated test value
+            x_min, x_max (float): if not None, only the test values with x in [x_min, x_max]
+                are validated (the range must be within the x range of the reference and
+                the test values do not need to span the x range of the reference).
+                The test values in range and the matching part of the funnel are found
+                by binary search: the cost does not depend on the size of the data out of range.
+
+        Returns:
+            Results: funnel curves and errors (the funnel curves are shared by all results),
+            or if `summary_only` is True,
+            dict: aggregated errors with the keys
+                `passed` (bool): True if all test values are inside the funnel,
+                `violations` (int): number of test values outside the funnel,
+                `max_error` (float): maximum error,
+                `error_integral` (float): integral of the error over x (trapezoidal rule),
+                `fraction_outside` (float): fraction of the x range outside the funnel,
+                `first_violation_x` (float): x value of the first violation (None if passed),
+                `complete` (bool): False if the validation stopped at `max_violations`
+        """
+        assert len(xTest) == len(yTest),\
+            "xTest and yTest must have the same length."
+        xTest, yTest = _as_double_array(xTest), _as_double_array(yTest)
+        n = len(xTest)
+        if x_min is not None or x_max is not None:
+            return self._validate_range(xTest, yTest, summary_only, max_violations, x_min, x_max)
+        if summary_only or max_violations is not None:
+            summary = _ErrorSummary()
+            ctx = _Context()
+            retVal = self._lib.summarizeTube(
+                byref(self._tube),
+                xTest.ctypes.data_as(POINTER(c_double)),
+                yTest.ctypes.data_as(POINTER(c_double)),
+                n,
+                _check_max_violations(max_violations),
+                byref(summary),
+                byref(ctx),
+            )
+            if retVal != 0:
+                raise RuntimeError(ctx.error_message())
+            return summary.as_dict(n)
+        outputs = [Data(np.empty(n), np.empty(n)) for _ in range(2)]  # errors, violations
+        errors = _ErrorReport(_as_c_data(outputs[1]), _as_c_data(outputs[0]))
+        ctx = _Context()
+        retVal = self._lib.validateTube(
+            byref(self._tube),
+            xTest.ctypes.data_as(POINTER(c_double)),
+            yTest.ctypes.data_as(POINTER(c_double)),
+            n,
+            byref(errors),
+            byref(ctx),
+        )
+        if retVal != 0:
+            raise RuntimeError(ctx.error_message())
+        return Results(
+            self.reference,
+            (xTest, yTest),
+            self.lower,
+            self.upper,
+            (outputs[0].x[:errors.diff.n], outputs[0].y[:errors.diff.n]),
+            (outputs[1].x[:errors.original.n], outputs[1].y[:errors.original.n]))
+
+    def _validate_range(self, xTest, yTest, summary_only, max_violations, x_min, x_max):
+        """Validate the test values with x in [x_min, x_max], see `validate`."""
+        x_min = self.reference.x[0] if x_min is None else float(x_min)
+        x_max = self.reference.x[-1] if x_max is None else float(x_max)
+        start, end = c_size_t(), c_size_t()
+        summary, errors = None, None
+        if summary_only or max_violations is not None:
+            summary = _ErrorSummary()
+        else:
+            # Same binary searches as the library: the outputs only hold the values in range.
+            n = max(np.searchsorted(xTest, x_max, 'right') - np.searchsorted(xTest, x_min), 0)
+            outputs = [Data(np.empty(n), np.empty(n)) for _ in range(2)]  # errors, violations
+            errors = _ErrorReport(_as_c_data(outputs[1]), _as_c_data(outputs[0]))
+        ctx = _Context()
+        retVal = self._lib.validateTubeRange(
+            byref(self._tube),
+            xTest.ctypes.data_as(POINTER(c_double)),
+            yTest.ctypes.data_as(POINTER(c_double)),
+            len(xTest),
+            x_min,
+            x_max,
+            None if errors is None else byref(errors),
+            None if summary is None else byref(summary),
+            _check_max_violations(max_violations),
+            byref(start),
+            byref(end),
+            byref(ctx),
+        )
+        if retVal != 0:
+            raise RuntimeError(ctx.error_message())
+        start, end = start.value, end.value
+        if summary is not None:
+            return summary.as_dict(end - start)
+        return Results(
+            self.reference,
+            (xTest[start:end], yTest[start:end]),
+            self.lower,
+            self.upper,
+            (outputs[0].x[:errors.diff.n], outputs[0].y[:errors.diff.n]),
+            (outputs[1].x[:errors.original.n], outputs[1].y[:errors.original.n]))
+
+    def bounds(self, x_query):
+        """Evaluate the lower and upper bounds of the funnel at query x values.
+
+        The query values may be in any order: sorted values are evaluated in a single pass over
+        the bounds and the other values are located by binary search, except for large batches
+        which are sorted first (faster than the binary searches scattered in memory).
+        The values are the same as the bounds used by `validate`.
+
+        Args:
+            x_query (list-like of floats): x values within the x range of the reference
+
+        Returns:
+            tuple: lower and upper bounds (numpy.ndarray) at the query x values
+        """
+        x_query = _as_double_array(x_query)
+        n = len(x_query)
+        order = None
+        if n >= _QUERY_SORT_SIZE and np.any(x_query[1:] < x_query[:-1]):
+            order = np.argsort(x_query, kind='mergesort')
+            x_query = x_query[order]
+        lower, upper = np.empty(n), np.empty(n)
+        ctx = _Context()
+        retVal = self._lib.boundsTube(
+            byref(self._tube),
+            x_query.ctypes.data_as(POINTER(c_double)),
+            n,
+            lower.ctypes.data_as(POINTER(c_double)),
+            upper.ctypes.data_as(POINTER(c_double)),
+            byref(ctx),
+        )
+        if retVal != 0:
+            raise RuntimeError(ctx.error_message())
+        if order is not None:
+            lower[order], upper[order] = lower.copy(), upper.copy()
+        return lower, upper
+
+    def contains(self, x, y):
+        """Test whether points are inside the funnel.
+
+        Args:
+            x (list-like of floats): x values within the x range of the reference, in any order
+            y (list-like of floats): y values
+
+        Returns:
+            numpy.ndarray: boolean array, True where the point is inside the funnel
+            (same as a zero error returned by `validate`)
+        """
+        assert len(x) == len(y),\
+            "x and y must have the same length."
+        lower, upper = self.bounds(x)
+        y = _as_double_array(y)
+        return ~((y < lower) | (y > upper))
+
+    def stream(self, errors_file=None):
+        """Return a `FunnelStream` to validate test values arriving chunk by chunk.
+
+        Args:
+            errors_file (str): path of a file to which the errors of each chunk are appended,
+                with the same format as `errors.csv` (no file is written by default)
+
+        Returns:
+            FunnelStream: streaming validator sharing the bounds of the funnel
+        """
+        return FunnelStream(self, errors_file)
+
+
+class FunnelStream(object):
+    """Streaming validator of test values against a funnel, for data arriving over time.
+
+    The chunks passed to `feed` must be ordered by increasing x values, within the x range
+    of the reference. The position in the funnel bounds and the aggregated errors are kept
+    between calls, so that the cost of a call only depends on the chunk size.
+    A stream must not be fed concurrently by several threads.
+
+    Attributes:
+        funnel (Funnel): funnel against which the test values are validated
+        errors_file (str): path of the file to which the errors are appended (or None)
+    """
+
+    def __init__(self, funnel, errors_file=None):
+        """Args:
+
+            funnel (Funnel): funnel against which the test values are validated
+            errors_file (str): see `Funnel.stream`
+        """
+        self.funnel = funnel
+        self.errors_file = errors_file
+        self._stream = _Stream()
+        funnel._lib.initStream(byref(self._stream))
+
+    def feed(self, xTest, yTest):
+        """Validate the next chunk of test values.
+
+        Args:
+            xTest (list-like of floats): x test values of the chunk
+            yTest (list-like of floats): y test values of the chunk
+
+        Returns:
+            Data: x, y values of the violations of the chunk (test values outside the funnel)
+        """
+        assert len(xTest) == len(yTest),\
+            "xTest and yTest must have the same length."
+        xTest, yTest = _as_double_array(xTest), _as_double_array(yTest)
+        n = len(xTest)
+        outputs = [Data(np.empty(n), np.empty(n)) for _ in range(2)]  # errors, violations
+        errors = _ErrorReport(_as_c_data(outputs[1]), _as_c_data(outputs[0]))
+        ctx = _Context()
+        retVal = self.funnel._lib.feedStream(
+            byref(self.funnel._tube),
+            byref(self._stream),
+            xTest.ctypes.data_as(POINTER(c_double)),
+            yTest.ctypes.data_as(POINTER(c_double)),
+            n,
+            byref(errors),
+            None if self.errors_file is None else self.errors_file.encode('utf-8'),
+            byref(ctx),
+        )
+        if retVal != 0:
+            raise RuntimeError(ctx.error_message())
+        return Data(outputs[1].x[:errors.original.n], outputs[1].y[:errors.original.n])
+
+    @property
+    def summary(self):
+        """dict: aggregated errors of all the chunks fed so far (see `Funnel.validate`)."""
+        summary = self._stream.summary
+        return summary.as_dict(summary.nPoints)
+
+
+class EditableFunnel(Funnel):
+    """Funnel around reference values which can be appended or locally corrected.
+
+    `update` appends reference values and `replace_range` replaces a range of reference values:
+    the bounds are only computed again near the change and spliced into the stored bounds,
+    so that the cost of a change depends on its size, not on the size of the reference.
+    If the funnel size depends on the range or magnitude of the reference (`rtolx`, `rtoly`)
+    and a change modifies it, or if `ltoly` sets the funnel size at some points, the bounds are
+    computed again entirely.
+    The x values are normalized with the magnitude of the reference values at the last complete
+    computation, so the bounds may differ from the bounds of a new `Funnel` by rounding errors
+    when a change modifies the magnitude of the x values.
+
+    The attributes `reference`, `lower` and `upper` return copies of the current values.
+    A funnel must not be changed while it is used by other threads, and the streams created
+    before a change must not be fed afterwards.
+    """
+
+    def __init__(
+        self,
+        xReference,
+        yReference,
+        atolx=None,
+        atoly=None,
+        ltolx=None,
+        ltoly=None,
+        rtolx=None,
+        rtoly=None
+    ):
+        """Args: see `Funnel`."""
+        assert len(xReference) == len(yReference),\
+            "xReference and yReference must have the same length."
+        xReference, yReference = _as_double_array(xReference), _as_double_array(yReference)
+        self.tolerances = _check_tolerances(locals())
+        self.decimation = None
+        self._lib = _get_library()
+        editable = _EditableTube()
+        ctx = _Context()
+        retVal = self._lib.buildEditableTube(
+            xReference.ctypes.data_as(POINTER(c_double)),
+            yReference.ctypes.data_as(POINTER(c_double)),
+            len(xReference),
+            self.tolerances['atolx'],
+            self.tolerances['atoly'],
+            self.tolerances['ltolx'],
+            self.tolerances['ltoly'],
+            self.tolerances['rtolx'],
+            self.tolerances['rtoly'],
+            byref(editable),
+            byref(ctx),
+        )
+        if retVal != 0:
+            raise RuntimeError(ctx.error_message())
+        # The tube shares the memory of the editable tube, released by the owner.
+        self._editable = editable
+        self._tube = editable.tube
+        self._owner = _LibraryData(self._lib.freeEditableTube, editable)
+
+    @property
+    def reference(self):
+        """Data: copy of the x, y reference values."""
+        return _copy_data(self._editable.reference)
+
+    @property
+    def lower(self):
+        """Data: copy of the x, y values of the lower bound of the funnel."""
+        return _simplify_curve(self._lib, _copy_data(self._editable.tube.lower))
+
+    @property
+    def upper(self):
+        """Data: copy of the x, y values of the upper bound of the funnel."""
+        return _simplify_curve(self._lib, _copy_data(self._editable.tube.upper))
+
+    def update(self, xNew, yNew):
+        """Append reference values.
+
+        Args:
+            xNew (list-like of floats): x reference values, not lower than the last x value
+            yNew (list-like of floats): y reference values
+        """
+        n = self._editable.reference.n
+        self.replace_range(n, n, xNew, yNew)
+
+    def replace_range(self, start, end, xNew, yNew):
+        """Replace the reference values of indices `start` to `end` (excluded).
+
+        Args:
+            start (int): index of the first replaced reference value
+            end (int): index following the last replaced reference value
+            xNew (list-like of floats): x reference values, sorted and consistent with the
+                x values before `start` and after `end`
+            yNew (list-like of floats): y reference values
+        """
+        assert len(xNew) == len(yNew),\
+            "xNew and yNew must have the same length."
+        xNew, yNew = _as_double_array(xNew), _as_double_array(yNew)
+        ctx = _Context()
+        retVal = self._lib.updateTube(
+            byref(self._editable),
+            start,
+            end,
+            xNew.ctypes.data_as(POINTER(c_double)),
+            yNew.ctypes.data_as(POINTER(c_double)),
+            len(xNew),
+            byref(ctx),
+        )
+        if retVal != 0:
+            raise RuntimeError(ctx.error_message())
+
+
 class MyHTTPServer(HTTPServer):
     """Add custom server_launch, server_close and browse methods."""
 
@@ -73,6 +73,12 @@ if __name__ == "__main__":
         type=float,
         help="Relative tolerance along y axis (relatively to the range)"
     )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        help=("Number of points read at once from each file: if specified, the files are "
+              "compared chunk by chunk with a memory usage bounded by the chunk size")
+    )
 
     # Parse the arguments.
     args = parser.parse_args()
@@ -83,6 +89,22 @@ if __name__ == "__main__":
     assert os.path.isfile(args.test),\
         "No such file: {}".format(args.test)
 
+    # Compare the files chunk by chunk without loading them.
+    if args.chunk_size is not None:
+        rc = core.compareFiles(
+            referenceFile=args.reference,
+            testFile=args.test,
+            outputDirectory=args.output,
+            atolx=args.atolx,
+            atoly=args.atoly,
+            ltolx=args.ltolx,
+            ltoly=args.ltoly,
+            rtolx=args.rtolx,
+            rtoly=args.rtoly,
+            chunk_size=args.chunk_size,
+        )
+        sys.exit(rc)
+
     # Extract data from files.
     data = dict()
     for s in ('reference', 'test'):
@@ -32,7 +32,7 @@ setup(
     long_description_content_type='text/markdown',
     license="3-clause BSD",
     python_requires='>=2.7, !=3.0.*, !=3.1.*, !=3.2.*, !=3.3.*, !=3.4.*, !=3.5.*',
-    install_requires=['six>=1.11'],
+    install_requires=['numpy', 'six>=1.11'],
     packages=[MAIN_PACKAGE],
     include_package_data=True,
     classifiers=[
@@ -6,28 +6,28 @@
  *
  * Functions:
  * ----------
- *   createNode: creates new linked list node
- *   addNode: add node to a existing linked list at end
- *   listLen: find length of linked list
- *   getNth: find value of specific node in linked list
- *   getListValues: find values at all the nodes of linked list
- *   lastNodeDeletion: delete last node of the linked list
- *   calculateLower: find the data set of lower tube curve
- *   calculateUpper: find the data set of upper tube curve
+ *   newCurve: allocate the arrays of a curve
+ *   freeCurve: free the arrays of a curve
+ *   pushCorner: add a point at the end of a curve
+ *   popCorner: remove the last point of a curve
+ *   hashReference: content hash of the reference points
+ *   buildProfile: analyze the reference curve independently of the tolerances
+ *   freeProfile: free the arrays of a profile
+ *   getTubeProfile: find the tube curves from the analysis of the reference curve
+ *   getTube: find the data sets of lower and upper tube curves
  *   removeLoop: remove points and add intersection points in case of backward order
- *   removeRange: remove a range of elements from array
- *   removeAt: remove element at the specified index from array
- *   insertAt: insert element into the array at the specified index
  */
 
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
+#include <stddef.h>
 #include <math.h>
 #include "stdbool.h"
 
 #include "data_structure.h"
 #include "algorithmRectangle.h"
+#include "arena.h"
 #include "tubeSize.h"
 
 #ifndef sign
@@ -43,572 +43,627 @@
 #endif
 
 
-/*
- * Function: createNode
- * --------------------
- *   creates new linked list node
- */
-node_t * createNode() {
-  node_t* temp;
-  temp = malloc(sizeof(node_t));
-  if (temp == NULL){
-	  fputs("Error: Failed to allocate memory for temp.\n", stderr);
-    exit(1);
-  }
-  temp->next = NULL;
-  return temp;
-}
+/* Kinds of the corners added at a reference point (see buildProfile) */
+#define CORNER_RISING 0   /* down right and top left points */
+#define CORNER_FALLING 1  /* down left and top right points */
+#define CORNER_MINIMUM 2  /* down left, down right and top right, top left points */
+#define CORNER_MAXIMUM 3  /* down right, down left and top left, top right points */
 
 /*
- * Function: addNode
- * -----------------
- *   add node to a existing linked list at end
+ * Function: newCurve
+ * ------------------
+ *   allocates the arrays of a curve of zero size
  *
- *   head: original linked list to add additional node at end
- *   newVal: value of the additional node
+ *   capacity: maximum number of points of the curve
+ *   arena: arena of the call (NULL: the arrays are allocated with malloc)
  *
- *   return: new linked list that have an additional node
+ *   return: data struct with allocated arrays
+ *           (arrays set to NULL if the allocation failed)
  */
-node_t * addNode(node_t* head, double newVal) {
-  node_t* temp;
-  node_t* p;
-  // create additional node
-  temp = createNode();
-  temp->val = newVal;
-
-  if (head == NULL) {
-    head = temp;
-  } else {
-    p = head;
-    while (p->next != NULL) {
-      p = p->next;
+static struct data newCurve(size_t capacity, struct arena *arena) {
+  struct data curve;
+  curve.x = arenaAlloc(arena, sizeof(double) * capacity);
+  curve.y = arenaAlloc(arena, sizeof(double) * capacity);
+  if ((curve.x == NULL) || (curve.y == NULL)){
+    if (arena == NULL) {
+      free(curve.x);
+      free(curve.y);
     }
-    p->next = temp;
+    curve.x = curve.y = NULL;
   }
-  return head;
+  curve.n = 0;
+  return curve;
 }
 
 /*
- * Function: listLen
- * -----------------
- *   find length of linked list
+ * Function: freeCurve
+ * -------------------
+ *   frees the arrays of a curve allocated with newCurve and sets it to an empty curve
  *
- *   head: linked list
- *
- *   return: number of nodes in the linked list
+ *   curve: curve to free
+ *   arena: arena the curve was allocated from (NULL: the arrays are freed,
+ *          otherwise they are released with the arena)
  */
-int listLen(node_t* head) {
-  int count = 0;
-  node_t* current = head;  // Initialize current
-  while (current != NULL) {
-    count = count+1;
-    current = current->next;
+static void freeCurve(struct data *curve, struct arena *arena) {
+  if (arena == NULL) {
+    free(curve->x);
+    free(curve->y);
   }
-  return count;
+  curve->x = curve->y = NULL;
+  curve->n = 0;
 }
 
 /*
- * Function: getNth
- * ----------------
- *   find value of specific node in linked list
- *
- *   head: linked list
- *   index: zero-based index at which node its value will be output
+ * Function: pushCorner
+ * --------------------
+ *   add a point at the end of a curve (the capacity is not checked)
  *
- *   return: value of Nth node of lined list
+ *   curve: curve allocated with newCurve
+ *   x: x value of the point
+ *   y: y value of the point
  */
-double getNth(node_t* head, int index) {
-    node_t* current = head;
-    int count = 0; // the index of the node we're currently looking at
-    while (current != NULL) {
-       if (count == index)
-         break;
-       count = count+1;
-       current = current->next;
-    }
-    return current->val;
+static inline void pushCorner(struct data *curve, double x, double y) {
+  curve->x[curve->n] = x;
+  curve->y[curve->n] = y;
+  curve->n++;
 }
 
 /*
- * Function: getListValues
- * -----------------------
- *   find values at all the nodes of linked list
- *
- *   head: linked list
+ * Function: popCorner
+ * -------------------
+ *   remove the last point of a curve
  *
- *   return: data array storing values of linked list
+ *   curve: curve allocated with newCurve
  */
-double * getListValues(node_t* head) {
-  int size = 1;
-  double *value = malloc(sizeof(double) * size);
-  if (value == NULL){
-	  fputs("Error: Failed to allocate memory for value.\n", stderr);
-    exit(1);
-  }
-  memset(value,0,sizeof(double)*size);
-
-  node_t* current = head;
-  int count = 0;
-  while (current != NULL) {
-    value[count] = current->val;
-    if (count+1 == size) {
-      /* need more space */
-      size += 10;
-      double *value_tmp = realloc(value, sizeof(double)*size);
-      if (value_tmp == NULL) {
-        fputs("Fatal error -- out of memory!\n", stderr);
-        exit(1);
-      }
-      value = value_tmp;
-    }
-    count = count+1;
-    current = current->next;
-  }
-  return value;
+static inline void popCorner(struct data *curve) {
+  if (curve->n > 0) curve->n--;
 }
 
-/*
- * Function: lastNodeDeletion
- * --------------------------
- *   delete last node of the linked list
- *
- *   head: linked list
- */
-void lastNodeDeletion(node_t* head) {
-  node_t* toDelLast;
-  node_t* preNode;
-    if(head == NULL) {
-        printf("There is no element in the list.");
-    } else {
-      toDelLast = head;
-        preNode = head;
-        /* Traverse to the last node of the list */
-        while(toDelLast->next != NULL) {
-            preNode = toDelLast;
-            toDelLast = toDelLast->next;
-        }
-        if(toDelLast == head) {
-          /* If there is only one item in the list, remove it */
-            head = NULL;
-        } else {
-            /* Disconnects the link of second last node with last node */
-            preNode->next = NULL;
-        }
-        /* Delete the last node */
-        if (toDelLast != NULL) free(toDelLast);
-    }
+/* Normalize a value by the variable magnitude (same as normalize for a single value) */
+static inline double normalizeValue(double var, double var_mag) {
+  return (var_mag > 1E-5) ? var / var_mag : var;
 }
 
-/* Normalize variable array by variable magnitude */
-void normalize(double *var, size_t length, double var_mag) {
+/* Denormalize variable array by variable magnitude */
+void denormalize(double *var, size_t length, double var_mag) {
   for (size_t i = 0; i < length; i++) {
     if (var_mag > 1E-5) {
-      var[i] = var[i] / var_mag;
+      var[i] = var[i] * var_mag;
     } else {
       var[i] = var[i];
     }
   }
 }
 
-/* Denormalize variable array by variable magnitude */
-void denormalize(double *var, size_t length, double var_mag) {
-  for (size_t i = 0; i < length; i++) {
-    if (var_mag > 1E-5) {
-      var[i] = var[i] * var_mag;
-    } else {
-      var[i] = var[i];
+/*
+ * Function: removeZeroSlope
+ * -------------------------
+ *   remove the last added points of a tube curve in case of zero slope of
+ *   the tube curve
+ *
+ *   curve: tube curve
+ *   nextY: y value of the tube curve at the next reference point
+ *   twoPoints: true if two points were added at last (s0 * s1 = -1)
+ */
+static inline void removeZeroSlope(struct data *curve, double nextY, bool twoPoints) {
+  double lastY = curve->y[curve->n-1];
+  if equ(nextY, lastY) {
+    if (twoPoints && equ(curve->y[curve->n-3], lastY)) {
+      // remove two points, if two points were added at last
+      // ((n-1) - 2 >= 0, because start point + two added points)
+      popCorner(curve);
+      popCorner(curve);
+    } else if (!twoPoints && equ(curve->y[curve->n-2], lastY)) {
+      // remove one point, if one point was added at last
+      // ((n-1) - 1 >= 0, because start point + one added point)
+      popCorner(curve);
     }
   }
 }
 
 /*
- * Function: setLower
- * ------------------------
- *   find the data set of lower tube curve
+ * Function: hashReference
+ * -----------------------
+ *   content hash of the reference points (FNV-1a over the 64-bit words of
+ *   the x and y values), used to check that a profile matches a reference
  *
  *   reference: pointer to reference data struct
- *   tube_size: pointer to tube_size struct
  *
- *   return : data struct defining lower curve of the tube
+ *   return: hash value
  */
-struct data getLower(struct data *reference, struct data *tube_size) {
-  struct data lower;
-  node_t *lx = NULL;
-  node_t *ly = NULL;
-  size_t i, b;
+uint64_t hashReference(const struct data *reference) {
+  uint64_t h = 14695981039346656037ULL ^ (uint64_t)reference->n;
+  uint64_t w;
+  size_t i;
+
+  for (i = 0; i < reference->n; i++) {
+    memcpy(&w, &reference->x[i], sizeof(w));
+    h = (h ^ w) * 1099511628211ULL;
+    memcpy(&w, &reference->y[i], sizeof(w));
+    h = (h ^ w) * 1099511628211ULL;
+  }
+  return h;
+}
 
-  /* Normalize values and tube size in x direction.
-   * This was introduced in https://github.com/lbl-srg/funnel/pull/30
-   * to guard against vanishing derivatives (dy/dx) for x values with a large order of magnitude.
-   */
+/*
+ * Function: buildProfile
+ * ----------------------
+ *   analyze the reference curve independently of the tolerances: identical
+ *   points, slopes and signs of the slopes, and kinds of the corners of the
+ *   rectangles added to the tube curves (see getTube)
+ *
+ *   reference: pointer to reference data struct (at least one point)
+ *   dat_char: data characteristics of the reference (see get_data_char)
+ *   profile: receives the analysis (arrays allocated by this function,
+ *            released with freeProfile if arena is NULL)
+ *   arena: arena of the call (NULL: the arrays are allocated with malloc)
+ *
+ *   return: 0 if there was success, -1 if the allocation failed
+ */
+int buildProfile(
+  const struct data *reference,
+  struct data_char dat_char,
+  struct referenceProfile *profile,
+  struct arena *arena
+) {
+  const double *y = reference->y;
+  const size_t n = reference->n;
+  size_t i, b;
 
-  struct data_char dat_char = get_data_char(reference);                   // Data characteristics
-  double *x_norm = (double *)malloc(sizeof(double) * reference->n);       // Normalized x values
-  double *tube_x_norm = (double *)malloc(sizeof(double) * tube_size->n);  // Normalized tube size in x direction
-  if ((x_norm == NULL) || (tube_x_norm == NULL)){
-	  fputs("Error: Failed to allocate memory for x_norm or tube_x_norm.\n", stderr);
-    exit(1);
-  }
-  memcpy(x_norm, reference->x, sizeof(double) * reference->n);
-  memcpy(tube_x_norm, tube_size->x, sizeof(double) * tube_size->n);
-  normalize(x_norm, reference->n, dat_char.mag_x);
-  normalize(tube_x_norm, tube_size->n, dat_char.mag_x);
+  // Normalized x values computed on the fly (see getTube)
+  const double mag_x = dat_char.mag_x;
+#define X_NORM(ind) normalizeValue(reference->x[(ind)], mag_x)
 
-  // ===== 1. add corner points of the rectangle =====
   double m0, m1; // slopes before and after point i of reference curve
-  double s0, s1; // sign of slopes of reference curve: 1 - increasing, 0 - constant, -1 - decreasing
+  int s0, s1; // sign of slopes of reference curve: 1 - increasing, 0 - constant, -1 - decreasing
+
+  profile->hash = hashReference(reference);
+  profile->nReference = n;
+  profile->dat_char = dat_char;
+  profile->nCorners = 0;
+  profile->corners = arenaAlloc(arena, sizeof(size_t) * (n > 0 ? n : 1));
+  profile->kinds = arenaAlloc(arena, sizeof(unsigned char) * (n > 0 ? n : 1));
+  if ((profile->corners == NULL) || (profile->kinds == NULL)) {
+    if (arena == NULL) freeProfile(profile);
+    return -1;
+  }
 
-  // ----- 1.1 Start: rectangle with center (x,y) = (reference->x[0], reference->y[0]) -----
   // ignore identical point at the beginning
   b = 0;
-  while ((b+1 < reference->n) && equ(x_norm[b], x_norm[b+1]) && (equ(reference->y[b], reference->y[b+1])))
+  while ((b+1 < n) && equ(X_NORM(b), X_NORM(b+1)) && equ(y[b], y[b+1]))
   {
     b = b+1;
   }
+  profile->first = b;
+  profile->firstSign = 0;
+  profile->lastSign = 0;
+
+  if (b+1 < n) {
+    // slopes of reference curve (initialization)
+    s0 = sign(y[b+1] - y[b]);
+    if (!equ(X_NORM(b+1), X_NORM(b))) {
+      m0 = (y[b+1] - y[b]) / (X_NORM(b+1) - X_NORM(b));
+    } else {
+      m0 = (s0>0) ? 1e+15 : -1e+15;
+    }
+    profile->firstSign = s0;
+
+    for (i = b+1; i < n-1; i++) {
+      // ignore identical points
+      if (equ(X_NORM(i), X_NORM(i+1)) && equ(y[i], y[i+1]))
+        continue;
+
+      // slopes of reference curve
+      s1 = sign(y[i+1] - y[i]);
+      if (!equ(X_NORM(i+1), X_NORM(i))) {
+        m1 = (y[i+1] - y[i]) / (X_NORM(i+1) - X_NORM(i));
+      } else {
+        m1 = (s1>0) ? (1e+15) : (-1e+15);
+      }
 
-  // add down left point
-  lx = addNode(lx,(x_norm[b] - tube_x_norm[b]));
-  ly = addNode(ly, (reference->y[b] - tube_size->y[b]));
-
-  if (b+1 < reference->n) {
-  	  // slopes of reference curve (initialization)
-  	  s0 = sign(reference->y[b+1] - reference->y[b]);
-  	  if (!equ(x_norm[b+1], x_norm[b])) {
-  		  m0 = (reference->y[b+1] - reference->y[b]) / (x_norm[b+1] - x_norm[b]);
-  	  } else {
-  		  m0 = (s0>0) ? 1e+15 : -1e+15;
-  	  }
-  	  if equ(s0, 1) {
-  		  // add down right point
-  		  lx = addNode(lx,(x_norm[b] + tube_x_norm[b]));
-  		  ly = addNode(ly, (reference->y[b] - tube_size->y[b]));
-  	  }
-
-  	  // ----- 1.2 Iteration: rectangle with center (x,y) = (reference->x[i], reference->y[i]) -----
-  	  for (i = b+1; i < reference->n-1; i++) {
-  		  // ignore identical points
-  		  if (equ(x_norm[i], x_norm[i+1]) && equ(reference->y[i], reference->y[i+1]))
-  			  continue;
-
-  		  // slopes of reference curve
-  		  s1 = sign(reference->y[i+1] - reference->y[i]);
-  		  if (!equ(x_norm[i+1], x_norm[i])) {
-  			  m1 = (reference->y[i+1] - reference->y[i]) / (x_norm[i+1] - x_norm[i]);
-  		  } else {
-  			  m1 = (s1>0) ? (1e+15) : (-1e+15);
-  		  }
-
-  		  // add no point for equal slopes of reference curve
-  		  if (!equ(m0, m1)) {
-  			  if (!equ(s0, -1) && !equ(s1, -1)) {
-  				  // add down right point
-  				  lx = addNode(lx, (x_norm[i] + tube_x_norm[i]));
-  				  ly = addNode(ly, (reference->y[i] - tube_size->y[i]));
-  			  } else if (!equ(s0, 1) && !equ(s1, 1)) {
-  				  // add down left point
-  				  lx = addNode(lx, (x_norm[i] - tube_x_norm[i]));
-  				  ly = addNode(ly, (reference->y[i] - tube_size->y[i]));
-  			  } else if (equ(s0, -1) && equ(s1, 1)) {
-  				  // add down left point
-  				  lx = addNode(lx, (x_norm[i] - tube_x_norm[i]));
-  				  ly = addNode(ly, (reference->y[i] - tube_size->y[i]));
-  				  // add down right point
-  				  lx = addNode(lx, (x_norm[i] + tube_x_norm[i]));
-  				  ly = addNode(ly, (reference->y[i] - tube_size->y[i]));
-  			  } else if (equ(s0, 1) && equ(s1, -1)) {
-  				  // add down right point
-  				  lx = addNode(lx, (x_norm[i] + tube_x_norm[i]));
-  				  ly = addNode(ly, (reference->y[i] - tube_size->y[i]));
-  				  // add down left point
-  				  lx = addNode(lx, (x_norm[i] - tube_x_norm[i]));
-  				  ly = addNode(ly, (reference->y[i] - tube_size->y[i]));
-  			  }
-
-  			  int len = listLen(ly);
-  			  double lastY = getNth(ly, len-1);
-  			  // remove the last added points in case of zero slope of tube curve
-  			  if equ((reference->y[i+1] - tube_size->y[i+1]), lastY) {
-  				  if (equ(s0 * s1, -1) && equ(getNth(ly, len-3), lastY)) {
-  					  // remove two points, if two points were added at last
-  					  // ((len-1) - 2 >= 0, because start point + two added points)
-  					  lastNodeDeletion(lx);
-  					  lastNodeDeletion(ly);
-  					  lastNodeDeletion(lx);
-  					  lastNodeDeletion(ly);
-  				  } else if (!equ(s0 * s1, -1) && equ(getNth(ly, len-2), lastY)) {
-  					  // remove one point, if one point was added at last
-  					  // ((len-1) - 1 >= 0, because start point + one added point)
-  					  lastNodeDeletion(lx);
-  					  lastNodeDeletion(ly);
-  				  }
-  			  }
-  		  }
-  		  s0 = s1;
-  		  m0 = m1;
-  	  }
-  	  // ----- 1.3. End: Rectangle with center (x,y) = (reference->x[reference->n - 1], reference->y[reference->n - 1]) -----
-  	  if equ(s0, -1) {
-  		  // add down left point
-  		  lx = addNode(lx, (x_norm[reference->n-1] - tube_x_norm[reference->n-1]));
-  		  ly = addNode(ly, (reference->y[reference->n-1] - tube_size->y[reference->n-1]));
-  	  }
-  }
-  // add down right point
-  lx = addNode(lx, (x_norm[reference->n-1] + tube_x_norm[reference->n-1]));
-  ly = addNode(ly, (reference->y[reference->n-1] - tube_size->y[reference->n-1]));
-
-  // ===== 2. Remove points and add intersection points in case of backward order =====
-  int lisLen = listLen(ly);
-  double* tempLX = malloc(lisLen * sizeof(double));
-  if (tempLX == NULL){
-  	  fputs("Error: Failed to allocate memory for tempLX.\n", stderr);
-      exit(1);
-  }
-  double* tempLY = malloc(lisLen * sizeof(double));
-  if (tempLY == NULL){
-  	  fputs("Error: Failed to allocate memory for tempLY.\n", stderr);
-      exit(1);
+      // add no point for equal slopes of reference curve
+      if (!equ(m0, m1)) {
+        profile->corners[profile->nCorners] = i;
+        if (s0 != -1 && s1 != -1) {
+          profile->kinds[profile->nCorners] = CORNER_RISING;
+        } else if (s0 != 1 && s1 != 1) {
+          profile->kinds[profile->nCorners] = CORNER_FALLING;
+        } else if (s0 == -1 && s1 == 1) {
+          profile->kinds[profile->nCorners] = CORNER_MINIMUM;
+        } else {
+          profile->kinds[profile->nCorners] = CORNER_MAXIMUM;
+        }
+        profile->nCorners++;
+      }
+      s0 = s1;
+      m0 = m1;
+    }
+    profile->lastSign = s0;
   }
 
-  tempLX = getListValues(lx);
-  tempLY = getListValues(ly);
-  lower = removeLoop(tempLX, tempLY, lisLen, -1);
-  denormalize(lower.x, lower.n, dat_char.mag_x);
-
-  // Free the memory.
-  if (x_norm != NULL) free(x_norm);
-  if (tube_x_norm != NULL) free(tube_x_norm);
-
-  return lower;
+#undef X_NORM
+  return 0;
 }
 
+/*
+ * Function: freeProfile
+ * ---------------------
+ *   free the arrays of a profile and reset its number of corners to 0
+ *
+ *   profile: profile built with buildProfile
+ */
+void freeProfile(struct referenceProfile *profile) {
+  free(profile->corners);
+  free(profile->kinds);
+  profile->corners = NULL;
+  profile->kinds = NULL;
+  profile->nCorners = 0;
+}
 
 /*
- * Function: setUpper
+ * Function: getTubeProfile
  * ------------------------
- *   find the data set of upper tube curve
+ *   find the data sets of lower and upper tube curves from the analysis of
+ *   the reference curve: only the corners of the rectangles (which depend
+ *   on the tube size) are computed, at the points stored in the profile.
  *
- *   reference: reference data curve
- *   tube_size: struct specifying tube size
+ *   reference: pointer to reference data struct
+ *   profile: analysis of the reference (see buildProfile)
+ *   tube_size: pointer to tube_size struct (a single tube size is used
+ *              for all the points if tube_size->n is 1, see tubeSizeCount)
+ *   lower: data struct receiving the lower curve of the tube
+ *   upper: data struct receiving the upper curve of the tube
+ *          (the arrays of lower and upper are allocated by this function)
+ *   arena: arena of the call (NULL: the arrays of lower and upper are
+ *          allocated with malloc)
  *
- *   return : data set defining upper curve of the tube
+ *   return: 0 if there was success, -1 if the allocation failed
+ *           (lower and upper are then empty curves)
  */
-struct data getUpper(struct data *reference, struct data *tube_size) {
-  struct data upper;
-  node_t *ux = NULL;
-  node_t *uy = NULL;
-  size_t i, b;
+int getTubeProfile(
+  const struct data *reference,
+  const struct referenceProfile *profile,
+  const struct data *tube_size,
+  struct data *lower,
+  struct data *upper,
+  struct arena *arena
+) {
+  const double *y = reference->y;
+  const size_t n = reference->n;
+  const size_t stride = tube_size->n == 1 ? 0 : 1;
+  const size_t b = profile->first;
+  size_t c, i;
 
   /* Normalize values and tube size in x direction.
    * This was introduced in https://github.com/lbl-srg/funnel/pull/30
    * to guard against vanishing derivatives (dy/dx) for x values with a large order of magnitude.
+   * The normalized values are computed on the fly (no copy of the x values).
    */
-
-  struct data_char dat_char = get_data_char(reference);                   // Data characteristics
-  double *x_norm = (double *)malloc(sizeof(double) * reference->n);       // Normalized x values
-  double *tube_x_norm = (double *)malloc(sizeof(double) * tube_size->n);  // Normalized tube size in x direction
-  if ((x_norm == NULL) || (tube_x_norm == NULL)){
-	  fputs("Error: Failed to allocate memory for x_norm or tube_x_norm.\n", stderr);
-    exit(1);
+  const double mag_x = profile->dat_char.mag_x;
+#define X_NORM(ind) normalizeValue(reference->x[(ind)], mag_x)
+#define TUBE_X_NORM(ind) normalizeValue(tube_size->x[(ind) * stride], mag_x)
+#define TY(ind) tube_size->y[(ind) * stride]
+
+  /* Corner points: at most two per reference point (curveCapacity in compare.c) */
+  size_t capacity = 2 * n + 2;
+  struct data lc = newCurve(capacity, arena);
+  struct data uc = newCurve(capacity, arena);
+
+  if (lc.x == NULL || uc.x == NULL) {
+    freeCurve(&lc, arena);
+    freeCurve(&uc, arena);
+    *lower = lc;
+    *upper = uc;
+    return -1;
   }
-  memcpy(x_norm, reference->x, sizeof(double) * reference->n);
-  memcpy(tube_x_norm, tube_size->x, sizeof(double) * tube_size->n);
-  normalize(x_norm, reference->n, dat_char.mag_x);
-  normalize(tube_x_norm, tube_size->n, dat_char.mag_x);
 
   // ===== 1. add corner points of the rectangle =====
-  double m0, m1; // slopes before and after point i of reference curve
-  double s0, s1; // sign of slopes of reference curve: 1 - increasing, 0 - constant, -1 - decreasing
+  double xl, xr; // left and right x values of the rectangle
+
+  // ----- 1.1 Start: rectangle with center (x,y) = (reference->x[b], reference->y[b]) -----
+  // add down left and top left points
+  xl = X_NORM(b) - TUBE_X_NORM(b);
+  pushCorner(&lc, xl, y[b] - TY(b));
+  pushCorner(&uc, xl, y[b] + TY(b));
+
+  if (b+1 < n) {
+    xr = X_NORM(b) + TUBE_X_NORM(b);
+    if (profile->firstSign == 1) {
+      // add down right point
+      pushCorner(&lc, xr, y[b] - TY(b));
+    } else if (profile->firstSign == -1) {
+      // add top right point
+      pushCorner(&uc, xr, y[b] + TY(b));
+    }
 
-  // ----- 1.1 Start: rectangle with center (x,y) = (reference->x[0], reference->y[0]) -----
-  // ignore identical point at the beginning
-  b = 0;
-  while (((b+1)< reference->n) && equ(x_norm[b], x_norm[b+1]) && equ(reference->y[b], reference->y[b+1]))
-  {
-    b = b+1;
-  }
-  // add top left point
-  ux = addNode(ux,(x_norm[b] - tube_x_norm[b]));
-  uy = addNode(uy, (reference->y[b] + tube_size->y[b]));
-
-  if (b+1 < reference->n) {
-	  // slopes of reference curve (initialization)
-	  s0 = sign(reference->y[b+1] - reference->y[b]);
-	  if (!equ(x_norm[b+1], x_norm[b])) {
-		  m0 = (reference->y[b+1] - reference->y[b]) / (x_norm[b+1] - x_norm[b]);
-	  } else {
-		  m0 = (s0>0) ? 1e+15 : -1e+15;
-	  }
-	  if equ(s0, -1) {
-		  // add top right point
-		  ux = addNode(ux, (x_norm[b] + tube_x_norm[b]));
-		  uy = addNode(uy, (reference->y[b] + tube_size->y[b]));
-	  }
-
-	  // ----- 1.2 Iteration: rectangle with center (x,y) = (x_norm[i], reference->y[i]) -----
-	  for (i = b+1; i < reference->n-1; i++) {
-		  // ignore identical points
-		  if (equ(x_norm[i], x_norm[i+1]) && equ(reference->y[i], reference->y[i+1]))
-			  continue;
-
-		  // slopes of reference curve
-		  s1 = sign(reference->y[i+1] - reference->y[i]);
-		  if (!equ(x_norm[i+1], x_norm[i])) {
-			  m1 = (reference->y[i+1] - reference->y[i]) / (x_norm[i+1] - x_norm[i]);
-		  } else {
-			  m1 = (s1>0) ? (1e+15) : (-1e+15);
-		  }
-
-		  // add no point for equal slopes of reference curve
-		  if (!equ(m0, m1)) {
-			  if (!equ(s0, -1) && !equ(s1, -1)) {
-				  // add top left point
-				  ux = addNode(ux, (x_norm[i] - tube_x_norm[i]));
-				  uy = addNode(uy, (reference->y[i] + tube_size->y[i]));
-			  } else if (!equ(s0, 1) && !equ(s1, 1)) {
-				  // add top right point
-				  ux = addNode(ux, (x_norm[i] + tube_x_norm[i]));
-				  uy = addNode(uy, (reference->y[i] + tube_size->y[i]));
-			  } else if (equ(s0, 1) && equ(s1, -1)) {
-				  // add top left point
-				  ux = addNode(ux, (x_norm[i] - tube_x_norm[i]));
-				  uy = addNode(uy, (reference->y[i] + tube_size->y[i]));
-				  // add top right point
-				  ux = addNode(ux, (x_norm[i] + tube_x_norm[i]));
-				  uy = addNode(uy, (reference->y[i] + tube_size->y[i]));
-			  } else if (equ(s0, -1) && equ(s1, 1)) {
-				  // add top right point
-				  ux = addNode(ux, (x_norm[i] + tube_x_norm[i]));
-				  uy = addNode(uy, (reference->y[i] + tube_size->y[i]));
-				  // add top left point
-				  ux = addNode(ux, (x_norm[i] - tube_x_norm[i]));
-				  uy = addNode(uy, (reference->y[i] + tube_size->y[i]));
-			  }
-
-			  int len = listLen(uy);
-			  double lastY = getNth(uy, len-1);
-			  // remove the last added points in case of zero slope of tube curve
-			  if equ((reference->y[i+1] + tube_size->y[i+1]), lastY) {
-				  if (equ(s0 * s1, -1) && equ(getNth(uy, len-3), lastY)) {
-					  // remove two points, if two points were added at last
-					  // ((len-1) - 2 >= 0, because start point + two added points)
-					  lastNodeDeletion(ux);
-					  lastNodeDeletion(uy);
-					  lastNodeDeletion(ux);
-					  lastNodeDeletion(uy);
-				  } else if (!equ(s0 * s1, -1) && equ(getNth(uy, len-2), lastY)) {
-					  // remove one point, if one point was added at last
-					  // ((len-1) - 1 >= 0, because start point + one added point)
-					  lastNodeDeletion(ux);
-					  lastNodeDeletion(uy);
-				  }
-			  }
-		  }
-		  s0 = s1;
-		  m0 = m1;
-	  }
-	  // ----- 1.3. End: Rectangle with center (x,y) = (x_norm[reference->n - 1], reference->y[reference->n - 1]) -----
-	  if equ(s0, 1) {
-		  // add top left point
-		  ux = addNode(ux, (x_norm[reference->n-1] - tube_x_norm[reference->n-1]));
-		  uy = addNode(uy, (reference->y[reference->n-1] + tube_size->y[reference->n-1]));
-	  }
+    // ----- 1.2 Iteration: rectangles at the points with a change of slope -----
+    for (c = 0; c < profile->nCorners; c++) {
+      i = profile->corners[c];
+      xl = X_NORM(i) - TUBE_X_NORM(i);
+      xr = X_NORM(i) + TUBE_X_NORM(i);
+      switch (profile->kinds[c]) {
+        case CORNER_RISING:
+          // add down right point
+          pushCorner(&lc, xr, y[i] - TY(i));
+          // add top left point
+          pushCorner(&uc, xl, y[i] + TY(i));
+          break;
+        case CORNER_FALLING:
+          // add down left point
+          pushCorner(&lc, xl, y[i] - TY(i));
+          // add top right point
+          pushCorner(&uc, xr, y[i] + TY(i));
+          break;
+        case CORNER_MINIMUM:
+          // add down left point, down right point
+          pushCorner(&lc, xl, y[i] - TY(i));
+          pushCorner(&lc, xr, y[i] - TY(i));
+          // add top right point, top left point
+          pushCorner(&uc, xr, y[i] + TY(i));
+          pushCorner(&uc, xl, y[i] + TY(i));
+          break;
+        default:
+          // add down right point, down left point
+          pushCorner(&lc, xr, y[i] - TY(i));
+          pushCorner(&lc, xl, y[i] - TY(i));
+          // add top left point, top right point
+          pushCorner(&uc, xl, y[i] + TY(i));
+          pushCorner(&uc, xr, y[i] + TY(i));
+      }
+
+      // remove the last added points in case of zero slope of tube curve
+      removeZeroSlope(&lc, y[i+1] - TY(i+1), profile->kinds[c] >= CORNER_MINIMUM);
+      removeZeroSlope(&uc, y[i+1] + TY(i+1), profile->kinds[c] >= CORNER_MINIMUM);
+    }
+    // ----- 1.3. End: Rectangle with center (x,y) = (reference->x[n - 1], reference->y[n - 1]) -----
+    xl = X_NORM(n-1) - TUBE_X_NORM(n-1);
+    if (profile->lastSign == -1) {
+      // add down left point
+      pushCorner(&lc, xl, y[n-1] - TY(n-1));
+    } else if (profile->lastSign == 1) {
+      // add top left point
+      pushCorner(&uc, xl, y[n-1] + TY(n-1));
+    }
   }
-  // add top right point
-  ux = addNode(ux, (x_norm[reference->n-1] + tube_x_norm[reference->n-1]));
-  uy = addNode(uy, (reference->y[reference->n-1] + tube_size->y[reference->n-1]));
+  // add down right and top right points
+  xr = X_NORM(n-1) + TUBE_X_NORM(n-1);
+  pushCorner(&lc, xr, y[n-1] - TY(n-1));
+  pushCorner(&uc, xr, y[n-1] + TY(n-1));
+
+#undef X_NORM
+#undef TUBE_X_NORM
+#undef TY
 
   // ===== 2. Remove points and add intersection points in case of backward order =====
-  int lisLen = listLen(uy);
-  double* tempUX = malloc(lisLen * sizeof(double));
-  if (tempUX == NULL){
-	  fputs("Error: Failed to allocate memory for tempUX.\n", stderr);
-      exit(1);
+  if (removeLoop(&lc, capacity, -1, arena) != 0 || removeLoop(&uc, capacity, 1, arena) != 0) {
+    freeCurve(&lc, arena);
+    freeCurve(&uc, arena);
+    *lower = lc;
+    *upper = uc;
+    return -1;
   }
-  double* tempUY = malloc(lisLen * sizeof(double));
-  if (tempUY == NULL){
-  	  fputs("Error: Failed to allocate memory for tempUY.\n", stderr);
-      exit(1);
+  denormalize(lc.x, lc.n, mag_x);
+  denormalize(uc.x, uc.n, mag_x);
+
+  *lower = lc;
+  *upper = uc;
+  return 0;
+}
+
+/*
+ * Function: getTube
+ * -----------------
+ *   find the data sets of lower and upper tube curves.
+ *   Both curves are built in the same sweep over the reference points:
+ *   the slopes of the reference curve are computed only once
+ *   (see buildProfile and getTubeProfile).
+ *
+ *   reference: pointer to reference data struct
+ *   tube_size: pointer to tube_size struct
+ *   dat_char: data characteristics of the reference (see get_data_char)
+ *   lower: data struct receiving the lower curve of the tube
+ *   upper: data struct receiving the upper curve of the tube
+ *          (the arrays of lower and upper are allocated by this function)
+ *   arena: arena of the call (NULL: the arrays of lower and upper are
+ *          allocated with malloc)
+ *
+ *   return: 0 if there was success, -1 if the allocation failed
+ *           (lower and upper are then empty curves)
+ */
+int getTube(
+  struct data *reference,
+  struct data *tube_size,
+  struct data_char dat_char,
+  struct data *lower,
+  struct data *upper,
+  struct arena *arena
+) {
+  struct referenceProfile profile;
+  int retVal;
+
+  if (buildProfile(reference, dat_char, &profile, arena) != 0) {
+    lower->x = lower->y = upper->x = upper->y = NULL;
+    lower->n = upper->n = 0;
+    return -1;
   }
+  retVal = getTubeProfile(reference, &profile, tube_size, lower, upper, arena);
+  if (arena == NULL) freeProfile(&profile);
+  return retVal;
+}
 
-  tempUX = getListValues(ux);
-  tempUY = getListValues(uy);
-  upper = removeLoop(tempUX, tempUY, lisLen, 1);
-  denormalize(upper.x, upper.n, dat_char.mag_x);
+/*
+ * Curve edited in place by removeLoop.
+ * The points are stored in a gap buffer: the points of logical index lower
+ * than w are stored in [0, w), the following ones in [r, e).
+ * Removing the points around the gap, or inserting a point in the gap,
+ * does not move any other point.
+ */
+struct gapCurve {
+  double *x;
+  double *y;
+  ptrdiff_t w;          /* end of the points before the gap */
+  ptrdiff_t r;          /* start of the points after the gap */
+  ptrdiff_t e;          /* end of the points after the gap */
+  ptrdiff_t capacity;   /* allocated size of the arrays */
+  struct arena *arena;  /* arena of the arrays (NULL: allocated with malloc) */
+};
+
+/* Value of the array at the logical index ind of the curve */
+static inline double gapAt(const struct gapCurve *c, const double *arr, ptrdiff_t ind) {
+  return (ind < c->w) ? arr[ind] : arr[c->r + ind - c->w];
+}
 
-  // Free the memory.
-  if (x_norm != NULL) free(x_norm);
-  if (tube_x_norm != NULL) free(tube_x_norm);
+/*
+ * Function: moveGap
+ * -----------------
+ *   move the gap forward so that it starts at logical index ind (ind >= w)
+ */
+static void moveGap(struct gapCurve *c, ptrdiff_t ind) {
+  ptrdiff_t count = ind - c->w;
+  if (count <= 0) return;
+  if (c->r > c->w) {
+    memmove(c->x + c->w, c->x + c->r, sizeof(double) * count);
+    memmove(c->y + c->w, c->y + c->r, sizeof(double) * count);
+  }
+  c->w += count;
+  c->r += count;
+}
+
+/*
+ * Function: openGap
+ * -----------------
+ *   ensure the gap can hold at least size points, by moving the points after
+ *   the gap to the end of the arrays (reallocated if needed)
+ *
+ *   return: 0 if there was success, -1 if the reallocation failed
+ *           (the curve is then unchanged, its arrays are still valid)
+ */
+static int openGap(struct gapCurve *c, ptrdiff_t size) {
+  ptrdiff_t tail = c->e - c->r;
+  double *x, *y;
+  if (c->r - c->w >= size) return 0;
+  if (c->capacity - c->w - tail < size) {
+    const size_t oldSize = sizeof(double) * c->capacity;
+    const ptrdiff_t capacity = c->w + tail + size + c->capacity / 2;
+    x = arenaRealloc(c->arena, c->x, oldSize, sizeof(double) * capacity);
+    if (x == NULL) return -1;
+    c->x = x;
+    y = arenaRealloc(c->arena, c->y, oldSize, sizeof(double) * capacity);
+    if (y == NULL) return -1;
+    c->y = y;
+    c->capacity = capacity;
+  }
+  memmove(c->x + c->capacity - tail, c->x + c->r, sizeof(double) * tail);
+  memmove(c->y + c->capacity - tail, c->y + c->r, sizeof(double) * tail);
+  c->r = c->capacity - tail;
+  c->e = c->capacity;
+  return 0;
+}
 
-  return upper;
+/*
+ * Function: replaceRange
+ * ----------------------
+ *   replace the points of logical index [staInd, endInd) by the points
+ *   following them, i.e. remove endInd - staInd points if staInd <= endInd
+ *   (the points [endInd, staInd) are repeated otherwise, as the original
+ *   removeRange function did with a negative count)
+ *   Requires w <= endInd if staInd < w.
+ *
+ *   return: 0 if there was success, -1 if the reallocation failed (see openGap)
+ */
+static int replaceRange(struct gapCurve *c, ptrdiff_t staInd, ptrdiff_t endInd) {
+  if (staInd < c->w) {
+    c->r += endInd - c->w;
+    c->w = staInd;
+    return 0;
+  }
+  moveGap(c, staInd);
+  if (endInd >= staInd) {
+    c->r += endInd - staInd;
+  } else {
+    if (openGap(c, staInd - endInd) != 0) return -1;
+    c->r -= staInd - endInd;
+    memcpy(c->x + c->r, c->x + endInd, sizeof(double) * (staInd - endInd));
+    memcpy(c->y + c->r, c->y + endInd, sizeof(double) * (staInd - endInd));
+  }
+  return 0;
 }
 
  /*
   * Function: removeLoop
   * --------------------
-  *   remove points and add intersection points in case of backward order
+  *   remove points and add intersection points in case of backward order.
+  *   The curve is updated in place: the arrays are reallocated only in the
+  *   degenerated case where the number of points increases.
   *
-  *   X: x values of curve
-  *   Y: y values of curve
-  *   size: size of curve array
+  *   curve: curve data (the arrays must be allocated from arena)
+  *   capacity: allocated size of the arrays of curve
   *   curInd: if equals to 1, algorithms for upper tube curve is used,
   *           if equals to -1, algorithms for lower tube curve is used
+  *   arena: arena of the call (NULL: the arrays are allocated with malloc)
   *
-  *   return: data structure including updated curve data sets (X, Y, size)
+  *   return: 0 if there was success, -1 if the reallocation failed
+  *           (the arrays of curve are still valid, to be released by the caller)
   */
- struct data removeLoop(double* X, double* Y, int size, int curInd) {
-   struct data output;
-   int j = 1;
-   int countLoops = 0;
-   int re_size = size;
+ int removeLoop(struct data *curve, size_t capacity, int curInd, struct arena *arena) {
+   struct gapCurve c = {curve->x, curve->y, 0, 0, (ptrdiff_t)curve->n, (ptrdiff_t)capacity, arena};
+   ptrdiff_t j = 1;
+   ptrdiff_t countLoops = 0;
+   ptrdiff_t re_size = (ptrdiff_t)curve->n;
+   int retVal = 0;
+
+#define X(ind) gapAt(&c, c.x, (ind))
+#define Y(ind) gapAt(&c, c.y, (ind))
 
    while (j < re_size -2) {
+     // Keep the gap before the current segment: all the points before j+1
+     // that may be removed are then stored before the gap.
      // Find backward segment (j, j+1)
-     if (X[j+1] < X[j]) {
+     if (X(j+1) < X(j)) {
 
        countLoops = countLoops + 1;
        // ===== 1. Find i, k, such that i <= j<j+1 <= k-1 and segment (i-1, i) intersect segment (k-1, k) =====
-       int i, k, iPrevious;
+       ptrdiff_t i, k, iPrevious;
        double y;
        // for calculation and adding of intersection point
        bool addPoint = true;
        double ix = 0;
        double iy = 0;
-       int kMax;
+       ptrdiff_t kMax;
 
        i = j;
        iPrevious = i;
 
        // Find initial value for i = i_s, such that X[i_s-1]  <= X[j+1] < X[i_s]
        // it holds: i element of interval (i_s, j)
-       while (X[j+1] < X[i-1])
+       while (i > 1 && X(j+1) < X(i-1))
          i = i-1;
        // j+1 < k <= kMax
        kMax = j+1;
-       while (X[kMax] < X[j] && kMax < re_size-1)  //=============================re_size
+       while (X(kMax) < X(j) && kMax < re_size-1)
          kMax = kMax+1;
 
        // initial value for k
        k = j+1;
-       y = Y[i-1];
+       y = Y(i-1);
 
        // Find k
-       while (((curInd==-1 && y < Y[k]) || (curInd==1 && Y[k] < y))
+       while (((curInd==-1 && y < Y(k)) || (curInd==1 && Y(k) < y))
            && k < kMax) {
          iPrevious = i;
          k = k+1;
-         while ((X[i] < X[k]
-                  || (curInd==-1 && equ(X[i], X[k]) && Y[i] < Y[k] && !(k + 1 < re_size && equ(X[k], X[k + 1]) && Y[k + 1] < Y[k]))
-                  || (curInd==1 && equ(X[i], X[k]) && Y[i] > Y[k] && !(k + 1 < re_size && equ(X[k], X[k + 1]) && Y[k + 1] > Y[k])))
+         while ((X(i) < X(k)
+                  || (curInd==-1 && equ(X(i), X(k)) && Y(i) < Y(k) && !(k + 1 < re_size && equ(X(k), X(k + 1)) && Y(k + 1) < Y(k)))
+                  || (curInd==1 && equ(X(i), X(k)) && Y(i) > Y(k) && !(k + 1 < re_size && equ(X(k), X(k + 1)) && Y(k + 1) > Y(k))))
              && i < j)
            i = i+1;
          // it holds X[i - 1] < X[k] <= X[i], particularly X[i] != X[i - 1]
          // for i < j and X[i - 1] < X[k] it holds X[i - 1] < X[k] <= X[i], particularly X[i] != X[i - 1]
          // linear interpolation of (x, y) = (X[k], y) on segment (i - 1, i)
-         if (!equ(X[i], X[i - 1]))
-           y = (Y[i] - Y[i - 1]) / (X[i] - X[i - 1]) * (X[k] - X[i - 1]) + Y[i - 1];
+         if (!equ(X(i), X(i - 1)))
+           y = (Y(i) - Y(i - 1)) / (X(i) - X(i - 1)) * (X(k) - X(i - 1)) + Y(i - 1);
          else
-           y = Y[i];
+           y = Y(i);
        }
 
        // k located: intersection point is on segment (k - 1, k)
@@ -619,19 +674,19 @@ struct data getUpper(struct data *reference, struct data *tube_size) {
        // Special case handling: assure, that i - 1 >= 0
        else
          i = iPrevious;
-       if (!equ(X[k], X[k - 1]))
+       if (!equ(X(k), X(k - 1)))
            // linear interpolation of (x, y) = (X[i], y) on segment (k - 1, k)
-         y = (Y[k] - Y[k - 1]) / (X[k] - X[k - 1]) * (X[i] - X[k - 1]) + Y[k - 1];
+         y = (Y(k) - Y(k - 1)) / (X(k) - X(k - 1)) * (X(i) - X(k - 1)) + Y(k - 1);
        // it holds Y[i] = Y[iPrevious - 1] < Y[k - 1]
        // Find i
-       while ((!equ(X[k], X[k - 1])
-                   && ((curInd==-1 && Y[i] < y) || (curInd==1 && y < Y[i])))
-           || (equ(X[k], X[k - 1]) && X[i] < X[k]))
+       while ((!equ(X(k), X(k - 1))
+                   && ((curInd==-1 && Y(i) < y) || (curInd==1 && y < Y(i))))
+           || (equ(X(k), X(k - 1)) && X(i) < X(k)))
        {
          i = i+1;
-           if (!equ(X[k], X[k - 1]))
+           if (!equ(X(k), X(k - 1)))
              // linear interpolation of (x, y) = (X[i], y) on segment (k - 1, k)
-               y = (Y[k] - Y[k - 1]) / (X[k] - X[k - 1]) * (X[i] - X[k - 1]) + Y[k - 1];
+               y = (Y(k) - Y(k - 1)) / (X(k) - X(k - 1)) * (X(i) - X(k - 1)) + Y(k - 1);
        }
 
        // ===== 2. Calculate intersection point (ix, iy) of segments (i - 1, i) and (k - 1, k) =====
@@ -639,32 +694,32 @@ struct data getUpper(struct data *reference, struct data *tube_size) {
        double a2 = 0;
 
        // both branches vertical
-       if (equ(X[i], X[i - 1]) && equ(X[k], X[k - 1]))
+       if (equ(X(i), X(i - 1)) && equ(X(k), X(k - 1)))
          // add no point; check if case occur: slopes have different signs
          addPoint = false;
        // case i-branch vertical
-       else if equ(X[i], X[i - 1]) {
-         ix = X[i];
-         iy = Y[k - 1] + ((X[i] - X[k - 1]) * (Y[k] - Y[k - 1])) / (X[k] - X[k - 1]);
+       else if equ(X(i), X(i - 1)) {
+         ix = X(i);
+         iy = Y(k - 1) + ((X(i) - X(k - 1)) * (Y(k) - Y(k - 1))) / (X(k) - X(k - 1));
        }
        // case k-branch vertical
-       else if equ(X[k], X[k - 1]) {
-         ix = X[k];
-         iy = Y[i - 1] + ((X[k] - X[i - 1]) * (Y[i] - Y[i - 1])) / (X[i] - X[i - 1]);
+       else if equ(X(k), X(k - 1)) {
+         ix = X(k);
+         iy = Y(i - 1) + ((X(k) - X(i - 1)) * (Y(i) - Y(i - 1))) / (X(i) - X(i - 1));
        }
        // common case
        else {
-         a1 = (Y[i] - Y[i - 1]) / (X[i] - X[i - 1]); // slope of segment (i - 1, i)
-         a2 = (Y[k] - Y[k - 1]) / (X[k] - X[k - 1]); // slope of segment (k - 1, k)
+         a1 = (Y(i) - Y(i - 1)) / (X(i) - X(i - 1)); // slope of segment (i - 1, i)
+         a2 = (Y(k) - Y(k - 1)) / (X(k) - X(k - 1)); // slope of segment (k - 1, k)
          // common case: no equal slopes
          if (!equ(a1, a2)) {
-           ix = (a1 * X[i - 1] - a2 * X[k - 1] - Y[i - 1] + Y[k - 1]) / (a1 - a2);
+           ix = (a1 * X(i - 1) - a2 * X(k - 1) - Y(i - 1) + Y(k - 1)) / (a1 - a2);
            if (fabs(a1) > fabs(a2))
              // calculate y on segment (k - 1, k)
-             iy = a2 * (ix - X[k - 1]) + Y[k - 1];
+             iy = a2 * (ix - X(k - 1)) + Y(k - 1);
            else
              // calculate y on segment (i - 1, i)
-             iy = a1 * (ix - X[i - 1]) + Y[i - 1];
+             iy = a1 * (ix - X(i - 1)) + Y(i - 1);
          }
          else
            // case equal slopes: add no point
@@ -672,218 +727,45 @@ struct data getUpper(struct data *reference, struct data *tube_size) {
        }
 
        // ===== 3. Delete points i until (including) k-1 =====
-       int count = k-i;
-       double* XX = malloc((re_size-count) * sizeof(double));
-       if (XX == NULL){
-    	   fputs("Error: Failed to allocate memory for XX.\n", stderr);
-           exit(1);
-       }
-       XX = removeRange(X, re_size, i, count);
-       double* YY = malloc((size-count) * sizeof(double));
-       if (YY == NULL){
-           fputs("Error: Failed to allocate memory for YY.\n", stderr);
-           exit(1);
-       }
-       YY = removeRange(Y, re_size, i, count);
-       re_size = re_size-count;
+       // the gap then starts at i
+       retVal = replaceRange(&c, i, k);
+       if (retVal != 0) break;
+       re_size = re_size - (k - i);
        // ===== 4. Add intersection point =====
        // add intersection point, if it isn't already there
-       if (addPoint && (!equ(XX[i], ix) || !equ(YY[i], iy))) {
+       if (addPoint && (!equ(X(i), ix) || !equ(Y(i), iy))) {
+         retVal = openGap(&c, 1);
+         if (retVal != 0) break;
+         c.x[c.w] = ix;
+         c.y[c.w] = iy;
+         c.w++;
          re_size = re_size+1;
-         double *X_temp = malloc(re_size * sizeof(double));
-         if (X_temp == NULL){
-        	 fputs("Error: Failed to allocate memory for X_temp.\n", stderr);
-             exit(1);
-         }
-         double *Y_temp = malloc(re_size * sizeof(double));
-         if (Y_temp == NULL){
-        	 fputs("Error: Failed to allocate memory for Y_temp.\n", stderr);
-        	 exit(1);
-         }
-         X_temp = insertAt(XX, re_size-1, i, ix);
-         Y_temp = insertAt(YY, re_size-1, i, iy);
-
-         XX = realloc(XX, sizeof(double)*re_size);
-         if (XX == NULL){
-        	 fputs("Error: Failed to reallocate memory for XX.\n", stderr);
-        	 exit(1);
-         }
-         YY = realloc(YY, sizeof(double)*re_size);
-         if (YY == NULL){
-        	 fputs("Error: Failed to reallocate memory for YY.\n", stderr);
-        	 exit(1);
-         }
-         XX = X_temp;
-         YY = Y_temp;
        }
 
        // ===== 5. set j = i =====
        j = i;
 
        // ===== 6. Delete points that are doubled =====
-       if (equ(XX[i-1], XX[i]) && equ(YY[i-1], YY[i])) {
+       if (equ(X(i-1), X(i)) && equ(Y(i-1), Y(i))) {
+         retVal = replaceRange(&c, i, i + 1);
+         if (retVal != 0) break;
          re_size = re_size-1;
-         double *X_temp = malloc(re_size * sizeof(double));
-         if (X_temp == NULL){
-        	 fputs("Error: Failed to allocate memory for X_temp.\n", stderr);
-        	 exit(1);
-         }
-         double *Y_temp = malloc(re_size * sizeof(double));
-         if (Y_temp == NULL){
-        	 fputs("Error: Failed to allocate memory for Y_temp.\n", stderr);
-        	 exit(1);
-         }
-         X_temp = removeAt(XX, re_size+1, i);
-         Y_temp = removeAt(YY, re_size+1, i);
-
-         XX = realloc(XX, sizeof(double)*re_size);
-         if (XX == NULL){
-        	 fputs("Error: Failed to reallocate memory for XX.\n", stderr);
-        	 exit(1);
-         }
-         YY = realloc(YY, sizeof(double)*re_size);
-         if (YY == NULL){
-        	 fputs("Error: Failed to reallocate memory for YY.\n", stderr);
-        	 exit(1);
-         }
-         XX = X_temp;
-         YY = Y_temp;
          j = i - 1;
        }
-       X = realloc(X, sizeof(double)*re_size);
-       if (X == NULL){
-    	   fputs("Error: Failed to reallocate memory for X.\n", stderr);
-    	   exit(1);
-       }
-       Y = realloc(Y, sizeof(double)*re_size);
-       if (Y == NULL){
-    	   fputs("Error: Failed to reallocate memory for Y.\n", stderr);
-    	   exit(1);
-       }
-       X = XX;
-       Y = YY;
      }
      j=j+1;
    }
-   output.x = X;
-   output.y = Y;
-   output.n = re_size;
-   return output;
- }
 
+#undef X
+#undef Y
 
-/*
- * Function: removeRange
- * ---------------------
- *   remove a range of elements from array
- *
- *   array: original array
- *   size: original array size
- *   staInd: zero-based starting index of the range of elements to remove
- *   count: the number of elements to remove
- *
- *   return: updated array with specified length of elements being removed
- */
-double * removeRange(double* array, int size, int staInd, int count) {
-  int i;
-  double* updArr = malloc((size-count) * sizeof(double));
-  if (updArr == NULL){
-	  fputs("Error: Failed to allocate memory for updArr.\n", stderr);
-	  exit(1);
-  }
-  if (!((staInd+count) <= size)) {
-    fputs("Deletion not possible!\n", stderr);
-    exit(1);
-  } else {
-    for (i=0; i<staInd; i++) {
-      updArr[i] = array[i];
-    }
-    if (staInd+count != size) {
-      for (i=staInd; i<(size-count); i++) {
-        updArr[i] = array[i+count];
-      }
-    }
-  }
-  return updArr;
-}
-
-
-/*
- * Function: removeAt
- * ------------------
- *   remove element at the specified index from array
- *
- *   array: original array
- *   size: original array size
- *   ind: zero-based index of the element to remove
- *
- *   return: updated array with specified element being removed
- */
-double * removeAt(double* array, int size, int ind) {
-  int i;
-  double* updArr = malloc((size-1) * sizeof(double));
-  if (updArr == NULL){
-  	  fputs("Error: Failed to allocate memory for updArr.\n", stderr);
-  	  exit(1);
-  }
-  if (ind > size-1) {
-    fputs("Deletion not possible!\n", stderr);
-    exit(1);
-  } else {
-    if (ind == size-1) {
-      for (i=0; i<size-1; i++) {
-        updArr[i] = array[i];
-      }
-    } else {
-      for (i=0; i<ind; i++) {
-        updArr[i] = array[i];
-      }
-      for (i=ind; i<size-1; i++) {
-        updArr[i] = array[i+1];
-      }
-    }
-  }
-  return updArr;
-}
-
-
-/*
- * Function: insertAt
- * ------------------
- *   insert element into the array at the specified index
- *
- *   array: original array
- *   size: original array size
- *   index: zero-based index at which item should be inserted
- *   item: the object to insert
- *
- *   return: updated array with new element being added at specified position
- */
-double * insertAt(double* array, int size, int index, double item) {
-  int i;
-  double* updArr = malloc((size+1) * sizeof(double));
-  if (updArr == NULL){
-	  fputs("Error: Failed to allocate memory for updArr.\n", stderr);
-	  exit(1);
-  }
-  if (index > size) {
-    fputs("Insert not possible!\n", stderr);
-    exit(1);
-  } else {
-    if (index == size) {
-      for (i=0; i<size; i++) {
-        updArr[i] = array[i];
-      }
-      updArr[size] = item;
-    } else {
-      for (i=0; i<index; i++) {
-        updArr[i] = array[i];
-      }
-      updArr[index] = item;
-      for (i=index; i<size; i++) {
-        updArr[i+1] = array[i];
-      }
-    }
-  }
-  return updArr;
-}
+   // Close the gap.
+   if (c.r > c.w) {
+     memmove(c.x + c.w, c.x + c.r, sizeof(double) * (c.e - c.r));
+     memmove(c.y + c.w, c.y + c.r, sizeof(double) * (c.e - c.r));
+   }
+   curve->x = c.x;
+   curve->y = c.y;
+   curve->n = re_size;
+   return retVal;
+ }
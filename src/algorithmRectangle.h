@@ -8,33 +8,35 @@
 #ifndef ALGORITHMRECTANGLE_H_
 #define ALGORITHMRECTANGLE_H_
 
-typedef struct node {
-  double val;
-  struct node * next;
-} node_t;
-
-node_t * createNode();
-
-node_t * addNode(node_t* head, double newVal);
-
-int listLen(node_t* head);
-
-double getNth(node_t* head, int index);
-
-double * getListValues(node_t* head);
-
-void lastNodeDeletion(node_t* head);
-
-struct data getLower(struct data *reference, struct data *tube_size);
-
-struct data getUpper(struct data *reference, struct data *tube_size);
-
-struct data removeLoop(double* x, double* y, int size, int curInd);
-
-double * removeRange(double* array, int size, int staInd, int count);
-
-double * removeAt(double* array, int size, int ind);
-
-double * insertAt(double* array, int size, int index, double item);
+uint64_t hashReference(const struct data *reference);
+
+int buildProfile(
+  const struct data *reference,
+  struct data_char dat_char,
+  struct referenceProfile *profile,
+  struct arena *arena
+);
+
+void freeProfile(struct referenceProfile *profile);
+
+int getTubeProfile(
+  const struct data *reference,
+  const struct referenceProfile *profile,
+  const struct data *tube_size,
+  struct data *lower,
+  struct data *upper,
+  struct arena *arena
+);
+
+int getTube(
+  struct data *reference,
+  struct data *tube_size,
+  struct data_char dat_char,
+  struct data *lower,
+  struct data *upper,
+  struct arena *arena
+);
+
+int removeLoop(struct data *curve, size_t capacity, int curInd, struct arena *arena);
 
 #endif /* ALGORITHMRECTANGLE_H_ */
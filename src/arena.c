@@ -0,0 +1,145 @@
+/*
+ * arena.c
+ *
+ * Functions:
+ * ----------
+ *   initArena: initialize an arena without any block
+ *   arenaAlloc: allocate an array from an arena
+ *   arenaRealloc: resize an array allocated from an arena
+ *   releaseArena: free all the arrays allocated from an arena
+ *
+ * The arrays are allocated one after the other in blocks of ARENA_BLOCK_SIZE
+ * bytes, and are never freed individually: all the blocks are freed at once
+ * by releaseArena, at the end of the library call. The statistics (peak size
+ * of the blocks and number of allocations) are accumulated over the calls
+ * made with the same arena: they are never reset by these functions.
+ * With a NULL arena, the functions fall back to malloc and realloc, so that
+ * the same code can build arrays returned to the caller (such as the curves
+ * of a tube built with buildTube) or released within a loop.
+ */
+
+#include <stdlib.h>
+#include <string.h>
+#include <stdint.h>
+
+#include "data_structure.h"
+#include "arena.h"
+
+struct arenaBlock {
+  struct arenaBlock *previous;  /* Block allocated before this one */
+  size_t size;                  /* Size of the data of the block */
+  size_t used;                  /* Size of the data already allocated */
+  size_t last;                  /* Offset of the last array allocated in the block */
+};
+
+/* Alignment of the arrays (suitable for any type stored in the arrays) */
+#define ARENA_ALIGNMENT 16
+#define ALIGN(size) (((size) + ARENA_ALIGNMENT - 1) / ARENA_ALIGNMENT * ARENA_ALIGNMENT)
+
+/* Data of a block, stored after its header */
+#define BLOCK_DATA(block) ((char *)(block) + ALIGN(sizeof(struct arenaBlock)))
+
+/*
+ * Function: initArena
+ * -------------------
+ *   initialize an arena without any block (the statistics are kept)
+ *
+ *   arena: arena to initialize
+ */
+void initArena(struct arena *arena) {
+  arena->block = NULL;
+  arena->bytes = 0;
+}
+
+/*
+ * Function: arenaAlloc
+ * --------------------
+ *   allocate an array from an arena, in the current block if it has enough
+ *   space left, in a new block otherwise
+ *
+ *   arena: arena of the call (NULL: the array is allocated with malloc)
+ *   size: size of the array in bytes
+ *
+ *   return: pointer to the array, NULL if the allocation failed
+ */
+void *arenaAlloc(struct arena *arena, size_t size) {
+  struct arenaBlock *block;
+  size_t blockSize;
+  void *ptr;
+
+  if (arena == NULL) return malloc(size);
+  if (size > SIZE_MAX / 2) return NULL;
+  size = ALIGN(size > 0 ? size : 1);
+  block = arena->block;
+  if (block == NULL || block->size - block->used < size) {
+    blockSize = size > ARENA_BLOCK_SIZE ? size : ARENA_BLOCK_SIZE;
+    block = malloc(ALIGN(sizeof(struct arenaBlock)) + blockSize);
+    if (block == NULL) return NULL;
+    block->previous = arena->block;
+    block->size = blockSize;
+    block->used = 0;
+    block->last = 0;
+    arena->block = block;
+    arena->bytes += ALIGN(sizeof(struct arenaBlock)) + blockSize;
+    if (arena->bytes > arena->peakBytes) arena->peakBytes = arena->bytes;
+  }
+  ptr = BLOCK_DATA(block) + block->used;
+  block->last = block->used;
+  block->used += size;
+  arena->allocations++;
+  return ptr;
+}
+
+/*
+ * Function: arenaRealloc
+ * ----------------------
+ *   resize an array allocated from an arena. The last array of the current
+ *   block is resized in place if the block has enough space left, any other
+ *   array is copied into a new array (the previous one is only released with
+ *   the arena).
+ *
+ *   arena: arena of the call (NULL: the array is reallocated with realloc)
+ *   ptr: array allocated from arena (or NULL)
+ *   oldSize: size of the array in bytes
+ *   size: new size of the array in bytes
+ *
+ *   return: pointer to the array, NULL if the allocation failed
+ *           (ptr is then left unchanged)
+ */
+void *arenaRealloc(struct arena *arena, void *ptr, size_t oldSize, size_t size) {
+  struct arenaBlock *block;
+  void *newPtr;
+
+  if (arena == NULL) return realloc(ptr, size);
+  if (ptr == NULL) return arenaAlloc(arena, size);
+  block = arena->block;
+  if (block != NULL && (char *)ptr == BLOCK_DATA(block) + block->last &&
+      size <= SIZE_MAX / 2 && block->size - block->last >= ALIGN(size > 0 ? size : 1)) {
+    block->used = block->last + ALIGN(size > 0 ? size : 1);
+    return ptr;
+  }
+  newPtr = arenaAlloc(arena, size);
+  if (newPtr != NULL) memcpy(newPtr, ptr, oldSize < size ? oldSize : size);
+  return newPtr;
+}
+
+/*
+ * Function: releaseArena
+ * ----------------------
+ *   free all the arrays allocated from an arena at once. The arena can be
+ *   used again.
+ *
+ *   arena: arena of the call
+ */
+void releaseArena(struct arena *arena) {
+  struct arenaBlock *block = arena->block;
+  struct arenaBlock *previous;
+
+  while (block != NULL) {
+    previous = block->previous;
+    free(block);
+    block = previous;
+  }
+  arena->block = NULL;
+  arena->bytes = 0;
+}
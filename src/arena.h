@@ -0,0 +1,25 @@
+/*
+ * arena.h
+ *
+ *  Allocation of the temporary arrays of a library call from an arena
+ *  released in one step, so that a process calling the library many times
+ *  does not grow with leaked or fragmented temporary arrays.
+ */
+
+#ifndef ARENA_H_
+#define ARENA_H_
+
+#include "data_structure.h"
+
+/* Size of the blocks of an arena (larger arrays are allocated in a block of their own) */
+#define ARENA_BLOCK_SIZE 65536
+
+void initArena(struct arena *arena);
+
+void *arenaAlloc(struct arena *arena, size_t size);
+
+void *arenaRealloc(struct arena *arena, void *ptr, size_t oldSize, size_t size);
+
+void releaseArena(struct arena *arena);
+
+#endif /* ARENA_H_ */
@@ -5,6 +5,32 @@
 #define equ(a,b) (fabs((a)-(b)) < 1e-10 ? true : false)  /* (b) required by Win32 compiler for <0 values */
 #endif
 
+#ifndef min
+#define min(a,b) ((a) < (b) ? (a) : (b))
+#endif
+
+#ifndef max
+#define max(a,b) ((a) > (b) ? (a) : (b))
+#endif
+
+/* Maximum number of doublings of the tolerance searched by findMinTolerance */
+#define MAX_DOUBLINGS 64
+
+/* Buffers used to compare CSV files chunk by chunk (see compareFiles) */
+struct chunks {
+  struct data ref;            /* Reference points of the current window */
+  struct data size;           /* Tube size of the reference points of the current window */
+  size_t capacity;            /* Capacity of ref and size */
+  size_t chunkSize;           /* Capacity of test and errors */
+  struct data test;           /* Current chunk of test points */
+  size_t testPos;             /* Index of the next test point to validate */
+  struct errorReport errors;  /* Errors of the current chunk of test points */
+  int sortedReference;        /* 1 if the reference x values never decrease (see scanFiles) */
+};
+
+/* Output files of compareFiles */
+enum {REFERENCE_FILE, TEST_FILE, ERRORS_FILE, LOWER_FILE, UPPER_FILE, N_FILES};
+
 /*
  * Function: buildPath
  * -----------------------
@@ -12,11 +38,15 @@
  *
  *   outDir: directory of file
  *   fileName: file name
+ *   ctx: context of the call (the path is allocated from its arena)
+ *
+ *   return: path, NULL if the allocation failed
  */
 
 char *buildPath(
   const char *outDir,
-  const char *fileName
+  const char *fileName,
+  struct context *ctx
 ) {
   const char lastChar = outDir[(strlen(outDir)-1)];
   #ifdef _WIN32
@@ -28,12 +58,13 @@ char *buildPath(
 
   char *fname = NULL;
   if (addSlash)
-    fname = (char*)malloc((strlen(outDir) + strlen(fileName) + 2) * sizeof(char));
+    fname = (char*)arenaAlloc(&ctx->arena, (strlen(outDir) + strlen(fileName) + 2) * sizeof(char));
   else
-    fname = (char*)malloc((strlen(outDir) + strlen(fileName) + 1) * sizeof(char));
+    fname = (char*)arenaAlloc(&ctx->arena, (strlen(outDir) + strlen(fileName) + 1) * sizeof(char));
 
   if (fname == NULL){
-    perror("Error: Failed to allocate memory for fname in writeToFile.");
+    logError(ctx, "Error: Failed to allocate memory for the path of '%s'.\n", fileName);
+    return NULL;
   }
 
   strcpy(fname, outDir);
@@ -52,58 +83,72 @@ char *buildPath(
 }
 
 /*
- * Function: init_log
+ * Function: writeToFile
  * -----------------------
- *   opens a file for logging the numerical processing errors
- *   (all other errors like memory, file access, bad argument...
- *   are still output to stderr.)
+ *   write input data structure to files
  *
- *   outDir: directory of logging file
- *   fileName: logging file name
+ *   outDir: directory to save the output files
+ *   fileName: file name for storing base CSV data
+ *   data: data to be written
+ *   ctx: context of the current call
  */
 
-FILE *init_log(
+int writeToFile(
   const char *outDir,
-  const char *fileName
+  const char *fileName,
+  struct data *data,
+  struct context *ctx
 ) {
-  char *fname = buildPath(outDir, fileName);
-  FILE *fil = fopen(fname, "w+");
-  if (fname != NULL) free(fname);
+  size_t i = 0;
 
+  char *fname = buildPath(outDir, fileName, ctx);
+  FILE *fil;
+
+  if (fname == NULL) return -1;
+  fil = fopen(fname, "w+");
   if (fil == NULL){
-    perror("Error: Failed to open log.\n");
+    logError(ctx, "Error: Failed to open '%s' in writeToFile.\n", fileName);
+    return -1;
+  }
+
+  fprintf(fil, "%s\n", "x,y");
+  for (i = 0; i < data->n; i++) {
+    fprintf(fil, "%.16g,%.16g\n", data->x[i], data->y[i]);
   }
 
-  return fil;
+  fclose(fil);
+
+  return 0;
 }
 
 /*
- * Function: writeToFile
+ * Function: appendToFile
  * -----------------------
- *   write input data structure to files
+ *   append input data structure to a file with the same format as
+ *   writeToFile (the header is only written if the file is empty)
  *
- *   outDir: directory to save the output files
- *   fileName: file name for storing base CSV data
+ *   filePath: path of the file
  *   data: data to be written
+ *   ctx: context of the current call
  */
 
-int writeToFile(
-  const char *outDir,
-  const char *fileName,
-  struct data *data
+int appendToFile(
+  const char *filePath,
+  struct data *data,
+  struct context *ctx
 ) {
   size_t i = 0;
 
-  char *fname = buildPath(outDir, fileName);
-  FILE *fil = fopen(fname, "w+");
-  if (fname != NULL) free(fname);
+  FILE *fil = fopen(filePath, "a");
 
   if (fil == NULL){
-    fprintf(log_file, "Error: Failed to open '%s' in writeToFile.\n", fname);
+    logError(ctx, "Error: Failed to open '%s' in appendToFile.\n", filePath);
     return -1;
   }
 
-  fprintf(fil, "%s\n", "x,y");
+  /* The position after opening in append mode is implementation-defined */
+  fseek(fil, 0, SEEK_END);
+  if (ftell(fil) == 0) fprintf(fil, "%s\n", "x,y");
   for (i = 0; i < data->n; i++) {
     fprintf(fil, "%.16g,%.16g\n", data->x[i], data->y[i]);
   }
@@ -113,29 +158,37 @@ int writeToFile(
   return 0;
 }
 
+/*
+ * Function: newData
+ * -----------------------
+ *   allocates a data structure of size n from the arena of the call
+ *   (released with the arena, see releaseArena)
+ *
+ *   n: number of points
+ *   ctx: context of the current call
+ *
+ *   return: data structure, NULL if the allocation failed
+ */
 struct data *newData(
-  size_t n
+  size_t n,
+  struct context *ctx
 ) {
-  struct data *retVal = malloc(sizeof(struct data));
+  struct data *retVal = arenaAlloc(&ctx->arena, sizeof(struct data));
   if (retVal == NULL)
   {
-    fputs("Error: Failed to allocate memory for data.\n", log_file);
+    logError(ctx, "Error: Failed to allocate memory for data.\n");
     return NULL;
   }
-  // Try to allocate vector data, free structure if fail.
 
-  retVal->x = malloc(n * sizeof(double));
+  retVal->x = arenaAlloc(&ctx->arena, n * sizeof(double));
   if (retVal->x == NULL) {
-    fputs("Error: Failed to allocate memory for data.x.\n", log_file);
-    free (retVal);
+    logError(ctx, "Error: Failed to allocate memory for data.x.\n");
     return NULL;
   }
 
-  retVal->y = malloc(n * sizeof(double));
+  retVal->y = arenaAlloc(&ctx->arena, n * sizeof(double));
   if (retVal->y == NULL) {
-    fputs("Error: Failed to allocate memory for data.y.\n", log_file);
-    free (retVal->x);
-    free (retVal);
+    logError(ctx, "Error: Failed to allocate memory for data.y.\n");
     return NULL;
   }
 
@@ -147,68 +200,421 @@ struct data *newData(
 void setData(
   struct data *dat,
   const double x[],
-  const double y[]
+  const double y[],
+  struct context *ctx
 ) {
   if (dat != NULL) {
     memcpy(dat->x, x, sizeof(double) * dat->n);
     memcpy(dat->y, y, sizeof(double) * dat->n);
   } else {
-    fputs("Error: Cannot set data for unallocated struct.\n", log_file);
+    logError(ctx, "Error: Cannot set data for unallocated struct.\n");
   }
 }
 
-void freeData(struct data *dat) {
-  if (dat->x != NULL) free (dat->x);
-  if (dat->y != NULL) free (dat->y);
-  if (dat != NULL) free (dat);
+/*
+ * Function: curveCapacity
+ * -----------------------
+ *   returns the maximum number of points of the lower and upper curves
+ *   of the tube built around a reference with nReference points
+ *   (at most two corners are added for each reference point)
+ */
+size_t curveCapacity(const size_t nReference) {
+  return 2 * nReference + 2;
 }
 
 /*
- * Function: compareAndReport
+ * Function: freeReports
  * -----------------------
- *   This function does the actual computations. It is introduced so that it
- *   can be called from Python in which case the argument parsing of main
- *   is not needed.
+ *   frees the arrays stored in a reports structure (the structure itself
+ *   is owned by the caller) and resets all sizes to 0
+ *
+ *   reports: structure filled by compareInMemory
  */
-int compareAndReport(
+void freeReports(struct reports *reports) {
+  struct data *arrays[4];
+  size_t i;
+
+  if (reports == NULL) return;
+  arrays[0] = &reports->lower;
+  arrays[1] = &reports->upper;
+  arrays[2] = &reports->errors.original;
+  arrays[3] = &reports->errors.diff;
+  for (i = 0; i < 4; i++) {
+    if (arrays[i]->x != NULL) free(arrays[i]->x);
+    if (arrays[i]->y != NULL) free(arrays[i]->y);
+    arrays[i]->x = NULL;
+    arrays[i]->y = NULL;
+    arrays[i]->n = 0;
+  }
+}
+
+/*
+ * Function: allocReports
+ * -----------------------
+ *   allocates the arrays of a reports structure with the capacity required
+ *   by computeReports and stores this capacity as the array sizes
+ *
+ *   reports: structure to allocate
+ *   nReference: number of reference points
+ *   nTest: number of test points
+ *   ctx: context of the current call
+ *
+ *   return: 0 if there was success
+ */
+int allocReports(
+  struct reports *reports,
+  const size_t nReference,
+  const size_t nTest,
+  struct context *ctx
+) {
+  struct data *arrays[4];
+  size_t sizes[4];
+  size_t i;
+
+  arrays[0] = &reports->lower;
+  arrays[1] = &reports->upper;
+  arrays[2] = &reports->errors.original;
+  arrays[3] = &reports->errors.diff;
+  sizes[0] = curveCapacity(nReference);
+  sizes[1] = curveCapacity(nReference);
+  sizes[2] = nTest;
+  sizes[3] = nTest;
+  memset(reports, 0, sizeof(struct reports));
+  for (i = 0; i < 4; i++) {
+    arrays[i]->x = malloc(sizes[i] * sizeof(double));
+    arrays[i]->y = malloc(sizes[i] * sizeof(double));
+    arrays[i]->n = sizes[i];
+    if (arrays[i]->x == NULL || arrays[i]->y == NULL) {
+      logError(ctx, "Error: Failed to allocate memory for reports.\n");
+      freeReports(reports);
+      return -1;
+    }
+  }
+  return 0;
+}
+
+/*
+ * Function: shrinkData
+ * -----------------------
+ *   reallocates the arrays of a data structure to their actual size
+ *
+ *   dat: data allocated with malloc
+ */
+void shrinkData(struct data *dat) {
+  double *tmp;
+
+  if (dat->n == 0) return;  /* realloc with size 0 may free */
+  tmp = realloc(dat->x, dat->n * sizeof(double));
+  if (tmp != NULL) dat->x = tmp;
+  tmp = realloc(dat->y, dat->n * sizeof(double));
+  if (tmp != NULL) dat->y = tmp;
+}
+
+/*
+ * Function: shrinkReports
+ * -----------------------
+ *   reallocates the arrays of a reports structure to their actual sizes
+ *
+ *   reports: structure filled by computeReports
+ */
+void shrinkReports(struct reports *reports) {
+  shrinkData(&reports->lower);
+  shrinkData(&reports->upper);
+  shrinkData(&reports->errors.original);
+  shrinkData(&reports->errors.diff);
+}
+
+/*
+ * Function: copyCurve
+ * -----------------------
+ *   copies a curve into an array of a reports structure
+ *
+ *   dest: destination, whose size is the capacity of the arrays on entry
+ *   src: curve to copy
+ *   ctx: context of the current call
+ *
+ *   return: 0 if there was success
+ */
+int copyCurve(
+  struct data *dest,
+  const struct data *src,
+  struct context *ctx
+) {
+  if (src->n > dest->n) {
+    logError(ctx, "Error: Insufficient capacity to store the tube curves.\n");
+    dest->n = 0;
+    return -1;
+  }
+  memcpy(dest->x, src->x, src->n * sizeof(double));
+  memcpy(dest->y, src->y, src->n * sizeof(double));
+  dest->n = src->n;
+  return 0;
+}
+
+/*
+ * Function: checkTestRange
+ * -----------------------
+ *   checks that the test data start and end with the same x values as the
+ *   reference data
+ *
+ *   firstX: first x value of the reference
+ *   lastX: last x value of the reference
+ *   testCSV: test data
+ *   ctx: context of the current call
+ *
+ *   return: 0 if the x values are equal
+ */
+int checkTestRange(
+  const double firstX,
+  const double lastX,
+  const struct data *testCSV,
+  struct context *ctx
+) {
+  if (!equ(firstX, testCSV->x[0])){
+    logError(ctx, "Error: Reference and test data minimum x values are different.\n");
+    return 1;
+  }
+  if (!equ(lastX, testCSV->x[testCSV->n - 1])){
+    logError(ctx, "Error: Reference and test data maximum x values are different.\n");
+    return 1;
+  }
+  return 0;
+}
+
+/*
+ * Function: computeTube
+ * -----------------------
+ *   computes the lower and upper curves of the tube around the reference
+ *
+ *   baseCSV: reference data
+ *   tolerances: tolerance values
+ *   lower: receives the lower curve (arrays allocated by this function)
+ *   upper: receives the upper curve (arrays allocated by this function)
+ *   arena: arena allocating the curves (NULL: allocated with malloc)
+ *   ctx: context of the current call (the tube sizes are allocated from its arena)
+ *
+ *   return: 0 if there was success
+ */
+int computeTube(
+  struct data *baseCSV,
+  struct tolerances tolerances,
+  struct data *lower,
+  struct data *upper,
+  struct arena *arena,
+  struct context *ctx
+) {
+  struct data *tube_size = newData(tubeSizeCount(tolerances, baseCSV->n), ctx);
+  if (tube_size == NULL) return -1;
+
+  // Compute tube size.
+  struct data_char dat_char = get_data_char(baseCSV);
+  set_tube_size(tube_size, baseCSV, dat_char, tolerances);
+
+  // Calculate values of lower and upper curve around base
+  if (getTube(baseCSV, tube_size, dat_char, lower, upper, arena) != 0) {
+    logError(ctx, "Error: Failed to allocate memory for the tube curves.\n");
+    return -1;
+  }
+  return 0;
+}
+
+/*
+ * Function: computeReports
+ * -----------------------
+ *   computes the lower and upper curves of the tube around the reference
+ *   and validates the test curve against it, without writing any file
+ *
+ *   baseCSV: reference data
+ *   testCSV: test data
+ *   tolerances: tolerance values
+ *   reports: structure receiving the tube curves and the error report:
+ *            its arrays are allocated by the caller and their sizes must
+ *            hold their capacity on entry (see allocReports)
+ *   ctx: context of the current call (the temporary curves are allocated
+ *        from its arena)
+ *
+ *   return: 0 if there was success
+ */
+int computeReports(
+  struct data *baseCSV,
+  struct data *testCSV,
+  struct tolerances tolerances,
+  struct reports *reports,
+  struct context *ctx
+) {
+  int retVal;
+  const size_t capErrors = min(reports->errors.original.n, reports->errors.diff.n);
+
+  reports->errors.original.n = 0;
+  reports->errors.diff.n = 0;
+
+  if (checkTestRange(baseCSV->x[0], baseCSV->x[baseCSV->n - 1], testCSV, ctx) != 0){
+    reports->lower.n = reports->upper.n = 0;
+    return 1;
+  }
+  if (capErrors < testCSV->n){
+    logError(ctx, "Error: Insufficient capacity to store the error report.\n");
+    reports->lower.n = reports->upper.n = 0;
+    return -1;
+  }
+
+  struct data lowerCurve, upperCurve;
+  retVal = computeTube(baseCSV, tolerances, &lowerCurve, &upperCurve, &ctx->arena, ctx);
+  if (retVal != 0) return retVal;
+  retVal = copyCurve(&reports->lower, &lowerCurve, ctx);
+  if (retVal == 0) retVal = copyCurve(&reports->upper, &upperCurve, ctx);
+  else reports->upper.n = 0;
+  if (retVal != 0) return retVal;
+
+  // Validate test curve and generate error report
+  if (reports->lower.n == 0 || reports->upper.n == 0){
+    logError(ctx, "Error: lower or upper curve has 0 elements.\n");
+    return 1;
+  }
+
+  retVal = validate(reports->lower, reports->upper, *testCSV, &reports->errors, NULL, 0, NULL, NULL);
+  if (retVal != 0){
+    logError(ctx, "Error: Failed to run validate function.\n");
+  }
+
+  // The errors are computed with all the points, as with a tube built by the other functions.
+  removeCollinear(&reports->lower);
+  removeCollinear(&reports->upper);
+
+  return retVal;
+}
+
+/*
+ * Function: writeReportFiles
+ * -----------------------
+ *   writes reference, test, tube curves and errors to CSV files
+ *
+ *   outputDirectory: existing directory to save the output files
+ *   baseCSV: reference data
+ *   testCSV: test data
+ *   reports: structure filled by computeReports
+ *   ctx: context of the current call
+ *
+ *   return: 0 if there was success
+ */
+int writeReportFiles(
+  const char *outputDirectory,
+  struct data *baseCSV,
+  struct data *testCSV,
+  struct reports *reports,
+  struct context *ctx
+) {
+  int retVal;
+
+  retVal = writeToFile(outputDirectory, "reference.csv", baseCSV, ctx);
+  if (retVal != 0){
+    logError(ctx, "Error: Failed to write reference.csv in output directory.\n");
+    return retVal;
+  }
+  retVal = writeToFile(outputDirectory, "lowerBound.csv", &reports->lower, ctx);
+  if (retVal != 0){
+    logError(ctx, "Error: Failed to write lowerBound.csv in output directory.\n");
+    return retVal;
+  }
+  retVal = writeToFile(outputDirectory, "upperBound.csv", &reports->upper, ctx);
+  if (retVal != 0){
+    logError(ctx, "Error: Failed to write upperBound.csv in output directory.\n");
+    return retVal;
+  }
+  retVal = writeToFile(outputDirectory, "test.csv", testCSV, ctx);
+  if (retVal != 0){
+    logError(ctx, "Error: Failed to write test.csv in output directory.\n");
+    return retVal;
+  }
+  retVal = writeToFile(outputDirectory, "errors.csv", &reports->errors.diff, ctx);
+  if (retVal != 0){
+    logError(ctx, "Error: Failed to write errors.csv in output directory.\n");
+    return retVal;
+  }
+
+  return 0;
+}
+
+/*
+ * Function: compareInMemory
+ * -----------------------
+ *   Same computations as compareAndReport, but the results are returned in
+ *   the reports structure instead of being written to files.
+ *   The arrays of reports are allocated by the library and must be released
+ *   with freeReports. The status code and the error messages are stored in ctx.
+ */
+int compareInMemory(
   const double *tReference,
   const double *yReference,
   const size_t nReference,
   const double *tTest,
   const double *yTest,
   const size_t nTest,
-  const char *outputDirectory,
   const double atolx,
   const double atoly,
   const double ltolx,
   const double ltoly,
   const double rtolx,
-  const double rtoly
+  const double rtoly,
+  struct reports *reports,
+  struct context *ctx
 ) {
-  int retVal;
-  int rc_mkdir = mkdir_p(outputDirectory);
-  struct data *baseCSV = newData(nReference);
-  struct data *testCSV = newData(nTest);
-  struct data *tube_size = newData(nReference);
-  setData(baseCSV, tReference, yReference);
-  setData(testCSV, tTest, yTest);
-
-  if (rc_mkdir != 0) {
-    fprintf(stderr, "Error: Failed to create directory: %s\n", outputDirectory);
-    return -1;
-  }
-  log_file = init_log(outputDirectory, "c_funnel.log");
+  initContext(ctx);
+  /* The input arrays are used in place (no copy): they are never modified. */
+  struct data baseCSV = {(double *)tReference, (double *)yReference, nReference};
+  struct data testCSV = {(double *)tTest, (double *)yTest, nTest};
 
-  if (!equ(baseCSV->x[0], testCSV->x[0])){
-    fprintf(log_file, "Error: Reference and test data minimum x values are different.\n");
-    retVal = 1;
-    goto end;
+  struct tolerances tolerances = {
+    .atolx = atolx,
+    .atoly = atoly,
+    .ltolx = ltolx,
+    .ltoly = ltoly,
+    .rtolx = rtolx,
+    .rtoly = rtoly,
+  };
+  if (allocReports(reports, nReference, nTest, ctx) != 0) {
+    ctx->status = -1;
+    return ctx->status;
   }
-  if (!equ(baseCSV->x[baseCSV->n - 1], testCSV->x[testCSV->n - 1])){
-    fprintf(log_file, "Error: Reference and test data maximum x values are different.\n");
-    retVal = 1;
-    goto end;
+  ctx->status = computeReports(&baseCSV, &testCSV, tolerances, reports, ctx);
+  releaseArena(&ctx->arena);
+  if (ctx->status == 0) {
+    shrinkReports(reports);
+  } else {
+    freeReports(reports);
   }
+  return ctx->status;
+}
+
+/*
+ * Function: compareIntoBuffers
+ * -----------------------
+ *   Same as compareInMemory, but the arrays of reports are allocated (and
+ *   reused across calls) by the caller. On entry, the sizes of the arrays
+ *   must hold their capacity: at least curveCapacity(nReference) for the
+ *   lower and upper curves and nTest for the error report.
+ *   The status code and the error messages are stored in ctx.
+ */
+int compareIntoBuffers(
+  const double *tReference,
+  const double *yReference,
+  const size_t nReference,
+  const double *tTest,
+  const double *yTest,
+  const size_t nTest,
+  const double atolx,
+  const double atoly,
+  const double ltolx,
+  const double ltoly,
+  const double rtolx,
+  const double rtoly,
+  struct reports *reports,
+  struct context *ctx
+) {
+  initContext(ctx);
+  /* The input arrays are used in place (no copy): they are never modified. */
+  struct data baseCSV = {(double *)tReference, (double *)yReference, nReference};
+  struct data testCSV = {(double *)tTest, (double *)yTest, nTest};
 
   struct tolerances tolerances = {
     .atolx = atolx,
@@ -218,58 +624,1606 @@ int compareAndReport(
     .rtolx = rtolx,
     .rtoly = rtoly,
   };
-  // Compute tube size.
-  set_tube_size(tube_size, baseCSV, tolerances);
+  ctx->status = computeReports(&baseCSV, &testCSV, tolerances, reports, ctx);
+  releaseArena(&ctx->arena);
+  return ctx->status;
+}
 
-  // Calculate values of lower and upper curve around base
-  struct data lowerCurve = getLower(baseCSV, tube_size);
-  struct data upperCurve = getUpper(baseCSV, tube_size);
+/*
+ * Function: writeReports
+ * -----------------------
+ *   writes the results of compareInMemory to the same CSV files as
+ *   compareAndReport. The status code and the error messages are stored in ctx.
+ *
+ *   return: 0 if there was success
+ */
+int writeReports(
+  const char *outputDirectory,
+  const double *tReference,
+  const double *yReference,
+  const size_t nReference,
+  const double *tTest,
+  const double *yTest,
+  const size_t nTest,
+  struct reports *reports,
+  struct context *ctx
+) {
+  initContext(ctx);
+  struct data baseCSV = {(double *)tReference, (double *)yReference, nReference};
+  struct data testCSV = {(double *)tTest, (double *)yTest, nTest};
 
-  // Validate test curve and generate error report
-  if (lowerCurve.n == 0 || lowerCurve.n == 0){
-    fputs("Error: lower or upper curve has 0 elements.\n", log_file);
-    retVal = 1;
-    goto end;
+  if (mkdir_p(outputDirectory) != 0) {
+    logError(ctx, "Error: Failed to create directory: %s\n", outputDirectory);
+    ctx->status = -1;
+    return ctx->status;
   }
-  struct reports validateReport;
 
-  retVal = validate(lowerCurve, upperCurve, *testCSV, &validateReport.errors);
-  if (retVal != 0){
-    fputs("Error: Failed to run validate function.\n", log_file);
-    goto end;
-  }
+  ctx->status = writeReportFiles(outputDirectory, &baseCSV, &testCSV, reports, ctx);
+  releaseArena(&ctx->arena);
+  return ctx->status;
+}
 
-  /* Write data to files */
-  retVal = writeToFile(outputDirectory, "reference.csv", baseCSV);
-  if (retVal != 0){
-    fputs("Error: Failed to write reference.csv in output directory.\n", log_file);
-    goto end;
-  }
-  retVal = writeToFile(outputDirectory, "lowerBound.csv", &lowerCurve);
-  if (retVal != 0){
-    fputs("Error: Failed to write lowerBound.csv in output directory.\n", log_file);
-    goto end;
-  }
-  retVal = writeToFile(outputDirectory, "upperBound.csv", &upperCurve);
-  if (retVal != 0){
-    fputs("Error: Failed to write upperBound.csv in output directory.\n", log_file);
-    goto end;
-  }
-  retVal = writeToFile(outputDirectory, "test.csv", testCSV);
-  if (retVal != 0){
-    fputs("Error: Failed to write test.csv in output directory.\n", log_file);
-    goto end;
+/*
+ * Function: buildTube
+ * -----------------------
+ *   computes the lower and upper curves of the tube around the reference,
+ *   so that several test curves can be validated against the same tube
+ *   with validateTube.
+ *   The arrays of tube are allocated by the library and must be released
+ *   with freeTube. The status code and the error messages are stored in ctx.
+ */
+int buildTube(
+  const double *tReference,
+  const double *yReference,
+  const size_t nReference,
+  const double atolx,
+  const double atoly,
+  const double ltolx,
+  const double ltoly,
+  const double rtolx,
+  const double rtoly,
+  struct tube *tube,
+  struct context *ctx
+) {
+  initContext(ctx);
+  /* The input arrays are used in place (no copy): they are never modified. */
+  struct data baseCSV = {(double *)tReference, (double *)yReference, nReference};
+
+  struct tolerances tolerances = {
+    .atolx = atolx,
+    .atoly = atoly,
+    .ltolx = ltolx,
+    .ltoly = ltoly,
+    .rtolx = rtolx,
+    .rtoly = rtoly,
+  };
+  memset(tube, 0, sizeof(struct tube));
+  if (nReference == 0) {
+    logError(ctx, "Error: Reference data must have at least one point.\n");
+    ctx->status = 1;
+    return ctx->status;
   }
-  retVal = writeToFile(outputDirectory, "errors.csv", &validateReport.errors.diff);
-  if (retVal != 0){
-    fputs("Error: Failed to write errors.csv in output directory.\n", log_file);
-    goto end;
+  size_t capZones = 0;
+  ctx->status = computeTube(&baseCSV, tolerances, &tube->lower, &tube->upper, NULL, ctx);
+  releaseArena(&ctx->arena);
+  if (ctx->status == 0) {
+    shrinkData(&tube->lower);
+    shrinkData(&tube->upper);
+    tube->firstX = tReference[0];
+    tube->lastX = tReference[nReference - 1];
+    if (updateZoneMap(&tube->lower, &tube->upper, &tube->zones, &capZones, 0) != 0) {
+      logError(ctx, "Error: Failed to allocate memory for the block index of the tube.\n");
+      freeTube(tube);
+      ctx->status = -1;
+    }
   }
+  return ctx->status;
+}
 
-  end:
-    freeData(baseCSV);
-    freeData(testCSV);
-    freeData(tube_size);
-    fclose(log_file);
-    return retVal;
+/*
+ * Function: buildReferenceProfile
+ * -----------------------
+ *   analyzes the reference curve independently of the tolerances (see compare.h).
+ *   The status code and the error messages are stored in ctx.
+ */
+int buildReferenceProfile(
+  const double *tReference,
+  const double *yReference,
+  const size_t nReference,
+  struct referenceProfile *profile,
+  struct context *ctx
+) {
+  initContext(ctx);
+  /* The input arrays are used in place (no copy): they are never modified. */
+  struct data baseCSV = {(double *)tReference, (double *)yReference, nReference};
+
+  memset(profile, 0, sizeof(struct referenceProfile));
+  if (nReference == 0) {
+    logError(ctx, "Error: Reference data must have at least one point.\n");
+    ctx->status = 1;
+    return ctx->status;
+  }
+  if (buildProfile(&baseCSV, get_data_char(&baseCSV), profile, NULL) != 0) {
+    logError(ctx, "Error: Failed to allocate memory for the reference profile.\n");
+    ctx->status = -1;
+  }
+  return ctx->status;
+}
+
+/*
+ * Function: buildTubeFromProfile
+ * -----------------------
+ *   same as buildTube, with the analysis of the reference curve stored in a
+ *   profile built with buildReferenceProfile (see compare.h).
+ *   The status code and the error messages are stored in ctx.
+ */
+int buildTubeFromProfile(
+  const double *tReference,
+  const double *yReference,
+  const size_t nReference,
+  const struct referenceProfile *profile,
+  const double atolx,
+  const double atoly,
+  const double ltolx,
+  const double ltoly,
+  const double rtolx,
+  const double rtoly,
+  struct tube *tube,
+  struct context *ctx
+) {
+  initContext(ctx);
+  /* The input arrays are used in place (no copy): they are never modified. */
+  struct data baseCSV = {(double *)tReference, (double *)yReference, nReference};
+  struct tolerances tolerances = {
+    .atolx = atolx,
+    .atoly = atoly,
+    .ltolx = ltolx,
+    .ltoly = ltoly,
+    .rtolx = rtolx,
+    .rtoly = rtoly,
+  };
+  struct data *tube_size;
+  size_t capZones = 0;
+
+  memset(tube, 0, sizeof(struct tube));
+  if (nReference == 0 || nReference != profile->nReference ||
+      hashReference(&baseCSV) != profile->hash) {
+    logError(ctx, "Error: Reference data do not match the reference profile.\n");
+    ctx->status = 1;
+    return ctx->status;
+  }
+  tube_size = newData(tubeSizeCount(tolerances, nReference), ctx);
+  if (tube_size == NULL) {
+    releaseArena(&ctx->arena);
+    ctx->status = -1;
+    return ctx->status;
+  }
+  set_tube_size(tube_size, &baseCSV, profile->dat_char, tolerances);
+  if (getTubeProfile(&baseCSV, profile, tube_size, &tube->lower, &tube->upper, NULL) != 0) {
+    logError(ctx, "Error: Failed to allocate memory for the tube curves.\n");
+    releaseArena(&ctx->arena);
+    ctx->status = -1;
+    return ctx->status;
+  }
+  releaseArena(&ctx->arena);
+  shrinkData(&tube->lower);
+  shrinkData(&tube->upper);
+  tube->firstX = tReference[0];
+  tube->lastX = tReference[nReference - 1];
+  if (updateZoneMap(&tube->lower, &tube->upper, &tube->zones, &capZones, 0) != 0) {
+    logError(ctx, "Error: Failed to allocate memory for the block index of the tube.\n");
+    freeTube(tube);
+    ctx->status = -1;
+  }
+  return ctx->status;
+}
+
+/*
+ * Function: freeReferenceProfile
+ * -----------------------
+ *   releases the arrays of a profile built with buildReferenceProfile
+ */
+void freeReferenceProfile(struct referenceProfile *profile) {
+  if (profile == NULL) return;
+  freeProfile(profile);
+  memset(profile, 0, sizeof(struct referenceProfile));
+}
+
+/*
+ * Function: decimateReference
+ * -----------------------
+ *   removes the reference points which do not change the tube by more than
+ *   a fraction of the tube size (see compare.h).
+ *   The status code and the error messages are stored in ctx.
+ */
+int decimateReference(
+  const double *tReference,
+  const double *yReference,
+  const size_t nReference,
+  const double atolx,
+  const double atoly,
+  const double ltolx,
+  const double ltoly,
+  const double rtolx,
+  const double rtoly,
+  const double fraction,
+  double *tDecimated,
+  double *yDecimated,
+  size_t *nDecimated,
+  struct context *ctx
+) {
+  initContext(ctx);
+  /* The input arrays are used in place (no copy): they are never modified. */
+  struct data baseCSV = {(double *)tReference, (double *)yReference, nReference};
+  struct data decimated = {tDecimated, yDecimated, 0};
+  struct tolerances tolerances = {
+    .atolx = atolx,
+    .atoly = atoly,
+    .ltolx = ltolx,
+    .ltoly = ltoly,
+    .rtolx = rtolx,
+    .rtoly = rtoly,
+  };
+  struct data *tube_size;
+  double minSize;
+  size_t i;
+
+  *nDecimated = 0;
+  if (nReference == 0) {
+    logError(ctx, "Error: Reference data must have at least one point.\n");
+    ctx->status = 1;
+    return ctx->status;
+  }
+  if (!(fraction >= 0)) {
+    logError(ctx, "Error: Decimation fraction must be positive.\n");
+    ctx->status = 1;
+    return ctx->status;
+  }
+  tube_size = newData(tubeSizeCount(tolerances, nReference), ctx);
+  if (tube_size == NULL) {
+    releaseArena(&ctx->arena);
+    ctx->status = -1;
+    return ctx->status;
+  }
+  set_tube_size(tube_size, &baseCSV, get_data_char(&baseCSV), tolerances);
+  minSize = tube_size->y[0];
+  for (i = 1; i < tube_size->n; i++) minSize = min(minSize, tube_size->y[i]);
+  releaseArena(&ctx->arena);
+  *nDecimated = decimateData(&baseCSV, fraction * minSize, &decimated);
+  return ctx->status;
+}
+
+/*
+ * Function: simplifyCurve
+ * -----------------------
+ *   removes the collinear points of a tube curve in place (see compare.h)
+ */
+size_t simplifyCurve(double *t, double *y, size_t n) {
+  struct data curve = {t, y, n};
+
+  return removeCollinear(&curve);
+}
+
+/*
+ * Function: validateTest
+ * -----------------------
+ *   validates a test curve against a tube built with buildTube
+ *
+ *   tube: structure filled by buildTube
+ *   testCSV: test data
+ *   errors: error report, with arrays allocated by the caller and sizes
+ *           holding their capacity on entry (NULL if not needed)
+ *   summary: aggregated errors (NULL if not needed)
+ *   maxViolations: if not 0, stop after this number of violations (requires summary)
+ *   ctx: context of the current call
+ *
+ *   return: 0 if there was success
+ */
+int validateTest(
+  const struct tube *tube,
+  struct data *testCSV,
+  struct errorReport *errors,
+  struct errorSummary *summary,
+  size_t maxViolations,
+  struct context *ctx
+) {
+  int retVal;
+  size_t capErrors = 0;
+
+  if (errors != NULL) {
+    capErrors = min(errors->original.n, errors->diff.n);
+    errors->original.n = 0;
+    errors->diff.n = 0;
+  }
+  if (testCSV->n == 0) {
+    logError(ctx, "Error: Test data must have at least one point.\n");
+    return 1;
+  }
+  if (checkTestRange(tube->firstX, tube->lastX, testCSV, ctx) != 0) return 1;
+  if (errors != NULL && capErrors < testCSV->n) {
+    logError(ctx, "Error: Insufficient capacity to store the error report.\n");
+    return -1;
+  }
+  if (summary != NULL) initSummary(summary);
+  retVal = validate(
+    tube->lower, tube->upper, *testCSV, errors, summary, maxViolations, NULL, &tube->zones);
+  if (retVal != 0) {
+    logError(ctx, "Error: Failed to run validate function.\n");
+  }
+  return retVal;
+}
+
+/*
+ * Function: validateTube
+ * -----------------------
+ *   validates a test curve against a tube built with buildTube.
+ *   The arrays of errors are allocated by the caller: on entry, their sizes
+ *   must hold their capacity (at least nTest).
+ *   The status code and the error messages are stored in ctx.
+ */
+int validateTube(
+  const struct tube *tube,
+  const double *tTest,
+  const double *yTest,
+  const size_t nTest,
+  struct errorReport *errors,
+  struct context *ctx
+) {
+  initContext(ctx);
+  /* The input arrays are used in place (no copy): they are never modified. */
+  struct data testCSV = {(double *)tTest, (double *)yTest, nTest};
+
+  ctx->status = validateTest(tube, &testCSV, errors, NULL, 0, ctx);
+  return ctx->status;
+}
+
+/*
+ * Function: summarizeTube
+ * -----------------------
+ *   same as validateTube, but only the aggregated errors are computed
+ *   (no per-point output). If maxViolations is not 0, the validation stops
+ *   after this number of violations.
+ *   The status code and the error messages are stored in ctx.
+ */
+int summarizeTube(
+  const struct tube *tube,
+  const double *tTest,
+  const double *yTest,
+  const size_t nTest,
+  const size_t maxViolations,
+  struct errorSummary *summary,
+  struct context *ctx
+) {
+  initContext(ctx);
+  /* The input arrays are used in place (no copy): they are never modified. */
+  struct data testCSV = {(double *)tTest, (double *)yTest, nTest};
+
+  ctx->status = validateTest(tube, &testCSV, NULL, summary, maxViolations, ctx);
+  return ctx->status;
+}
+
+/*
+ * Function: validateTubeRange
+ * -----------------------
+ *   validates the test points of a test curve with x values in [xMin, xMax]
+ *   against a tube built with buildTube (see compare.h).
+ *   The test points in range and the starting segments of the tube curves
+ *   are found by binary search.
+ *   The status code and the error messages are stored in ctx.
+ */
+int validateTubeRange(
+  const struct tube *tube,
+  const double *tTest,
+  const double *yTest,
+  const size_t nTest,
+  const double xMin,
+  const double xMax,
+  struct errorReport *errors,
+  struct errorSummary *summary,
+  const size_t maxViolations,
+  size_t *start,
+  size_t *end,
+  struct context *ctx
+) {
+  size_t lo = 0, hi = nTest, mid;
+  size_t capErrors = 0;
+  struct data test;
+  struct tubeCursor cursor;
+
+  initContext(ctx);
+  if (errors != NULL) {
+    capErrors = min(errors->original.n, errors->diff.n);
+    errors->original.n = 0;
+    errors->diff.n = 0;
+  }
+  if (!(xMin <= xMax)) {
+    logError(ctx, "Error: Minimum x value of the range must not be greater than maximum x value.\n");
+    ctx->status = 1;
+    return ctx->status;
+  }
+  if (xMin < tube->firstX - 1e-10 || xMax > tube->lastX + 1e-10) {
+    logError(ctx, "Error: Range must be within the x range of the reference data.\n");
+    ctx->status = 1;
+    return ctx->status;
+  }
+  // First test point with x >= xMin
+  while (lo < hi) {
+    mid = lo + (hi - lo) / 2;
+    if (tTest[mid] < xMin) lo = mid + 1;
+    else hi = mid;
+  }
+  *start = lo;
+  // First test point with x > xMax
+  hi = nTest;
+  while (lo < hi) {
+    mid = lo + (hi - lo) / 2;
+    if (tTest[mid] > xMax) hi = mid;
+    else lo = mid + 1;
+  }
+  *end = lo;
+  if (*end == *start) {
+    logError(ctx, "Error: Test data must have at least one point in the range.\n");
+    ctx->status = 1;
+    return ctx->status;
+  }
+  if (errors != NULL && capErrors < *end - *start) {
+    logError(ctx, "Error: Insufficient capacity to store the error report.\n");
+    ctx->status = -1;
+    return ctx->status;
+  }
+  /* The input arrays are used in place (no copy): they are never modified. */
+  test.x = (double *)tTest + *start;
+  test.y = (double *)yTest + *start;
+  test.n = *end - *start;
+  cursor.jLower = cursorAt(&tube->lower, test.x[0]);
+  cursor.jUpper = cursorAt(&tube->upper, test.x[0]);
+  if (summary != NULL) initSummary(summary);
+  ctx->status = validate(
+    tube->lower, tube->upper, test, errors, summary, maxViolations, &cursor, &tube->zones);
+  if (ctx->status != 0) {
+    logError(ctx, "Error: Failed to run validate function.\n");
+  }
+  return ctx->status;
+}
+
+/*
+ * Function: boundsTube
+ * -----------------------
+ *   interpolates the tube curves at query x values in any order (see compare.h).
+ *   The status code and the error messages are stored in ctx.
+ */
+int boundsTube(
+  const struct tube *tube,
+  const double *tQuery,
+  const size_t nQuery,
+  double *lower,
+  double *upper,
+  struct context *ctx
+) {
+  size_t i;
+  size_t jLower = 1, jUpper = 1;
+
+  initContext(ctx);
+  for (i = 0; i < nQuery; i++) {
+    if (!(tQuery[i] >= tube->firstX - 1e-10 && tQuery[i] <= tube->lastX + 1e-10)) {
+      logError(ctx, "Error: Query x values must be within the x range of the reference data.\n");
+      ctx->status = 1;
+      return ctx->status;
+    }
+  }
+  for (i = 0; i < nQuery; i++) {
+    lower[i] = queryAt(&tube->lower, &jLower, tQuery[i]);
+    upper[i] = queryAt(&tube->upper, &jUpper, tQuery[i]);
+  }
+  return ctx->status;
+}
+
+/*
+ * Function: validateLazy
+ * -----------------------
+ *   validates a test curve against a tube built window by window along the
+ *   reference, until maxViolations violations are found: the tube is only
+ *   built up to the x value where the validation stops.
+ *
+ *   baseCSV: reference data
+ *   dat_char: data characteristics of the reference
+ *   tube_size: array of tube sizes, allocated by the caller with
+ *              tubeSizeCount(tolerances, baseCSV->n) elements (overwritten)
+ *   testCSV: test data (x range already checked)
+ *   tolerances: tolerance values
+ *   maxViolations: stop after this number of violations (not 0)
+ *   summary: aggregated errors
+ *   ctx: context of the current call
+ *
+ *   return: 0 if there was success
+ */
+int validateLazy(
+  struct data *baseCSV,
+  struct data_char dat_char,
+  struct data *tube_size,
+  struct data *testCSV,
+  struct tolerances tolerances,
+  size_t maxViolations,
+  struct errorSummary *summary,
+  struct context *ctx
+) {
+  int retVal = 0;
+  size_t start = 0, end, next;
+  size_t width = WINDOW_POINTS;
+  size_t i = 0, k;
+  double margin;
+  struct tubeWindow win;
+  struct confirmedTube ct;
+
+  tube_size->n = tubeSizeCount(tolerances, baseCSV->n);
+  set_tube_size(tube_size, baseCSV, dat_char, tolerances);
+  margin = windowMargin(tube_size);
+  if (isinf(margin)) width = baseCSV->n;  // no window smaller than the reference (see window.c)
+  initSummary(summary);
+  initConfirmedTube(&ct);
+
+  while (i < testCSV->n && summary->nViolations < maxViolations) {
+    end = min(start + width, baseCSV->n);
+    if (buildWindow(baseCSV, tube_size, dat_char, margin, start, end, &win) != 0 ||
+        (win.xMax > ct.xMax && confirmCurves(&ct, &win.lower, &win.upper, win.xMax) != 0)) {
+      logError(ctx, "Error: Failed to allocate memory for the tube curves.\n");
+      freeWindow(&win);
+      retVal = -1;
+      break;
+    }
+    // Test points validated against the confirmed points of the curves
+    k = confirmedTestEnd(&ct, testCSV, i);
+    if (k > i) {
+      struct data test = {testCSV->x + i, testCSV->y + i, k - i};
+      retVal = validate(ct.lower, ct.upper, test, NULL, summary, maxViolations, &ct.cursor, NULL);
+      if (retVal != 0) {
+        logError(ctx, "Error: Failed to run validate function.\n");
+        freeWindow(&win);
+        break;
+      }
+      discardConfirmed(&ct);
+      i = k;
+    }
+    next = nextWindowStart(baseCSV, margin, &win);
+    freeWindow(&win);
+    if (next > start) start = next;
+    else width *= 2;  // window too small compared to the tube size
+  }
+  freeConfirmedTube(&ct);
+  return retVal;
+}
+
+/*
+ * Function: compareSummary
+ * -----------------------
+ *   Same computations as compareInMemory, but only the aggregated errors are
+ *   computed (no per-point output).
+ *   If maxViolations is not 0, the validation stops after this number of
+ *   violations, and the tube is built lazily up to the x value where the
+ *   validation stops (see validateLazy).
+ *   The status code and the error messages are stored in ctx.
+ */
+int compareSummary(
+  const double *tReference,
+  const double *yReference,
+  const size_t nReference,
+  const double *tTest,
+  const double *yTest,
+  const size_t nTest,
+  const double atolx,
+  const double atoly,
+  const double ltolx,
+  const double ltoly,
+  const double rtolx,
+  const double rtoly,
+  const size_t maxViolations,
+  struct errorSummary *summary,
+  struct context *ctx
+) {
+  struct tube tube;
+  struct data baseCSV = {(double *)tReference, (double *)yReference, nReference};
+  struct data testCSV = {(double *)tTest, (double *)yTest, nTest};
+
+  initContext(ctx);
+  if (nReference > 0 && nTest > 0 &&
+      checkTestRange(tReference[0], tReference[nReference - 1], &testCSV, ctx) != 0) {
+    ctx->status = 1;
+    return ctx->status;
+  }
+  if (maxViolations > 0 && nReference > 0 && nTest > 0) {
+    struct tolerances tolerances = {
+      .atolx = atolx,
+      .atoly = atoly,
+      .ltolx = ltolx,
+      .ltoly = ltoly,
+      .rtolx = rtolx,
+      .rtoly = rtoly,
+    };
+    struct data *tube_size = newData(tubeSizeCount(tolerances, nReference), ctx);
+    if (tube_size == NULL) {
+      releaseArena(&ctx->arena);
+      ctx->status = -1;
+      return ctx->status;
+    }
+    ctx->status = validateLazy(
+      &baseCSV, get_data_char(&baseCSV), tube_size, &testCSV, tolerances, maxViolations, summary, ctx);
+    releaseArena(&ctx->arena);
+    return ctx->status;
+  }
+  if (buildTube(
+      tReference, yReference, nReference,
+      atolx, atoly, ltolx, ltoly, rtolx, rtoly, &tube, ctx) != 0) {
+    return ctx->status;
+  }
+  ctx->status = validateTest(&tube, &testCSV, NULL, summary, 0, ctx);
+  freeTube(&tube);
+  return ctx->status;
+}
+
+/*
+ * Function: toleranceAt
+ * -----------------------
+ *   pointer to a tolerance value by index, in the order of the arguments
+ *   of compareInMemory (atolx, atoly, ltolx, ltoly, rtolx, rtoly)
+ *
+ *   return: NULL if the index is not valid
+ */
+double *toleranceAt(struct tolerances *tolerances, int which) {
+  switch (which) {
+    case 0: return &tolerances->atolx;
+    case 1: return &tolerances->atoly;
+    case 2: return &tolerances->ltolx;
+    case 3: return &tolerances->ltoly;
+    case 4: return &tolerances->rtolx;
+    case 5: return &tolerances->rtoly;
+    default: return NULL;
+  }
+}
+
+/*
+ * Function: findMinTolerance
+ * -----------------------
+ *   bisection of the smallest value of a tolerance for which the test
+ *   passes (see compare.h). Each iteration validates the test curve lazily
+ *   and stops at the first violation (see validateLazy), with the data
+ *   characteristics of the reference and the array of tube sizes computed
+ *   or allocated only once.
+ *   The status code and the error messages are stored in ctx.
+ */
+int findMinTolerance(
+  const double *tReference,
+  const double *yReference,
+  const size_t nReference,
+  const double *tTest,
+  const double *yTest,
+  const size_t nTest,
+  const double atolx,
+  const double atoly,
+  const double ltolx,
+  const double ltoly,
+  const double rtolx,
+  const double rtoly,
+  const int which,
+  const double precision,
+  double *tolerance,
+  struct context *ctx
+) {
+  struct data baseCSV = {(double *)tReference, (double *)yReference, nReference};
+  struct data testCSV = {(double *)tTest, (double *)yTest, nTest};
+  struct tolerances tolerances = {
+    .atolx = atolx,
+    .atoly = atoly,
+    .ltolx = ltolx,
+    .ltoly = ltoly,
+    .rtolx = rtolx,
+    .rtoly = rtoly,
+  };
+  double *value = toleranceAt(&tolerances, which);
+  struct data_char dat_char;
+  struct data *tube_size;
+  struct errorSummary summary;
+  double lo = 0, hi;
+  int nDoublings = 0;
+
+  initContext(ctx);
+  if (value == NULL) {
+    logError(ctx, "Error: Invalid tolerance index %d.\n", which);
+    ctx->status = 1;
+    return ctx->status;
+  }
+  if (!(precision > 0)) {
+    logError(ctx, "Error: Precision of the tolerance must be positive.\n");
+    ctx->status = 1;
+    return ctx->status;
+  }
+  if (nReference == 0 || nTest == 0) {
+    logError(ctx, "Error: Reference and test data must have at least one point.\n");
+    ctx->status = 1;
+    return ctx->status;
+  }
+  if (checkTestRange(tReference[0], tReference[nReference - 1], &testCSV, ctx) != 0) {
+    ctx->status = 1;
+    return ctx->status;
+  }
+  // Tube sizes allocated for any value of the tolerance (with a nonzero ltol, one per point).
+  *value = 1;
+  tube_size = newData(tubeSizeCount(tolerances, nReference), ctx);
+  if (tube_size == NULL) {
+    releaseArena(&ctx->arena);
+    ctx->status = -1;
+    return ctx->status;
+  }
+  dat_char = get_data_char(&baseCSV);
+
+  // Initial value: 1e-6 of the scale of the reference for absolute tolerances.
+  if (which == 0) hi = max(dat_char.range_x, dat_char.mag_x);
+  else if (which == 1) hi = max(dat_char.range_y, dat_char.mag_y);
+  else hi = 1;
+  hi = hi > 0 ? hi * 1e-6 : 1e-6;
+
+  // Test passing without tolerance, then doubling of the value until the test passes...
+  *value = 0;
+  ctx->status = validateLazy(&baseCSV, dat_char, tube_size, &testCSV, tolerances, 1, &summary, ctx);
+  if (ctx->status == 0 && summary.nViolations == 0) hi = 0;
+  while (ctx->status == 0 && hi > 0) {
+    *value = hi;
+    ctx->status = validateLazy(&baseCSV, dat_char, tube_size, &testCSV, tolerances, 1, &summary, ctx);
+    if (ctx->status != 0 || summary.nViolations == 0) break;
+    if (++nDoublings > MAX_DOUBLINGS) {
+      logError(ctx, "Error: No tolerance value found for which the test passes.\n");
+      ctx->status = 1;
+      break;
+    }
+    lo = hi;
+    hi *= 2;
+  }
+  // ...and bisection between the last failing and the first passing values.
+  while (ctx->status == 0 && hi - lo > precision * hi) {
+    *value = lo + (hi - lo) / 2;
+    ctx->status = validateLazy(&baseCSV, dat_char, tube_size, &testCSV, tolerances, 1, &summary, ctx);
+    if (summary.nViolations == 0) hi = *value;
+    else lo = *value;
+  }
+  releaseArena(&ctx->arena);
+  if (ctx->status == 0) *tolerance = hi;
+  return ctx->status;
+}
+
+/*
+ * Function: compareBands
+ * -----------------------
+ *   validates a test curve against several tolerance bands (see compare.h).
+ *   The reference curve is analyzed (see buildProfile) and the array of
+ *   tube sizes is allocated only once for all the bands.
+ *   The status code and the error messages are stored in ctx.
+ */
+int compareBands(
+  const double *tReference,
+  const double *yReference,
+  const size_t nReference,
+  const double *tTest,
+  const double *yTest,
+  const size_t nTest,
+  const struct tolerances *bands,
+  const size_t nBands,
+  int *band,
+  struct errorSummary *summaries,
+  struct context *ctx
+) {
+  struct data baseCSV = {(double *)tReference, (double *)yReference, nReference};
+  struct data testCSV = {(double *)tTest, (double *)yTest, nTest};
+  struct referenceProfile profile;
+  struct data *tube_size;
+  struct tube *tubes;
+  size_t b, capZones, nSize = 1;
+
+  initContext(ctx);
+  if (nBands == 0) {
+    logError(ctx, "Error: At least one tolerance band is required.\n");
+    ctx->status = 1;
+    return ctx->status;
+  }
+  if (nReference == 0 || nTest == 0) {
+    logError(ctx, "Error: Reference and test data must have at least one point.\n");
+    ctx->status = 1;
+    return ctx->status;
+  }
+  if (checkTestRange(tReference[0], tReference[nReference - 1], &testCSV, ctx) != 0) {
+    ctx->status = 1;
+    return ctx->status;
+  }
+  for (b = 0; b < nBands; b++) nSize = max(nSize, tubeSizeCount(bands[b], nReference));
+  tube_size = newData(nSize, ctx);
+  tubes = arenaAlloc(&ctx->arena, nBands * sizeof(struct tube));
+  if (tube_size == NULL || tubes == NULL ||
+      buildProfile(&baseCSV, get_data_char(&baseCSV), &profile, &ctx->arena) != 0) {
+    logError(ctx, "Error: Failed to allocate memory for the tolerance bands.\n");
+    releaseArena(&ctx->arena);
+    ctx->status = -1;
+    return ctx->status;
+  }
+  memset(tubes, 0, nBands * sizeof(struct tube));
+  for (b = 0; b < nBands && ctx->status == 0; b++) {
+    tube_size->n = tubeSizeCount(bands[b], nReference);
+    set_tube_size(tube_size, &baseCSV, profile.dat_char, bands[b]);
+    if (getTubeProfile(
+          &baseCSV, &profile, tube_size, &tubes[b].lower, &tubes[b].upper, &ctx->arena) != 0) {
+      logError(ctx, "Error: Failed to allocate memory for the tolerance bands.\n");
+      ctx->status = -1;
+      break;
+    }
+    tubes[b].firstX = tReference[0];
+    tubes[b].lastX = tReference[nReference - 1];
+    capZones = 0;
+    if (updateZoneMap(&tubes[b].lower, &tubes[b].upper, &tubes[b].zones, &capZones, 0) != 0) {
+      logError(ctx, "Error: Failed to allocate memory for the block index of the tube.\n");
+      ctx->status = -1;
+    }
+  }
+  if (ctx->status == 0) {
+    ctx->status = validateBands(tubes, nBands, testCSV, band, summaries, &ctx->arena);
+    if (ctx->status != 0) {
+      logError(ctx, "Error: Failed to run validateBands function.\n");
+    }
+  }
+  // The curves of the tubes are released with the arena, the block indexes are not.
+  for (b = 0; b < nBands; b++) freeZoneMap(&tubes[b].zones);
+  releaseArena(&ctx->arena);
+  return ctx->status;
+}
+
+/*
+ * Function: initStream
+ * -----------------------
+ *   resets a stream before feeding a new test curve chunk by chunk
+ *
+ *   stream: structure owned by the caller
+ */
+void initStream(struct stream *stream) {
+  stream->cursor.jLower = 1;
+  stream->cursor.jUpper = 1;
+  initSummary(&stream->summary);
+}
+
+/*
+ * Function: feedStream
+ * -----------------------
+ *   validates the next chunk of a test curve against a tube built with
+ *   buildTube. The cursors in the tube curves and the aggregated errors are
+ *   kept in stream between calls, so that the cost of a call only depends on
+ *   the chunk size.
+ *   The status code and the error messages are stored in ctx.
+ */
+int feedStream(
+  const struct tube *tube,
+  struct stream *stream,
+  const double *tTest,
+  const double *yTest,
+  const size_t nTest,
+  struct errorReport *errors,
+  const char *errorsFile,
+  struct context *ctx
+) {
+  /* The input arrays are used in place (no copy): they are never modified. */
+  struct data testCSV = {(double *)tTest, (double *)yTest, nTest};
+  size_t capErrors = 0;
+
+  initContext(ctx);
+  if (errors != NULL) {
+    capErrors = min(errors->original.n, errors->diff.n);
+    errors->original.n = 0;
+    errors->diff.n = 0;
+  }
+  if (nTest == 0) return ctx->status;
+  if (errorsFile != NULL && errors == NULL) {
+    logError(ctx, "Error: An error report is required to write the errors.\n");
+    ctx->status = 1;
+    return ctx->status;
+  }
+  if (tTest[0] < tube->firstX - 1e-10 || tTest[nTest - 1] > tube->lastX + 1e-10) {
+    logError(ctx, "Error: Test data x values must be within the reference x range.\n");
+    ctx->status = 1;
+    return ctx->status;
+  }
+  if (stream->summary.nPoints > 0 && tTest[0] < stream->summary.lastX) {
+    logError(ctx, "Error: Test data x values must increase from one chunk to the next.\n");
+    ctx->status = 1;
+    return ctx->status;
+  }
+  if (errors != NULL && capErrors < nTest) {
+    logError(ctx, "Error: Insufficient capacity to store the error report.\n");
+    ctx->status = -1;
+    return ctx->status;
+  }
+  ctx->status = validate(
+    tube->lower, tube->upper, testCSV, errors, &stream->summary, 0, &stream->cursor,
+    &tube->zones);
+  if (ctx->status != 0) {
+    logError(ctx, "Error: Failed to run validate function.\n");
+    return ctx->status;
+  }
+  if (errorsFile != NULL) {
+    ctx->status = appendToFile(errorsFile, &errors->diff, ctx);
+  }
+  return ctx->status;
+}
+
+/*
+ * Function: buildEditableTube
+ * -----------------------
+ *   same as buildTube, but the reference points are copied into the
+ *   editable tube so that they can be appended or replaced with updateTube.
+ *   The arrays of et are allocated by the library and must be released
+ *   with freeEditableTube. The status code and the error messages are stored in ctx.
+ */
+int buildEditableTube(
+  const double *tReference,
+  const double *yReference,
+  const size_t nReference,
+  const double atolx,
+  const double atoly,
+  const double ltolx,
+  const double ltoly,
+  const double rtolx,
+  const double rtoly,
+  struct editableTube *et,
+  struct context *ctx
+) {
+  struct tolerances tolerances = {
+    .atolx = atolx,
+    .atoly = atoly,
+    .ltolx = ltolx,
+    .ltoly = ltoly,
+    .rtolx = rtolx,
+    .rtoly = rtoly,
+  };
+
+  initContext(ctx);
+  memset(et, 0, sizeof(struct editableTube));
+  if (nReference == 0) {
+    logError(ctx, "Error: Reference data must have at least one point.\n");
+    ctx->status = 1;
+    return ctx->status;
+  }
+  et->tolerances = tolerances;
+  et->reference.x = malloc(nReference * sizeof(double));
+  et->reference.y = malloc(nReference * sizeof(double));
+  if (et->reference.x == NULL || et->reference.y == NULL) {
+    logError(ctx, "Error: Failed to allocate memory for the reference data.\n");
+    freeEditableTube(et);
+    ctx->status = -1;
+    return ctx->status;
+  }
+  memcpy(et->reference.x, tReference, nReference * sizeof(double));
+  memcpy(et->reference.y, yReference, nReference * sizeof(double));
+  et->reference.n = et->capReference = nReference;
+  if (rebuildTube(et) != 0) {
+    logError(ctx, "Error: Failed to allocate memory for the tube curves.\n");
+    freeEditableTube(et);
+    ctx->status = -1;
+  }
+  return ctx->status;
+}
+
+/*
+ * Function: updateTube
+ * -----------------------
+ *   replaces the reference points [start, end) of an editable tube by nNew
+ *   new points (start = end = number of reference points to append points),
+ *   and updates the tube curves near the replaced points only.
+ *   The status code and the error messages are stored in ctx.
+ */
+int updateTube(
+  struct editableTube *et,
+  const size_t start,
+  const size_t end,
+  const double *tNew,
+  const double *yNew,
+  const size_t nNew,
+  struct context *ctx
+) {
+  const struct data *ref = &et->reference;
+  size_t i;
+
+  initContext(ctx);
+  if (start > end || end > ref->n) {
+    logError(ctx, "Error: Invalid range of reference points to replace.\n");
+    ctx->status = 1;
+    return ctx->status;
+  }
+  if (ref->n - (end - start) + nNew == 0) {
+    logError(ctx, "Error: Reference data must have at least one point.\n");
+    ctx->status = 1;
+    return ctx->status;
+  }
+  for (i = 1; i < nNew; i++) {
+    if (tNew[i] < tNew[i - 1]) break;
+  }
+  if ((i < nNew) ||
+      (nNew > 0 && start > 0 && tNew[0] < ref->x[start - 1]) ||
+      (nNew > 0 && end < ref->n && tNew[nNew - 1] > ref->x[end])) {
+    logError(ctx, "Error: Reference data x values must be increasing.\n");
+    ctx->status = 1;
+    return ctx->status;
+  }
+  if (editTube(et, start, end, tNew, yNew, nNew) != 0) {
+    logError(ctx, "Error: Failed to allocate memory to update the tube.\n");
+    ctx->status = -1;
+  }
+  return ctx->status;
+}
+
+/*
+ * Function: freeEditableTube
+ * -----------------------
+ *   frees the arrays stored in an editable tube structure (the structure
+ *   itself is owned by the caller) and resets all sizes to 0
+ *
+ *   et: structure filled by buildEditableTube
+ */
+void freeEditableTube(struct editableTube *et) {
+  if (et == NULL) return;
+  freeEditableTubeData(et);
+}
+
+/*
+ * Function: freeTube
+ * -----------------------
+ *   frees the arrays stored in a tube structure (the structure itself
+ *   is owned by the caller) and resets all sizes to 0
+ *
+ *   tube: structure filled by buildTube
+ */
+void freeTube(struct tube *tube) {
+  if (tube == NULL) return;
+  if (tube->lower.x != NULL) free(tube->lower.x);
+  if (tube->lower.y != NULL) free(tube->lower.y);
+  if (tube->upper.x != NULL) free(tube->upper.x);
+  if (tube->upper.y != NULL) free(tube->upper.y);
+  freeZoneMap(&tube->zones);
+  memset(tube, 0, sizeof(struct tube));
+}
+
+/*
+ * Function: writeRows
+ * -----------------------
+ *   writes data points to an open CSV file, with the format of writeToFile
+ *
+ *   fil: open file
+ *   data: data to be written
+ *   xMin, xMax: only the points with xMin <= x < xMax are written
+ */
+void writeRows(FILE *fil, const struct data *data, double xMin, double xMax) {
+  size_t i;
+
+  for (i = 0; i < data->n; i++) {
+    if (data->x[i] >= xMin && data->x[i] < xMax) {
+      fprintf(fil, "%.16g,%.16g\n", data->x[i], data->y[i]);
+    }
+  }
+}
+
+/*
+ * Function: writeFilteredRows
+ * -----------------------
+ *   same as writeRows, with the points scanned by a filter (see filterPoint):
+ *   only the kept points are written
+ *
+ *   fil: open file
+ *   filter: filter used to scan all the points written to the file
+ *   data: data to be written
+ *   xMin, xMax: only the points with xMin <= x < xMax are written
+ */
+void writeFilteredRows(
+  FILE *fil,
+  struct pointFilter *filter,
+  const struct data *data,
+  double xMin,
+  double xMax
+) {
+  double x[2], y[2];
+  struct data kept = {x, y, 0};
+  size_t i;
+
+  for (i = 0; i < data->n; i++) {
+    if (data->x[i] >= xMin && data->x[i] < xMax) {
+      kept.n = 0;
+      filterPoint(filter, data->x[i], data->y[i], 0, &kept);
+      writeRows(fil, &kept, -INFINITY, INFINITY);
+    }
+  }
+}
+
+/*
+ * Function: scanFile
+ * -----------------------
+ *   reads a CSV file chunk by chunk to get its data characteristics,
+ *   number of points and first and last x values
+ *
+ *   reader: reader of the file (rewound on exit)
+ *   buffer: data with arrays of capacity buffer->n used to read the file
+ *   dat_char: receives the data characteristics (see get_data_char)
+ *   firstLast: receives the first and last points (arrays of size 2)
+ *   sorted: receives 1 if the x values never decrease, 0 otherwise
+ *
+ *   return: number of points
+ */
+size_t scanFile(
+  struct csvReader *reader,
+  struct data *buffer,
+  struct data_char *dat_char,
+  struct data *firstLast,
+  int *sorted
+) {
+  double minX = 0, maxX = 0, minY = 0, maxY = 0;
+  size_t i, n, count = 0;
+
+  *sorted = 1;
+  while ((n = readCSVRows(reader, buffer->x, buffer->y, buffer->n)) > 0) {
+    if (count == 0) {
+      minX = maxX = firstLast->x[0] = buffer->x[0];
+      minY = maxY = firstLast->y[0] = buffer->y[0];
+    }
+    if (count > 0 && buffer->x[0] < firstLast->x[1]) *sorted = 0;
+    for (i = 0; i < n; i++) {
+      if (i > 0 && buffer->x[i] < buffer->x[i - 1]) *sorted = 0;
+      if (buffer->x[i] > maxX) maxX = buffer->x[i];
+      if (buffer->x[i] < minX) minX = buffer->x[i];
+      if (buffer->y[i] > maxY) maxY = buffer->y[i];
+      if (buffer->y[i] < minY) minY = buffer->y[i];
+    }
+    firstLast->x[1] = buffer->x[n - 1];
+    firstLast->y[1] = buffer->y[n - 1];
+    count += n;
+  }
+  dat_char->range_x = maxX - minX;
+  dat_char->range_y = maxY - minY;
+  dat_char->mag_x = max(maxX, fabs(minX));
+  dat_char->mag_y = max(maxY, fabs(minY));
+  rewindCSV(reader);
+  return count;
+}
+
+/*
+ * Function: readReference
+ * -----------------------
+ *   reads the next reference points into the free capacity of the buffer
+ *   and writes them to reference.csv
+ *
+ *   reader: reader of the reference file
+ *   ref: buffer of reference points
+ *   capacity: capacity of the buffer
+ *   fil: reference.csv
+ */
+void readReference(struct csvReader *reader, struct data *ref, size_t capacity, FILE *fil) {
+  struct data rows = {ref->x + ref->n, ref->y + ref->n, 0};
+
+  rows.n = readCSVRows(reader, rows.x, rows.y, capacity - ref->n);
+  writeRows(fil, &rows, -INFINITY, INFINITY);
+  ref->n += rows.n;
+}
+
+/*
+ * Function: allocChunks
+ * -----------------------
+ *   allocates the buffers used to compare CSV files chunk by chunk from the
+ *   arena of the call (released with the arena)
+ *
+ *   return: 0 if there was success
+ */
+int allocChunks(struct chunks *chunks, size_t chunkSize, struct context *ctx) {
+  struct arena *arena = &ctx->arena;
+
+  memset(chunks, 0, sizeof(struct chunks));
+  chunks->capacity = chunkSize;
+  chunks->chunkSize = chunkSize;
+  chunks->ref.x = arenaAlloc(arena, chunkSize * sizeof(double));
+  chunks->ref.y = arenaAlloc(arena, chunkSize * sizeof(double));
+  chunks->size.x = arenaAlloc(arena, chunkSize * sizeof(double));
+  chunks->size.y = arenaAlloc(arena, chunkSize * sizeof(double));
+  chunks->test.x = arenaAlloc(arena, chunkSize * sizeof(double));
+  chunks->test.y = arenaAlloc(arena, chunkSize * sizeof(double));
+  chunks->errors.original.x = arenaAlloc(arena, chunkSize * sizeof(double));
+  chunks->errors.original.y = arenaAlloc(arena, chunkSize * sizeof(double));
+  chunks->errors.diff.x = arenaAlloc(arena, chunkSize * sizeof(double));
+  chunks->errors.diff.y = arenaAlloc(arena, chunkSize * sizeof(double));
+  if (chunks->ref.x == NULL || chunks->ref.y == NULL ||
+      chunks->size.x == NULL || chunks->size.y == NULL ||
+      chunks->test.x == NULL || chunks->test.y == NULL ||
+      chunks->errors.original.x == NULL || chunks->errors.original.y == NULL ||
+      chunks->errors.diff.x == NULL || chunks->errors.diff.y == NULL) {
+    logError(ctx, "Error: Failed to allocate memory for the data chunks.\n");
+    return -1;
+  }
+  return 0;
+}
+
+/*
+ * Function: growChunks
+ * -----------------------
+ *   doubles the capacity of the reference points of the current window
+ *
+ *   return: 0 if there was success
+ */
+int growChunks(struct chunks *chunks, struct context *ctx) {
+  const size_t cap = 2 * chunks->capacity;
+  const size_t oldSize = chunks->capacity * sizeof(double);
+  double *arrays[4] = {
+    arenaRealloc(&ctx->arena, chunks->ref.x, oldSize, cap * sizeof(double)),
+    arenaRealloc(&ctx->arena, chunks->ref.y, oldSize, cap * sizeof(double)),
+    arenaRealloc(&ctx->arena, chunks->size.x, oldSize, cap * sizeof(double)),
+    arenaRealloc(&ctx->arena, chunks->size.y, oldSize, cap * sizeof(double)),
+  };
+
+  if (arrays[0] != NULL) chunks->ref.x = arrays[0];
+  if (arrays[1] != NULL) chunks->ref.y = arrays[1];
+  if (arrays[2] != NULL) chunks->size.x = arrays[2];
+  if (arrays[3] != NULL) chunks->size.y = arrays[3];
+  if (arrays[0] == NULL || arrays[1] == NULL || arrays[2] == NULL || arrays[3] == NULL) {
+    logError(ctx, "Error: Failed to allocate memory for the reference data.\n");
+    return -1;
+  }
+  chunks->capacity = cap;
+  return 0;
+}
+
+/*
+ * Function: scanFiles
+ * -----------------------
+ *   first pass over the CSV files: gets the data characteristics of the
+ *   reference, checks whether its x values are sorted and checks the x range
+ *   of the test data
+ *
+ *   refReader, testReader: readers of the files (rewound on exit)
+ *   chunks: buffers allocated by allocChunks (sortedReference is set)
+ *   dat_char: receives the data characteristics of the reference
+ *   ctx: context of the current call
+ *
+ *   return: 0 if there was success
+ */
+int scanFiles(
+  struct csvReader *refReader,
+  struct csvReader *testReader,
+  struct chunks *chunks,
+  struct data_char *dat_char,
+  struct context *ctx
+) {
+  double refEnds[4], testEnds[4];
+  struct data refFirstLast = {refEnds, refEnds + 2, 2};
+  struct data testFirstLast = {testEnds, testEnds + 2, 2};
+  struct data buffer = {chunks->test.x, chunks->test.y, chunks->chunkSize};
+  struct data_char testChar;
+  int testSorted;
+
+  if (scanFile(refReader, &buffer, dat_char, &refFirstLast, &chunks->sortedReference) == 0) {
+    logError(ctx, "Error: Reference data must have at least one point.\n");
+    return 1;
+  }
+  if (scanFile(testReader, &buffer, &testChar, &testFirstLast, &testSorted) == 0) {
+    logError(ctx, "Error: Test data must have at least one point.\n");
+    return 1;
+  }
+  return checkTestRange(refFirstLast.x[0], refFirstLast.x[1], &testFirstLast, ctx);
+}
+
+/*
+ * Function: openOutputFiles
+ * -----------------------
+ *   creates the output files of compareFiles and writes their header
+ *
+ *   return: 0 if there was success
+ */
+int openOutputFiles(const char *outputDirectory, FILE **files, struct context *ctx) {
+  static const char *fileNames[N_FILES] = {
+    "reference.csv", "test.csv", "errors.csv", "lowerBound.csv", "upperBound.csv"};
+  char *fname;
+  int i;
+
+  if (mkdir_p(outputDirectory) != 0) {
+    logError(ctx, "Error: Failed to create directory: %s\n", outputDirectory);
+    return -1;
+  }
+  for (i = 0; i < N_FILES; i++) {
+    fname = buildPath(outputDirectory, fileNames[i], ctx);
+    if (fname == NULL) return -1;
+    files[i] = fopen(fname, "w+");
+    if (files[i] == NULL) {
+      logError(ctx, "Error: Failed to open '%s' in compareFiles.\n", fileNames[i]);
+      return -1;
+    }
+    fprintf(files[i], "%s\n", "x,y");
+  }
+  return 0;
+}
+
+/*
+ * Function: validateChunks
+ * -----------------------
+ *   validates the test points against the confirmed points of the tube
+ *   curves, reading the test file chunk by chunk, and writes the test points
+ *   and their errors
+ *
+ *   testReader: reader of the test file
+ *   chunks: buffers allocated by allocChunks
+ *   ct: confirmed points of the tube curves
+ *   files: output files
+ *
+ *   return: 0 if there was success, the status of validate otherwise
+ */
+int validateChunks(
+  struct csvReader *testReader,
+  struct chunks *chunks,
+  struct confirmedTube *ct,
+  FILE **files
+) {
+  struct data *test = &chunks->test;
+  struct data sub;
+  size_t k;
+  int retVal;
+
+  for (;;) {
+    if (chunks->testPos == test->n) {
+      if (testReader->eof) return 0;
+      test->n = readCSVRows(testReader, test->x, test->y, chunks->chunkSize);
+      writeRows(files[TEST_FILE], test, -INFINITY, INFINITY);
+      chunks->testPos = 0;
+      continue;
+    }
+    k = confirmedTestEnd(ct, test, chunks->testPos);
+    if (k == chunks->testPos) return 0;
+    sub.x = test->x + chunks->testPos;
+    sub.y = test->y + chunks->testPos;
+    sub.n = k - chunks->testPos;
+    retVal = validate(ct->lower, ct->upper, sub, &chunks->errors, NULL, 0, &ct->cursor, NULL);
+    if (retVal != 0) return retVal;
+    discardConfirmed(ct);
+    writeRows(files[ERRORS_FILE], &chunks->errors.diff, -INFINITY, INFINITY);
+    chunks->testPos = k;
+  }
+}
+
+/*
+ * Function: compareChunks
+ * -----------------------
+ *   second pass over the CSV files: the tube is built over windows of the
+ *   reference points. The curves of a window are written and confirmed
+ *   for x values where they are equal to the full curves (see window.c),
+ *   from the upper limit of the previous window to the upper limit of this
+ *   window. The test points are validated against the confirmed points.
+ *   If the tube height depends on the reference points (ltoly) or if the
+ *   reference x values are not sorted, no x range of a window is known to be
+ *   equal to the full curves: the tube is then built once over all the
+ *   reference points, held in memory.
+ *
+ *   refReader, testReader: readers of the files
+ *   chunks: buffers allocated by allocChunks
+ *   tolerances: tolerance values
+ *   dat_char: data characteristics of the reference
+ *   files: output files
+ *   ctx: context of the current call
+ *
+ *   return: 0 if there was success
+ */
+int compareChunks(
+  struct csvReader *refReader,
+  struct csvReader *testReader,
+  struct chunks *chunks,
+  struct tolerances tolerances,
+  struct data_char dat_char,
+  FILE **files,
+  struct context *ctx
+) {
+  struct data *ref = &chunks->ref;
+  struct data lower, upper;
+  struct confirmedTube ct;
+  struct pointFilter lowerFilter, upperFilter;
+  double x[1], y[1];
+  struct data kept = {x, y, 0};
+  // Without a finite margin, or if the reference x values are not sorted (the windows
+  // are found by binary search), the window grows to all the reference points.
+  const double margin =
+    chunks->sortedReference ? windowMarginBound(&tolerances, dat_char) : INFINITY;
+  double xMax;
+  size_t lo, hi, mid;
+  int last, retVal;
+
+  initConfirmedTube(&ct);
+  // The points of the tube curves are removed as in compareAndReport (see removeCollinear).
+  initPointFilter(&lowerFilter, 0, COLLINEAR_ROUNDING);
+  initPointFilter(&upperFilter, 0, COLLINEAR_ROUNDING);
+  readReference(refReader, ref, chunks->capacity, files[REFERENCE_FILE]);
+  for (;;) {
+    last = refReader->eof;
+    xMax = last ? INFINITY : windowXMax(ref, margin, 0, ref->n);
+    if (!last && !(xMax > ct.xMax)) {
+      // window too small compared to the tube size
+      if (growChunks(chunks, ctx) != 0) break;
+      readReference(refReader, ref, chunks->capacity, files[REFERENCE_FILE]);
+      continue;
+    }
+    chunks->size.n = tubeSizeCount(tolerances, ref->n);
+    set_tube_size(&chunks->size, ref, dat_char, tolerances);
+    // The curves of a window are released within the loop (not from the arena).
+    if (getTube(ref, &chunks->size, dat_char, &lower, &upper, NULL) != 0) {
+      logError(ctx, "Error: Failed to allocate memory for the tube curves.\n");
+      break;
+    }
+    writeFilteredRows(files[LOWER_FILE], &lowerFilter, &lower, ct.xMax, xMax);
+    writeFilteredRows(files[UPPER_FILE], &upperFilter, &upper, ct.xMax, xMax);
+    retVal = confirmCurves(&ct, &lower, &upper, xMax);
+    free(lower.x);
+    free(lower.y);
+    free(upper.x);
+    free(upper.y);
+    if (retVal != 0) {
+      logError(ctx, "Error: Failed to allocate memory for the tube curves.\n");
+      break;
+    }
+    if (validateChunks(testReader, chunks, &ct, files) != 0) {
+      logError(ctx, "Error: Failed to run validate function.\n");
+      break;
+    }
+    if (last) {
+      flushPointFilter(&lowerFilter, &kept);
+      writeRows(files[LOWER_FILE], &kept, -INFINITY, INFINITY);
+      kept.n = 0;
+      flushPointFilter(&upperFilter, &kept);
+      writeRows(files[UPPER_FILE], &kept, -INFINITY, INFINITY);
+      freeConfirmedTube(&ct);
+      return 0;
+    }
+
+    // Last reference point with a lower limit not above xMax starts the next window.
+    lo = 0;
+    hi = ref->n;
+    while (hi - lo > 1) {
+      mid = lo + (hi - lo) / 2;
+      if (windowXMin(ref, margin, mid, ref->n) <= xMax) lo = mid;
+      else hi = mid;
+    }
+    if (lo == 0) {
+      if (growChunks(chunks, ctx) != 0) break;
+    } else {
+      memmove(ref->x, ref->x + lo, (ref->n - lo) * sizeof(double));
+      memmove(ref->y, ref->y + lo, (ref->n - lo) * sizeof(double));
+      ref->n -= lo;
+    }
+    readReference(refReader, ref, chunks->capacity, files[REFERENCE_FILE]);
+  }
+  freeConfirmedTube(&ct);
+  return -1;
+}
+
+/*
+ * Function: compareFiles
+ * -----------------------
+ *   same outputs as compareAndReport, with the reference and test data
+ *   read chunk by chunk from CSV files (see compare.h).
+ *   The status code and the error messages are stored in ctx.
+ */
+int compareFiles(
+  const char *referenceFile,
+  const char *testFile,
+  const char *outputDirectory,
+  const double atolx,
+  const double atoly,
+  const double ltolx,
+  const double ltoly,
+  const double rtolx,
+  const double rtoly,
+  const size_t chunkSize,
+  struct context *ctx
+) {
+  struct tolerances tolerances = {
+    .atolx = atolx,
+    .atoly = atoly,
+    .ltolx = ltolx,
+    .ltoly = ltoly,
+    .rtolx = rtolx,
+    .rtoly = rtoly,
+  };
+  struct csvReader refReader, testReader;
+  struct chunks chunks;
+  struct data_char dat_char;
+  FILE *files[N_FILES] = {NULL};
+  int i;
+
+  initContext(ctx);
+  if (chunkSize == 0) {
+    logError(ctx, "Error: Chunk size must be positive.\n");
+    ctx->status = 1;
+    return ctx->status;
+  }
+  if (openCSV(&refReader, referenceFile) != 0) {
+    logError(ctx, "Error: Cannot open file: %s\n", referenceFile);
+    ctx->status = 1;
+    return ctx->status;
+  }
+  if (openCSV(&testReader, testFile) != 0) {
+    logError(ctx, "Error: Cannot open file: %s\n", testFile);
+    closeCSV(&refReader);
+    ctx->status = 1;
+    return ctx->status;
+  }
+
+  ctx->status = allocChunks(&chunks, chunkSize, ctx);
+  if (ctx->status == 0) {
+    ctx->status = scanFiles(&refReader, &testReader, &chunks, &dat_char, ctx);
+  }
+  if (ctx->status == 0) {
+    ctx->status = openOutputFiles(outputDirectory, files, ctx);
+  }
+  if (ctx->status == 0) {
+    ctx->status = compareChunks(
+      &refReader, &testReader, &chunks, tolerances, dat_char, files, ctx);
+  }
+
+  for (i = 0; i < N_FILES; i++) {
+    if (files[i] != NULL) fclose(files[i]);
+  }
+  releaseArena(&ctx->arena);
+  closeCSV(&refReader);
+  closeCSV(&testReader);
+  return ctx->status;
+}
+
+/*
+ * Function: compareAndReport
+ * -----------------------
+ *   This function does the actual computations. It is introduced so that it
+ *   can be called from Python in which case the argument parsing of main
+ *   is not needed. Error messages are output to stderr.
+ */
+int compareAndReport(
+  const double *tReference,
+  const double *yReference,
+  const size_t nReference,
+  const double *tTest,
+  const double *yTest,
+  const size_t nTest,
+  const char *outputDirectory,
+  const double atolx,
+  const double atoly,
+  const double ltolx,
+  const double ltoly,
+  const double rtolx,
+  const double rtoly
+) {
+  int retVal;
+  int rc_mkdir = mkdir_p(outputDirectory);
+  /* The input arrays are used in place (no copy): they are never modified. */
+  struct data baseCSV = {(double *)tReference, (double *)yReference, nReference};
+  struct data testCSV = {(double *)tTest, (double *)yTest, nTest};
+  struct reports reports;
+  struct context ctx;
+
+  if (rc_mkdir != 0) {
+    fprintf(stderr, "Error: Failed to create directory: %s\n", outputDirectory);
+    return -1;
+  }
+  memset(&ctx, 0, sizeof(struct context));
+  initContext(&ctx);
+
+  struct tolerances tolerances = {
+    .atolx = atolx,
+    .atoly = atoly,
+    .ltolx = ltolx,
+    .ltoly = ltoly,
+    .rtolx = rtolx,
+    .rtoly = rtoly,
+  };
+
+  retVal = allocReports(&reports, nReference, nTest, &ctx);
+  if (retVal == 0) {
+    retVal = computeReports(&baseCSV, &testCSV, tolerances, &reports, &ctx);
+  }
+  if (retVal == 0) {
+    /* Write data to files */
+    retVal = writeReportFiles(outputDirectory, &baseCSV, &testCSV, &reports, &ctx);
+  }
+
+  releaseArena(&ctx.arena);
+  freeReports(&reports);
+  fputs(ctx.message, stderr);
+  return retVal;
 }
@@ -11,23 +11,23 @@
 #include "algorithmRectangle.h"
 #include "tube.h"
 #include "tubeSize.h"
+#include "window.h"
+#include "tubeEdit.h"
+#include "zoneMap.h"
+#include "decimate.h"
 #include "mkdir_p.h"
 
-#define MAX 100
+#include "context.h"
+#include "arena.h"
 
-/*
-*   Descriptor of the file used for logging the numerical processing errors
-*   (all other errors like memory, file access, bad argument...
-*   are still output to stderr.)
-*/
-FILE *log_file;
+#define MAX 100
 
 /*
  * Function: compareAndReport
  * -----------------------
  *   This function does the actual computations. It is introduced so that it
  *   can be called from Python in which case the argument parsing of main
- *   is not needed.
+ *   is not needed. Error messages are output to stderr.
  */
 int compareAndReport(
   const double* tReference,
@@ -45,4 +45,510 @@ int compareAndReport(
   const double rtoly
 );
 
+/*
+ * Function: compareInMemory
+ * -----------------------
+ *   Same computations as compareAndReport, but the tube curves and the error
+ *   report are stored in reports instead of being written to files.
+ *   The arrays of reports are allocated by the library: release them with
+ *   freeReports.
+ *   The status code and the error messages are stored in ctx: each thread must
+ *   use its own context.
+ */
+int compareInMemory(
+  const double* tReference,
+  const double* yReference,
+  const size_t nReference,
+  const double* tTest,
+  const double* yTest,
+  const size_t nTest,
+  const double atolx,
+  const double atoly,
+  const double ltolx,
+  const double ltoly,
+  const double rtolx,
+  const double rtoly,
+  struct reports *reports,
+  struct context *ctx
+);
+
+/*
+ * Function: compareIntoBuffers
+ * -----------------------
+ *   Same as compareInMemory, but the arrays of reports are allocated by the
+ *   caller, so that they can be reused across calls. On entry, the size of each
+ *   array must hold its capacity: at least curveCapacity(nReference) for the
+ *   lower and upper curves and nTest for the error report.
+ */
+int compareIntoBuffers(
+  const double* tReference,
+  const double* yReference,
+  const size_t nReference,
+  const double* tTest,
+  const double* yTest,
+  const size_t nTest,
+  const double atolx,
+  const double atoly,
+  const double ltolx,
+  const double ltoly,
+  const double rtolx,
+  const double rtoly,
+  struct reports *reports,
+  struct context *ctx
+);
+
+/*
+ * Function: curveCapacity
+ * -----------------------
+ *   Returns the maximum number of points of the lower and upper curves
+ *   of the tube built around a reference with nReference points.
+ */
+size_t curveCapacity(const size_t nReference);
+
+/*
+ * Function: writeReports
+ * -----------------------
+ *   Writes the results of compareInMemory to the output directory, with the
+ *   same files as compareAndReport.
+ */
+int writeReports(
+  const char * outputDirectory,
+  const double* tReference,
+  const double* yReference,
+  const size_t nReference,
+  const double* tTest,
+  const double* yTest,
+  const size_t nTest,
+  struct reports *reports,
+  struct context *ctx
+);
+
+/*
+ * Function: freeReports
+ * -----------------------
+ *   Releases the arrays allocated by compareInMemory.
+ */
+void freeReports(struct reports *reports);
+
+/*
+ * Function: buildTube
+ * -----------------------
+ *   Computes the lower and upper curves of the tube around the reference,
+ *   so that several test curves can be validated against the same tube
+ *   with validateTube.
+ *   The arrays of tube are allocated by the library: release them with
+ *   freeTube.
+ *   The status code and the error messages are stored in ctx.
+ */
+int buildTube(
+  const double* tReference,
+  const double* yReference,
+  const size_t nReference,
+  const double atolx,
+  const double atoly,
+  const double ltolx,
+  const double ltoly,
+  const double rtolx,
+  const double rtoly,
+  struct tube *tube,
+  struct context *ctx
+);
+
+/*
+ * Function: buildReferenceProfile
+ * -----------------------
+ *   Analyzes the reference curve independently of the tolerances (data
+ *   characteristics, identical points, slopes and kinds of the corners of
+ *   the tube curves), so that tubes with different tolerances can be built
+ *   with buildTubeFromProfile without analyzing the reference again.
+ *   The profile is keyed by a content hash of the reference points.
+ *   The arrays of profile are allocated by the library and must be released
+ *   with freeReferenceProfile. The status code and the error messages are stored in ctx.
+ */
+int buildReferenceProfile(
+  const double* tReference,
+  const double* yReference,
+  const size_t nReference,
+  struct referenceProfile *profile,
+  struct context *ctx
+);
+
+/*
+ * Function: buildTubeFromProfile
+ * -----------------------
+ *   Same as buildTube, with the analysis of the reference stored in profile:
+ *   only the tube sizes, the corners of the tube curves and the loops of the
+ *   curves are computed. The reference points must be the points used to
+ *   build the profile (same content hash), otherwise an error is returned.
+ *   The status code and the error messages are stored in ctx.
+ */
+int buildTubeFromProfile(
+  const double* tReference,
+  const double* yReference,
+  const size_t nReference,
+  const struct referenceProfile *profile,
+  const double atolx,
+  const double atoly,
+  const double ltolx,
+  const double ltoly,
+  const double rtolx,
+  const double rtoly,
+  struct tube *tube,
+  struct context *ctx
+);
+
+/*
+ * Function: freeReferenceProfile
+ * -----------------------
+ *   Releases the arrays of a profile built with buildReferenceProfile.
+ */
+void freeReferenceProfile(struct referenceProfile *profile);
+
+/*
+ * Function: decimateReference
+ * -----------------------
+ *   Removes the reference points which lie within a fraction of the tube
+ *   size, along y, of the line through the previous and the next kept points
+ *   (see decimateData), so that the tube built around the decimated points
+ *   differs from the tube built around all the points by at most this
+ *   fraction of the tube size when the tube size is the same at all the
+ *   points (no ltolx or ltoly tolerance). The tolerance is the fraction of
+ *   the smallest tube half-height, computed with the tolerances as in buildTube.
+ *   The decimated points are written into tDecimated and yDecimated, allocated
+ *   by the caller with nReference elements, and their number into nDecimated.
+ *   The status code and the error messages are stored in ctx.
+ */
+int decimateReference(
+  const double* tReference,
+  const double* yReference,
+  const size_t nReference,
+  const double atolx,
+  const double atoly,
+  const double ltolx,
+  const double ltoly,
+  const double rtolx,
+  const double rtoly,
+  const double fraction,
+  double* tDecimated,
+  double* yDecimated,
+  size_t* nDecimated,
+  struct context *ctx
+);
+
+/*
+ * Function: simplifyCurve
+ * -----------------------
+ *   Removes in place the points of a tube curve which lie on the segment
+ *   between the kept points around them, up to the rounding errors of the
+ *   interpolation (see removeCollinear), and returns the number of points left.
+ *   The curves returned or written by compareAndReport, compareInMemory,
+ *   compareIntoBuffers and compareFiles are simplified after the validation,
+ *   the curves of a tube built by the other functions are not.
+ */
+size_t simplifyCurve(double* t, double* y, size_t n);
+
+/*
+ * Function: validateTube
+ * -----------------------
+ *   Validates a test curve against a tube built with buildTube.
+ *   The arrays of errors are allocated by the caller: on entry, their sizes
+ *   must hold their capacity (at least nTest).
+ *   A tube can be used concurrently by several threads.
+ *   The status code and the error messages are stored in ctx.
+ */
+int validateTube(
+  const struct tube *tube,
+  const double* tTest,
+  const double* yTest,
+  const size_t nTest,
+  struct errorReport *errors,
+  struct context *ctx
+);
+
+/*
+ * Function: summarizeTube
+ * -----------------------
+ *   Same as validateTube, but only the aggregated errors (number of
+ *   violations, maximum error, integral of the error over x and fraction of
+ *   the x range outside the tube) are computed, without any per-point output.
+ *   If maxViolations is not 0, the validation stops after this number of
+ *   violations: summary->nPoints holds the number of validated test points
+ *   and summary->firstViolationX the x value of the first violation.
+ *   The status code and the error messages are stored in ctx.
+ */
+int summarizeTube(
+  const struct tube *tube,
+  const double* tTest,
+  const double* yTest,
+  const size_t nTest,
+  const size_t maxViolations,
+  struct errorSummary *summary,
+  struct context *ctx
+);
+
+/*
+ * Function: validateTubeRange
+ * -----------------------
+ *   Same as validateTube and summarizeTube, for the test points with x values
+ *   in [xMin, xMax] only (within the x range of the reference): the test
+ *   curve does not need to span the x range of the reference.
+ *   The test points in range and the starting segments of the tube curves
+ *   are found by binary search, so that the cost is O(log(n) + m) for m
+ *   test points in range.
+ *   errors and summary are optional (NULL): the arrays of errors must have
+ *   a capacity of at least the number of test points in range.
+ *   On return, the test points in range have the indices start to end
+ *   (excluded).
+ *   The status code and the error messages are stored in ctx.
+ */
+int validateTubeRange(
+  const struct tube *tube,
+  const double* tTest,
+  const double* yTest,
+  const size_t nTest,
+  const double xMin,
+  const double xMax,
+  struct errorReport *errors,
+  struct errorSummary *summary,
+  const size_t maxViolations,
+  size_t *start,
+  size_t *end,
+  struct context *ctx
+);
+
+/*
+ * Function: boundsTube
+ * -----------------------
+ *   Interpolates the lower and upper curves of a tube built with buildTube at
+ *   query x values, within the x range of the reference, in any order.
+ *   Sorted queries are interpolated in a single pass over the curves, and the
+ *   other queries are located by binary search in the curves: the values are
+ *   the same as the values used by validateTube.
+ *   The arrays lower and upper are allocated by the caller for nQuery values.
+ *   The status code and the error messages are stored in ctx.
+ */
+int boundsTube(
+  const struct tube *tube,
+  const double* tQuery,
+  const size_t nQuery,
+  double *lower,
+  double *upper,
+  struct context *ctx
+);
+
+/*
+ * Function: compareSummary
+ * -----------------------
+ *   Same computations as compareInMemory, but only the aggregated errors are
+ *   computed (see summarizeTube): no array is allocated for the test points.
+ *   If maxViolations is not 0, the tube is built window by window along the
+ *   reference, only up to the x value where the validation stops.
+ *   The status code and the error messages are stored in ctx.
+ */
+int compareSummary(
+  const double* tReference,
+  const double* yReference,
+  const size_t nReference,
+  const double* tTest,
+  const double* yTest,
+  const size_t nTest,
+  const double atolx,
+  const double atoly,
+  const double ltolx,
+  const double ltoly,
+  const double rtolx,
+  const double rtoly,
+  const size_t maxViolations,
+  struct errorSummary *summary,
+  struct context *ctx
+);
+
+/*
+ * Function: findMinTolerance
+ * -----------------------
+ *   Finds the smallest value of one tolerance for which the test curve is
+ *   inside the tube, the other tolerances being fixed, by bisection within
+ *   the library (no file is read or written). The tolerance is given by its
+ *   index which in the order of the arguments: 0 for atolx, 1 for atoly,
+ *   2 for ltolx, 3 for ltoly, 4 for rtolx and 5 for rtoly (its value in
+ *   the arguments is ignored).
+ *   The bisection stops when the relative distance between the failing and
+ *   passing values is not greater than precision: the passing value is
+ *   stored in tolerance.
+ *   The status code and the error messages are stored in ctx.
+ */
+int findMinTolerance(
+  const double* tReference,
+  const double* yReference,
+  const size_t nReference,
+  const double* tTest,
+  const double* yTest,
+  const size_t nTest,
+  const double atolx,
+  const double atoly,
+  const double ltolx,
+  const double ltoly,
+  const double rtolx,
+  const double rtoly,
+  const int which,
+  const double precision,
+  double *tolerance,
+  struct context *ctx
+);
+
+/*
+ * Function: compareBands
+ * -----------------------
+ *   Validates a test curve against several tolerance bands in a single pass
+ *   over the test points (e.g. "ok", "warning" and "alarm" grades).
+ *   The bands are ordered from the narrowest to the widest: band receives
+ *   for each test point the index of the first band containing it (nBands
+ *   if the point is outside all the bands), and summaries the aggregated
+ *   errors of each band (same as summarizeTube with the band tolerances).
+ *   The arrays band (nTest values) and summaries (nBands values) are
+ *   allocated by the caller.
+ *   The status code and the error messages are stored in ctx.
+ */
+int compareBands(
+  const double* tReference,
+  const double* yReference,
+  const size_t nReference,
+  const double* tTest,
+  const double* yTest,
+  const size_t nTest,
+  const struct tolerances *bands,
+  const size_t nBands,
+  int *band,
+  struct errorSummary *summaries,
+  struct context *ctx
+);
+
+/*
+ * Function: initStream
+ * -----------------------
+ *   Resets a stream before feeding a new test curve with feedStream.
+ */
+void initStream(struct stream *stream);
+
+/*
+ * Function: feedStream
+ * -----------------------
+ *   Validates the next chunk of a test curve against a tube built with
+ *   buildTube, for test data arriving over time.
+ *   The x values of a chunk must be within the reference x range and not
+ *   lower than the x values of the previous chunks: the cursors in the tube
+ *   curves and the aggregated errors of all the chunks are kept in stream,
+ *   so that the cost of a call only depends on the chunk size.
+ *   The arrays of errors are allocated by the caller as for validateTube
+ *   (errors may be NULL if only the aggregated errors are needed).
+ *   If errorsFile is not NULL, the errors of the chunk are appended to this
+ *   file, with the same format as errors.csv.
+ *   The status code and the error messages are stored in ctx.
+ */
+int feedStream(
+  const struct tube *tube,
+  struct stream *stream,
+  const double* tTest,
+  const double* yTest,
+  const size_t nTest,
+  struct errorReport *errors,
+  const char *errorsFile,
+  struct context *ctx
+);
+
+/*
+ * Function: buildEditableTube
+ * -----------------------
+ *   Same as buildTube, but the tube can be updated with updateTube when
+ *   the reference points are appended or locally replaced: the reference
+ *   points are copied into et.
+ *   The tube et->tube can be used with validateTube, summarizeTube and
+ *   feedStream (streams must be reset after an update).
+ *   The arrays of et are allocated by the library and must be released
+ *   with freeEditableTube. The status code and the error messages are stored in ctx.
+ */
+int buildEditableTube(
+  const double* tReference,
+  const double* yReference,
+  const size_t nReference,
+  const double atolx,
+  const double atoly,
+  const double ltolx,
+  const double ltoly,
+  const double rtolx,
+  const double rtoly,
+  struct editableTube *et,
+  struct context *ctx
+);
+
+/*
+ * Function: updateTube
+ * -----------------------
+ *   Replaces the reference points [start, end) of an editable tube by nNew
+ *   new points, with sorted x values consistent with the remaining points
+ *   (start = end = et->reference.n to append points).
+ *   The tube curves are only built again near the replaced points and
+ *   spliced into the stored curves, unless the tube size depends on the
+ *   range or magnitude of the reference (rtolx, rtoly) and the update changes
+ *   it. The x values are normalized with the magnitude of the reference at
+ *   the last full build, so the curves may differ from the curves of a new
+ *   tube by rounding errors when the magnitude of the x values changes.
+ *   The status code and the error messages are stored in ctx.
+ */
+int updateTube(
+  struct editableTube *et,
+  const size_t start,
+  const size_t end,
+  const double* tNew,
+  const double* yNew,
+  const size_t nNew,
+  struct context *ctx
+);
+
+/*
+ * Function: freeEditableTube
+ * -----------------------
+ *   Frees the arrays of an editable tube allocated by buildEditableTube.
+ */
+void freeEditableTube(struct editableTube *et);
+
+/*
+ * Function: compareFiles
+ * -----------------------
+ *   Same outputs as compareAndReport, with the reference and test data read
+ *   from CSV files with two columns (the lines which do not start with two
+ *   numbers are skipped), for data which do not fit in memory.
+ *   The files are read chunk by chunk: a first pass gets the data
+ *   characteristics of the reference, then the tube is built over windows
+ *   of chunkSize reference points (the windows overlap so that the curves are
+ *   the same as the curves built over all the reference points), and the
+ *   test points are validated and all the outputs are written incrementally.
+ *   The memory usage is set by chunkSize (the windows only grow if they are
+ *   too small compared to the tube size), except if the tube height depends
+ *   on the reference points (ltoly larger than the other y tolerances) or if
+ *   the reference x values are not sorted: the tube is then built over all
+ *   the reference points, held in memory.
+ *   The status code and the error messages are stored in ctx.
+ */
+int compareFiles(
+  const char *referenceFile,
+  const char *testFile,
+  const char *outputDirectory,
+  const double atolx,
+  const double atoly,
+  const double ltolx,
+  const double ltoly,
+  const double rtolx,
+  const double rtoly,
+  const size_t chunkSize,
+  struct context *ctx
+);
+
+/*
+ * Function: freeTube
+ * -----------------------
+ *   Frees the arrays of a tube allocated by buildTube.
+ */
+void freeTube(struct tube *tube);
+
 #endif /* COMPARE_H_ */
@@ -0,0 +1,60 @@
+/*
+ * context.c
+ *
+ * Functions:
+ * ----------
+ *   initContext: reset status, messages and arena of a context
+ *   logError: append an error message to a context
+ */
+
+#include <stdarg.h>
+#include <stdio.h>
+#include <string.h>
+
+#include "data_structure.h"
+#include "context.h"
+#include "arena.h"
+
+/*
+ * Function: initContext
+ * ---------------------
+ *   reset status and messages of a context, and initialize its arena
+ *   (the arena of a previous call must have been released). The allocation
+ *   statistics of the arena are kept (see struct arena).
+ *
+ *   ctx: context to reset
+ */
+void initContext(struct context *ctx) {
+  ctx->status = 0;
+  ctx->length = 0;
+  ctx->message[0] = '\0';
+  initArena(&ctx->arena);
+}
+
+/*
+ * Function: logError
+ * ------------------
+ *   append an error message to the message buffer of a context.
+ *   The message is truncated if the buffer is full.
+ *   If ctx is NULL, the message is output to stderr.
+ *
+ *   ctx: context of the current call
+ *   format: printf-like format of the message, followed by its arguments
+ */
+void logError(struct context *ctx, const char *format, ...) {
+  va_list args;
+  int written;
+
+  va_start(args, format);
+  if (ctx == NULL) {
+    vfprintf(stderr, format, args);
+  } else if (ctx->length < CONTEXT_MESSAGE_SIZE - 1) {
+    written = vsnprintf(
+      ctx->message + ctx->length, CONTEXT_MESSAGE_SIZE - ctx->length, format, args);
+    if (written > 0) {
+      ctx->length += (size_t)written;
+      if (ctx->length > CONTEXT_MESSAGE_SIZE - 1) ctx->length = CONTEXT_MESSAGE_SIZE - 1;
+    }
+  }
+  va_end(args);
+}
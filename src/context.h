@@ -0,0 +1,17 @@
+/*
+ * context.h
+ *
+ *  Per-call context used to report errors without any process-wide state,
+ *  so that the library functions can be called concurrently from several threads.
+ */
+
+#ifndef CONTEXT_H_
+#define CONTEXT_H_
+
+#include "data_structure.h"
+
+void initContext(struct context *ctx);
+
+void logError(struct context *ctx, const char *format, ...);
+
+#endif /* CONTEXT_H_ */
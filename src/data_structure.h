@@ -9,6 +9,7 @@
 #define DATA_STRUCTURE_H_
 
 #include <sys/types.h>
+#include <stdint.h>
 
 struct data {
   double *x;
@@ -23,12 +24,31 @@ struct data_char {
   double mag_y;    /* Magnitude of y */
 };
 
+/*
+ * Analysis of the reference curve which does not depend on the tolerances:
+ * the reference points where the tube curves have corners, and which
+ * corners of the rectangle around them are added (see getTube).
+ */
+struct referenceProfile {
+  uint64_t hash;              /* Content hash of the reference points */
+  size_t nReference;          /* Number of reference points */
+  struct data_char dat_char;  /* Data characteristics of the reference */
+  size_t first;               /* First reference point (identical points at the beginning are ignored) */
+  int firstSign;              /* Sign of the slope after the first point */
+  int lastSign;               /* Sign of the slope before the last point */
+  size_t *corners;            /* Reference points where corners are added, in increasing order */
+  unsigned char *kinds;       /* Kind of the corners added at each of these points */
+  size_t nCorners;            /* Number of these points */
+};
+
 struct errorReport {
   struct data original;
   struct data diff;
 };
 
 struct reports {
+  struct data lower;  /* Lower curve of the tube */
+  struct data upper;  /* Upper curve of the tube */
   struct errorReport errors;
 };
 
@@ -41,4 +61,85 @@ struct tolerances {
 	double rtoly;  /* Relative tolerance in y (relatively to range) */
 };
 
+struct errorSummary {
+  size_t nPoints;          /* Number of validated test points */
+  size_t nViolations;      /* Number of test points outside the tube */
+  double maxError;         /* Maximum error */
+  double integral;         /* Integral of the error over x (trapezoidal rule) */
+  double lengthOutside;    /* Length of the x range where the test curve is outside the tube */
+  double fractionOutside;  /* Fraction of the x range where the test curve is outside the tube */
+  double firstX;           /* x value of the first validated test point */
+  double lastX;            /* x value of the last validated test point */
+  double lastError;        /* Error at the last validated test point */
+  double firstViolationX;  /* x value of the first violation (NaN if no violation) */
+};
+
+struct tubeCursor {
+  size_t jLower;  /* Cursor in the lower curve of the tube */
+  size_t jUpper;  /* Cursor in the upper curve of the tube */
+};
+
+struct stream {
+  struct tubeCursor cursor;     /* Cursors kept between successive chunks */
+  struct errorSummary summary;  /* Aggregated errors of all the chunks */
+};
+
+/*
+ * Block index of the tube curves: over each block of x values, any test value
+ * strictly between lower[k] and upper[k] is inside the tube.
+ */
+struct zoneMap {
+  double *x;      /* Limits of the blocks (n + 1 values) */
+  double *lower;  /* Maximum of the lower curve over each block (with a rounding margin) */
+  double *upper;  /* Minimum of the upper curve over each block (with a rounding margin) */
+  size_t n;       /* Number of blocks */
+};
+
+struct tube {
+  struct data lower;  /* Lower curve of the tube */
+  struct data upper;  /* Upper curve of the tube */
+  double firstX;      /* First x value of the reference */
+  double lastX;       /* Last x value of the reference */
+  struct zoneMap zones;  /* Block index of the curves */
+};
+
+struct editableTube {
+  struct tube tube;              /* Tube curves */
+  struct data reference;         /* Copy of the reference points */
+  size_t capReference;           /* Capacity of the reference arrays */
+  size_t capLower;               /* Capacity of the lower curve arrays */
+  size_t capUpper;               /* Capacity of the upper curve arrays */
+  size_t capZones;               /* Capacity of the block index arrays */
+  struct tolerances tolerances;  /* Tolerance values */
+  struct data_char dat_char;     /* Data characteristics of the last full build */
+  double minY;                   /* Minimum y value of the reference */
+  double maxY;                   /* Maximum y value of the reference */
+};
+
+/* Block of memory of an arena (see arena.c) */
+struct arenaBlock;
+
+/*
+ * Memory of the temporary arrays of a library call, which are all released
+ * in one step at the end of the call (see arena.c).
+ * The statistics are accumulated over the calls made with the same context:
+ * they are only reset when the caller fills the context with zeros.
+ */
+struct arena {
+  struct arenaBlock *block;  /* Current block, linked to the previous ones */
+  size_t bytes;              /* Size of the blocks currently allocated */
+  size_t peakBytes;          /* Maximum size of the blocks allocated at the same time */
+  size_t allocations;        /* Number of arrays allocated */
+};
+
+/* Size of the message buffer of a context (including the terminating null character) */
+#define CONTEXT_MESSAGE_SIZE 4096
+
+struct context {
+  int status;                           /* Status code of the call (0 if success) */
+  size_t length;                        /* Length of the messages */
+  char message[CONTEXT_MESSAGE_SIZE];   /* Error messages of the call */
+  struct arena arena;                   /* Temporary arrays of the call */
+};
+
 #endif /* DATA_STRUCTURE_H_ */
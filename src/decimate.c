@@ -0,0 +1,187 @@
+/*
+ * decimate.c
+ *
+ * Functions:
+ * ----------
+ *   initPointFilter: initialize the scan of the points of a curve
+ *   filterPoint: scan the next point of a curve
+ *   flushPointFilter: keep the last point of a curve
+ *   decimateData: remove the reference points close to the line through their neighbors
+ *   removeCollinear: remove the points of a tube curve on the segment between their neighbors
+ *
+ * A point is removed if it lies within the tolerance, along y, of the segment
+ * between the previous and the next kept points. The decimated curve then stays
+ * within the tolerance of the reference curve along y, and so do the tube curves
+ * as long as the tube size is the same at all the points. With a tolerance of
+ * the order of the rounding errors, only the points of the tube curves which
+ * lie on a straight segment are removed, without changing the interpolated curves.
+ *
+ * The points are scanned once: starting from the last kept point (anchor),
+ * the interval of the slopes of the lines through the anchor within the
+ * tolerance of all the following points is narrowed point by point. A point
+ * is kept when the slope from the anchor to the next point is out of the
+ * interval. Constant or linear segments are thus reduced to their ends, in a
+ * time proportional to the number of points. As the decision only depends on
+ * the points scanned so far, a curve written piece by piece is decimated as
+ * the whole curve.
+ */
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <math.h>
+
+#include "data_structure.h"
+#include "decimate.h"
+
+#ifndef max
+#define max(a,b) ((a) > (b) ? (a) : (b))
+#endif
+
+#ifndef min
+#define min(a,b) ((a) < (b) ? (a) : (b))
+#endif
+
+/*
+ * Function: keepPoint
+ * -------------------
+ *   append a point to the kept points and make it the anchor of the filter
+ */
+static void keepPoint(struct pointFilter *filter, double x, double y, struct data *kept) {
+  kept->x[kept->n] = x;
+  kept->y[kept->n] = y;
+  kept->n++;
+  filter->anchorX = x;
+  filter->anchorY = y;
+  filter->lo = -INFINITY;
+  filter->hi = INFINITY;
+  filter->pending = 1;
+}
+
+/*
+ * Function: initPointFilter
+ * -------------------------
+ *   initialize the scan of the points of a curve
+ *
+ *   filter: filter to initialize
+ *   tolerance: absolute tolerance along y
+ *   rounding: tolerance along y relatively to the largest magnitude of y
+ *             of a removed point and of the anchor
+ */
+void initPointFilter(struct pointFilter *filter, double tolerance, double rounding) {
+  filter->tolerance = tolerance;
+  filter->rounding = rounding;
+  filter->pending = 0;
+}
+
+/*
+ * Function: filterPoint
+ * ---------------------
+ *   scan the next point of a curve: the previous point is kept if the segment
+ *   from the anchor to this point is farther than the tolerance from a point
+ *   since the anchor. The first point, the points of a discontinuity (same x)
+ *   and the points with keep set are always kept.
+ *
+ *   filter: filter initialized with initPointFilter
+ *   x, y: coordinates of the point
+ *   keep: if not 0, the point is kept
+ *   kept: receives the kept points (up to 2 points are appended,
+ *         the arrays may be the arrays of the scanned curve)
+ */
+void filterPoint(struct pointFilter *filter, double x, double y, int keep, struct data *kept) {
+  double dx, slope, tolerance;
+
+  if (filter->pending == 0) {
+    keepPoint(filter, x, y, kept);
+    return;
+  }
+  dx = x - filter->anchorX;
+  if (filter->pending == 2) {
+    slope = (y - filter->anchorY) / dx;
+    if (!(dx > 0) || slope < filter->lo || slope > filter->hi) {
+      /* The segment from the anchor to this point is too far from a point in between. */
+      keepPoint(filter, filter->lastX, filter->lastY, kept);
+      dx = x - filter->anchorX;
+    }
+  }
+  if (!(dx > 0) || keep) {
+    keepPoint(filter, x, y, kept);
+    return;
+  }
+  tolerance = filter->tolerance + filter->rounding * max(fabs(filter->anchorY), fabs(y));
+  filter->lo = max(filter->lo, (y - tolerance - filter->anchorY) / dx);
+  filter->hi = min(filter->hi, (y + tolerance - filter->anchorY) / dx);
+  filter->lastX = x;
+  filter->lastY = y;
+  filter->pending = 2;
+}
+
+/*
+ * Function: flushPointFilter
+ * --------------------------
+ *   keep the last scanned point of a curve
+ *
+ *   filter: filter used to scan the curve
+ *   kept: receives the last point if it is not kept yet
+ */
+void flushPointFilter(struct pointFilter *filter, struct data *kept) {
+  if (filter->pending == 2) keepPoint(filter, filter->lastX, filter->lastY, kept);
+}
+
+/*
+ * Function: decimateData
+ * ----------------------
+ *   remove the reference points within the tolerance of the line through the
+ *   previous and the next kept points. The first and last points, the points
+ *   of minimum and maximum y (so that the data characteristics are unchanged)
+ *   and the points of a discontinuity (same x) are always kept.
+ *
+ *   reference: reference curve
+ *   tolerance: maximum distance along y between a removed point and the decimated curve
+ *   decimated: decimated curve, with arrays of the size of the reference curve
+ *
+ *   return: number of points of the decimated curve (also stored in decimated->n)
+ */
+size_t decimateData(
+  const struct data *reference,
+  double tolerance,
+  struct data *decimated
+) {
+  struct pointFilter filter;
+  size_t i, iMin = 0, iMax = 0;
+
+  for (i = 1; i < reference->n; i++) {
+    if (reference->y[i] < reference->y[iMin]) iMin = i;
+    if (reference->y[i] > reference->y[iMax]) iMax = i;
+  }
+  decimated->n = 0;
+  initPointFilter(&filter, tolerance, 0);
+  for (i = 0; i < reference->n; i++) {
+    filterPoint(&filter, reference->x[i], reference->y[i], i == iMin || i == iMax, decimated);
+  }
+  flushPointFilter(&filter, decimated);
+  return decimated->n;
+}
+
+/*
+ * Function: removeCollinear
+ * -------------------------
+ *   remove the points of a tube curve which lie on the segment between the
+ *   kept points around them, up to the rounding errors of the interpolation
+ *   of the curve (see COLLINEAR_ROUNDING). The curve is updated in place
+ *   (the arrays are not reallocated).
+ *
+ *   curve: tube curve
+ *
+ *   return: number of points of the curve (also stored in curve->n)
+ */
+size_t removeCollinear(struct data *curve) {
+  struct pointFilter filter;
+  size_t i, n = curve->n;
+
+  /* A kept point is written at an index not above the index of the scanned point. */
+  curve->n = 0;
+  initPointFilter(&filter, 0, COLLINEAR_ROUNDING);
+  for (i = 0; i < n; i++) filterPoint(&filter, curve->x[i], curve->y[i], 0, curve);
+  flushPointFilter(&filter, curve);
+  return curve->n;
+}
@@ -0,0 +1,42 @@
+/*
+ * decimate.h
+ *
+ *  Removal of the reference points which do not change the tube by more
+ *  than a given tolerance, and of the collinear points of the tube curves.
+ */
+
+#ifndef DECIMATE_H_
+#define DECIMATE_H_
+
+#include <float.h>
+
+#include "data_structure.h"
+
+/* Distance between a point and a segment considered as rounding, relatively to the magnitude of y */
+#define COLLINEAR_ROUNDING (16 * DBL_EPSILON)
+
+/* Points of a curve scanned one by one (see filterPoint) */
+struct pointFilter {
+  double tolerance;         /* Absolute tolerance along y */
+  double rounding;          /* Tolerance along y relatively to the magnitude of y */
+  double anchorX, anchorY;  /* Last kept point */
+  double lastX, lastY;      /* Last scanned point, not kept yet */
+  double lo, hi;            /* Slopes from the anchor within the tolerance of the points since the anchor */
+  int pending;              /* 0: no point scanned, 1: last point kept, 2: last point not kept yet */
+};
+
+void initPointFilter(struct pointFilter *filter, double tolerance, double rounding);
+
+void filterPoint(struct pointFilter *filter, double x, double y, int keep, struct data *kept);
+
+void flushPointFilter(struct pointFilter *filter, struct data *kept);
+
+size_t decimateData(
+  const struct data *reference,
+  double tolerance,
+  struct data *decimated
+);
+
+size_t removeCollinear(struct data *curve);
+
+#endif /* DECIMATE_H_ */
@@ -7,6 +7,10 @@
  * Functions:
  * ----------
  *   readCSV : reads in CSV file and returns data structure
+ *   openCSV : opens a CSV file to be read chunk by chunk
+ *   readCSVRows : reads the next rows of a CSV file
+ *   rewindCSV : goes back to the beginning of a CSV file
+ *   closeCSV : closes a CSV file read chunk by chunk
  */
 
 #include <stdio.h>
@@ -48,8 +52,8 @@ struct data readCSV(const char * filename, int skipLines) {
   struct data inputs;
   double *time;
   double *value;
-  int arraySize = 1;
-  int rowCount = 0;
+  size_t arraySize = 1;
+  size_t rowCount = 0;
   char buf[100];
 
   FILE *fp;
@@ -65,19 +69,19 @@ struct data readCSV(const char * filename, int skipLines) {
     fprintf(stderr, "No such file: %s\n", filename);
   }
   
-  time = malloc(sizeof(double) * arraySize);
+  time = malloc(sizeof(double) * (arraySize + 1));
   if (time == NULL){
     fputs("Error: Failed to allocate memory for time.\n", stderr);
     exit(1);
   }
-  value = malloc(sizeof(double) * arraySize);
+  value = malloc(sizeof(double) * (arraySize + 1));
   if (value == NULL){
 	  fputs("Error: Failed to allocate memory for value.\n", stderr);
 	  exit(1);
   }
 
-  memset(time,0,sizeof(double)*arraySize);
-  memset(value,0,sizeof(double)*arraySize);
+  memset(time,0,sizeof(double)*(arraySize + 1));
+  memset(value,0,sizeof(double)*(arraySize + 1));
 
   for (i=0; i<skipLines; i++) {
     fgets(buf,100,fp); // skip the first "skipLines" lines
@@ -86,7 +90,7 @@ struct data readCSV(const char * filename, int skipLines) {
   while (fscanf(fp, "%lf%*[,;]%lf\n", &time[rowCount], &value[rowCount]) == 2) {
     if (rowCount == arraySize ) {
       // need more space
-      arraySize += 5;
+      arraySize *= 2;
       double *time_tmp = realloc(time, sizeof(double)*(arraySize+1));
       double *value_tmp = realloc(value, sizeof(double)*(arraySize+1));
       if (time_tmp == NULL || value_tmp == NULL) {
@@ -106,3 +110,80 @@ struct data readCSV(const char * filename, int skipLines) {
 
   return inputs;
 }
+
+/*
+ * Function: openCSV
+ * -----------------
+ *   open a CSV file to be read chunk by chunk with readCSVRows
+ *
+ *   reader: reader of the file
+ *   filename: path to the CSV file
+ *
+ *   returns: 0 if there was success
+ */
+int openCSV(struct csvReader *reader, const char *filename) {
+  reader->fp = fopen(filename, "r");
+  reader->eof = 0;
+  return reader->fp == NULL ? -1 : 0;
+}
+
+/*
+ * Function: readCSVRows
+ * ---------------------
+ *   read the next rows of a CSV file with two columns, delimited by comma
+ *   or semicolon. The lines which do not start with two numbers (such as
+ *   the header) are skipped.
+ *
+ *   reader: reader of the file
+ *   x: array receiving the values of the first column
+ *   y: array receiving the values of the second column
+ *   maxRows: capacity of x and y
+ *
+ *   returns: number of rows read (lower than maxRows only at the end of the file)
+ */
+size_t readCSVRows(struct csvReader *reader, double *x, double *y, size_t maxRows) {
+  size_t rowCount = 0;
+  size_t len;
+  char buf[256];
+  int c;
+
+  while (rowCount < maxRows && !reader->eof) {
+    if (fgets(buf, sizeof(buf), reader->fp) == NULL) {
+      reader->eof = 1;
+      break;
+    }
+    len = strlen(buf);
+    if (len > 0 && buf[len - 1] != '\n') {
+      // skip the end of long lines
+      while ((c = fgetc(reader->fp)) != EOF && c != '\n');
+    }
+    if (sscanf(buf, "%lf%*[,;]%lf", &x[rowCount], &y[rowCount]) == 2) {
+      rowCount++;
+    }
+  }
+  return rowCount;
+}
+
+/*
+ * Function: rewindCSV
+ * -------------------
+ *   go back to the beginning of a CSV file read chunk by chunk
+ *
+ *   reader: reader of the file
+ */
+void rewindCSV(struct csvReader *reader) {
+  rewind(reader->fp);
+  reader->eof = 0;
+}
+
+/*
+ * Function: closeCSV
+ * ------------------
+ *   close a CSV file read chunk by chunk
+ *
+ *   reader: reader of the file
+ */
+void closeCSV(struct csvReader *reader) {
+  if (reader->fp != NULL) fclose(reader->fp);
+  reader->fp = NULL;
+}
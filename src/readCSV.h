@@ -8,6 +8,22 @@
 #ifndef READCSV_H_
 #define READCSV_H_
 
+#include <stdio.h>
+
+/* Reader of a CSV file chunk by chunk */
+struct csvReader {
+  FILE *fp;  /* File being read */
+  int eof;   /* 1 if the end of the file is reached */
+};
+
 struct data readCSV(const char * filename, int skipLines);
 
+int openCSV(struct csvReader *reader, const char *filename);
+
+size_t readCSVRows(struct csvReader *reader, double *x, double *y, size_t maxRows);
+
+void rewindCSV(struct csvReader *reader);
+
+void closeCSV(struct csvReader *reader);
+
 #endif /* READCSV_H_ */
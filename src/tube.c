@@ -6,9 +6,12 @@
  *
  * Functions:
  * ----------
- *   interpolateValues: interpolate sources data points
- *   compare: compare test value with tube
+ *   interpolateAt: interpolate source data points at a target x value
+ *   cursorAt: find the cursor in the source data for a target x value
+ *   queryAt: interpolate source data points at target x values in any order
+ *   initSummary: reset the aggregated errors
  *   validate: validate test curve and generate error report
+ *   validateBands: validate test curve against several tolerance bands
  */
 
 
@@ -20,179 +23,350 @@
 #include "data_structure.h"
 #include "tubeSize.h"
 #include "tube.h"
+#include "zoneMap.h"
+#include "arena.h"
 
-#ifndef min
-#define min(a,b) ((a) < (b) ? (a) : (b))
-#endif
+/* Number of source points scanned by queryAt before a binary search */
+#define QUERY_SCAN 8
 
 #ifndef equ
 #define equ(a,b) (fabs(a-b) < 1e-10 ? true : false)
 #endif
 
 /*
- * Function: interpolateValues
- * ---------------------------
- *   interpolate sources data points,
- *                                 sourceY[j] - sourceY[j-1]
- *     targetY[i] = sourceY[j-1] + ------------------------- * (targetX[i] - sourceX[j-1])
- *                                 sourceX[j] - sourceX[j-1]
- *
- *   sourceX: source data x value
- *   sourceY: source data y value
- *   sourceLength: total source data points
- *   targetX: target data x value
- *   targetLength: total target data points
- *
- *   return: targetY -- target data y value
+ * Function: interpolateAt
+ * -----------------------
+ *   interpolate source data points at a target x value,
+ *                              sourceY[j] - sourceY[j-1]
+ *     targetY = sourceY[j-1] + ------------------------- * (targetX - sourceX[j-1])
+ *                              sourceX[j] - sourceX[j-1]
+ *
+ *   source: source data
+ *   j: cursor in the source data, initialized to 1 and advanced by successive
+ *      calls with non decreasing target x values
+ *   targetX: target x value
+ *
+ *   return: targetY -- target y value (the last source y value is returned
+ *           for target x values beyond the last source x value)
  */
-double * interpolateValues(double* sourceX, double* sourceY, int sourceLength, double* targetX, int targetLength) {
-  if (sourceY == NULL || sourceLength == 0) {
-    return sourceY;
+double interpolateAt(const struct data *source, size_t *j, double targetX) {
+  double x0, x1, y0, y1;
+
+  // Prevent extrapolating
+  if (source->n < 2 || targetX > source->x[source->n-1]) {
+    return source->y[source->n-1];
   }
-  int i;
-  double* targetY = malloc(targetLength * sizeof(double));
-  if (targetY == NULL){
-  	  fputs("Error: Failed to allocate memory for targetY.\n", stderr);
-  	  exit(1);
+
+  x1 = source->x[*j];
+  y1 = source->y[*j];
+
+  // Step sourceX to current targetX
+  while ((x1<targetX) && (*j+1 < source->n)) {
+    (*j)++;
+    x1 = source->x[*j];
+    y1 = source->y[*j];
   }
-  int j = 1;
-  double x, x0, x1, y0, y1;
-
-  for (i=0; i<targetLength; i++) {
-    // Prevent extrapolating
-    if (targetX[i] > sourceX[sourceLength-1]) {
-      double *tmp = realloc(targetY, sizeof(double)*i);
-      if (tmp == NULL){
-    	  fputs("Error: Failed to reallocate memory for tmp.\n", stderr);
-    	  exit(1);
-      }
-      targetY = tmp;
-      break;
-    }
 
-    x = targetX[i];
-    x1 = sourceX[j];
-    y1 = sourceY[j];
+  x0 = source->x[*j-1];
+  y0 = source->y[*j-1];
 
-    // Step sourceX to current targetX
-    while ((x1<x) && (j+1 < sourceLength)) {
-      j++;
-      x1 = sourceX[j];
-      y1 = sourceY[j];
-    }
+  // Prevent NaN -> division by zero
+  if (!equ((x1-x0)*(targetX-x0), 0)) {
+    return y0 + (((y1 - y0) / (x1 - x0)) * (targetX - x0));
+  } else {
+    return y0;
+  }
+}
 
-    x0 = sourceX[j-1];
-    y0 = sourceY[j-1];
+/*
+ * Function: cursorAt
+ * ------------------
+ *   binary search of the cursor in the source data for a target x value:
+ *   same cursor as reached by interpolateAt from 1, without scanning the
+ *   source data before the target x value
+ *
+ *   source: source data (non decreasing x values)
+ *   targetX: target x value
+ *
+ *   return: j -- first index from 1 with sourceX[j] >= targetX (n-1 if none)
+ */
+size_t cursorAt(const struct data *source, double targetX) {
+  size_t lo = 1, hi, mid;
 
-    // Prevent NaN -> division by zero
-    if (!equ((x1-x0)*(x-x0), 0)) {
-      targetY[i] = y0 + (((y1 - y0) / (x1 - x0)) * (x - x0));
-    } else {
-      targetY[i] = y0;
+  if (source->n < 2) return 1;
+  hi = source->n - 1;
+  while (lo < hi) {
+    mid = lo + (hi - lo) / 2;
+    if (source->x[mid] < targetX) lo = mid + 1;
+    else hi = mid;
+  }
+  return lo;
+}
+
+/*
+ * Function: queryAt
+ * -----------------
+ *   interpolate source data points at a target x value in any order:
+ *   the cursor is advanced as in interpolateAt if the target x value is
+ *   at most QUERY_SCAN points ahead, otherwise it is found by binary search
+ *
+ *   source: source data
+ *   j: cursor in the source data, initialized to 1 and kept between calls
+ *   targetX: target x value
+ *
+ *   return: targetY -- same target y value as interpolateAt
+ */
+double queryAt(const struct data *source, size_t *j, double targetX) {
+  size_t ahead;
+
+  if (source->n >= 2) {
+    ahead = *j + QUERY_SCAN < source->n ? *j + QUERY_SCAN : source->n - 1;
+    if ((*j > 1 && !(source->x[*j-1] < targetX)) || source->x[ahead] < targetX) {
+      *j = cursorAt(source, targetX);
     }
   }
+  return interpolateAt(source, j, targetX);
+}
 
-  return targetY;
+/*
+ * Function: initSummary
+ * ---------------------
+ *   reset the aggregated errors before validating a test curve
+ *
+ *   summary: aggregated errors
+ */
+void initSummary(struct errorSummary* summary) {
+  memset(summary, 0, sizeof(struct errorSummary));
+  summary->firstViolationX = NAN;
 }
 
 /*
- * Function: compare
- * -------------------
- *   compare test value with data tube
- *
- *   lower: lower tube curve value
- *   upper: upper tube curve value
- *   refLen: total data points in tube curve
- *   testY: test curve value
- *   testX: test curve time value
- *   testLen: total data points in test curve
- *
- *   return: errorReport, data structure which includes;
- *              err->x -- time when there is error
- *              err->y -- error value
- *           err->n -- total time moment when there is error
+ * Function: errorAt
+ * -----------------
+ *   error of a test point: the tube curves are interpolated unless the test
+ *   value is strictly inside the bounds of its block
+ *
+ *   lower, upper: tube curves
+ *   zones: block index of the tube curves (NULL if not available)
+ *   k: block of the previous test point (advanced to the block of x)
+ *   jLower, jUpper: cursors in the tube curves (see interpolateAt)
+ *   x, y: test point
+ *   error: receives the error (0 if the point is inside the tube)
+ *
+ *   return: true if the point is outside the tube
  */
-int compare(double* lower, double* upper, int refLen,
-  double* testY, double* testX, int testLen,
-  struct errorReport* err) {
-  size_t i;
-  size_t errArrSize = 1;
-  err->original.n = 0;
-  err->original.x = malloc(errArrSize * sizeof(double));
-  if (err->original.x == NULL){
-    fputs("Error: Failed to allocate memory for err->original.x.\n", stderr);
-    return -1;
+static bool errorAt(
+  const struct data *lower,
+  const struct data *upper,
+  const struct zoneMap *zones,
+  size_t *k,
+  size_t *jLower,
+  size_t *jUpper,
+  double x,
+  double y,
+  double *error) {
+  double lowerY, upperY;
+
+  if (zones != NULL) {
+    while (*k < zones->n && zones->x[*k+1] < x) (*k)++;
+    if (*k < zones->n && x >= zones->x[*k] && y > zones->lower[*k] && y < zones->upper[*k]) {
+      // inside the bounds of the block: the curves are not interpolated
+      *error = 0.0;
+      return false;
+    }
   }
-  err->original.y = malloc(errArrSize * sizeof(double));
-  if (err->original.y == NULL){
-    fputs("Error: Failed to allocate memory for err->original.y.\n", stderr);
-    return -1;
+  lowerY = interpolateAt(lower, jLower, x);
+  upperY = interpolateAt(upper, jUpper, x);
+  if (y < lowerY) {
+    *error = lowerY-y;
+  } else if (y > upperY) {
+    *error = y-upperY;
+  } else {
+    *error = 0.0;
   }
+  return y < lowerY || y > upperY;
+}
+
+/*
+ * Function: addToSummary
+ * ----------------------
+ *   add the error of a test point to the aggregated errors
+ *
+ *   summary: aggregated errors
+ *   x: x value of the test point
+ *   error: error of the test point
+ *   outside: true if the test point is outside the tube
+ */
+static void addToSummary(struct errorSummary* summary, double x, double error, bool outside) {
+  double dx;
 
-  err->diff.n = min(testLen, refLen);
-  err->diff.x = malloc(err->diff.n * sizeof(double));
-  if (err->diff.x == NULL){
-    fputs("Error: Failed to allocate memory for err->diff.x.\n", stderr);
-    return -1;
+  if (outside) {
+    if (summary->nViolations == 0) summary->firstViolationX = x;
+    summary->nViolations++;
   }
-  err->diff.y = malloc(err->diff.n * sizeof(double));
-  if (err->diff.y == NULL){
-    fputs("Error: Failed to allocate memory for err->diff.y.\n", stderr);
-    return -1;
+  if (error > summary->maxError) summary->maxError = error;
+  if (summary->nPoints == 0) {
+    summary->firstX = x;
+  } else {
+    // trapezoidal rule
+    dx = x - summary->lastX;
+    summary->integral += 0.5 * (error + summary->lastError) * dx;
+    summary->lengthOutside += 0.5 * ((error > 0) + (summary->lastError > 0)) * dx;
   }
+  summary->lastX = x;
+  summary->lastError = error;
+  summary->nPoints++;
+}
 
-  for (i=0; i < err->diff.n; i++) {
-    if (testY[i] < lower[i] || testY[i] > upper[i]) {
-      err->original.x[err->original.n] = testX[i];
-      if (testY[i] < lower[i]) {
-        err->original.y[err->original.n] = lower[i]-testY[i];
-      } else {
-        err->original.y[err->original.n] = testY[i]-upper[i];
-      }
-      err->diff.y[i] = err->original.y[err->original.n];
-      err->original.n++;
-    } else {
-      err->diff.y[i] = 0.0;
-    }
-    err->diff.x[i] = testX[i];
-    // resize error arrays
-    if (err->original.n == errArrSize) {
-      errArrSize += 10;
-      err->original.x = realloc(err->original.x, sizeof(double)*errArrSize);
-      if (err->original.x == NULL){
-        fputs("Error: Failed to reallocate memory for err->original.x.\n", stderr);
-        return -1;
-      }
+/*
+ * Function: finishSummary
+ * -----------------------
+ *   compute the fraction of the x range outside the tube from the
+ *   aggregated errors
+ *
+ *   summary: aggregated errors
+ */
+static void finishSummary(struct errorSummary* summary) {
+  double dx;
 
-      err->original.y = realloc(err->original.y, sizeof(double)*errArrSize);
-      if (err->original.y == NULL){
-        fputs("Error: Failed to reallocate memory for err->original.y.\n", stderr);
-        return -1;
-      }
+  if (summary->nPoints > 0) {
+    dx = summary->lastX - summary->firstX;
+    if (dx > 0) {
+      summary->fractionOutside = summary->lengthOutside / dx;
+    } else {
+      summary->fractionOutside = (double)summary->nViolations / (double)summary->nPoints;
     }
   }
-  return 0;
 }
 
-
 /*
  * Function: validate
  * ------------------
- *   validate test curve and generate error report
+ *   validate test curve and generate error report.
+ *   The tube curves are interpolated at each test point and the test value is
+ *   compared with the tube in a single pass (no intermediate array).
  *
  *   lower: data structure for lower curve
  *   upper: data structure for upper curve
  *   test: data structure for test curve
+ *   err: error report, with arrays allocated by the caller for test.n values
+ *        (NULL if no error report is needed)
+ *   summary: aggregated errors computed on the fly (NULL if not needed).
+ *            It must be initialized with initSummary: successive calls with
+ *            consecutive parts of a test curve accumulate the errors.
+ *   maxViolations: if not 0, stop after this number of violations
+ *                  (requires summary, whose nPoints is the number of validated
+ *                  test points)
+ *   cursor: cursors in the tube curves, initialized to 1 and kept between
+ *           calls with consecutive parts of a test curve (NULL if the
+ *           whole test curve is validated at once)
+ *   zones: block index of the tube curves (NULL if not available): the test
+ *          values strictly inside the bounds of their block are inside the
+ *          tube, without interpolating the curves
  *
- *   return: 0 if there was success
+ *   return: 0 if there was success, err is updated with;
+ *              err->original -- time and error value when there is error
+ *              err->diff -- time and error value (0 if no error) for all test points
  */
 int validate(
   const struct data lower,
   const struct data upper,
   const struct data test,
-  struct errorReport* err) {
-    double *newLower = interpolateValues(lower.x, lower.y, lower.n, test.x, test.n);
-    double *newUpper = interpolateValues(upper.x, upper.y, upper.n, test.x, test.n);
-    int retVal = compare(newLower, newUpper, test.n, test.y, test.x, test.n, err);
-    return retVal;
+  struct errorReport* err,
+  struct errorSummary* summary,
+  size_t maxViolations,
+  struct tubeCursor* cursor,
+  const struct zoneMap* zones) {
+  size_t i;
+  size_t jLower = cursor != NULL ? cursor->jLower : 1;  // cursors in the tube curves
+  size_t jUpper = cursor != NULL ? cursor->jUpper : 1;
+  size_t k = 0;  // block of the test point
+  double error;
+  bool outside;
+
+  if (lower.n == 0 || upper.n == 0) return 1;
+  if (err != NULL) {
+    err->original.n = 0;
+    err->diff.n = 0;
+  }
+  if (zones != NULL && zones->n == 0) zones = NULL;
+  if (zones != NULL && test.n > 0) k = zoneAt(zones, test.x[0]);
+
+  for (i=0; i < test.n; i++) {
+    if (summary != NULL && maxViolations > 0 && summary->nViolations >= maxViolations) break;
+    outside = errorAt(&lower, &upper, zones, &k, &jLower, &jUpper, test.x[i], test.y[i], &error);
+    if (err != NULL) {
+      if (outside) {
+        err->original.x[err->original.n] = test.x[i];
+        err->original.y[err->original.n] = error;
+        err->original.n++;
+      }
+      err->diff.x[i] = test.x[i];
+      err->diff.y[i] = error;
+      err->diff.n++;
+    }
+    if (summary != NULL) addToSummary(summary, test.x[i], error, outside);
+  }
+
+  if (cursor != NULL) {
+    cursor->jLower = jLower;
+    cursor->jUpper = jUpper;
+  }
+  if (summary != NULL) finishSummary(summary);
+  return 0;
+}
+
+/*
+ * Function: validateBands
+ * -----------------------
+ *   validate a test curve against several tubes (tolerance bands) in a
+ *   single pass over the test points
+ *
+ *   tubes: tubes of the bands, ordered from the narrowest to the widest
+ *   nBands: number of bands
+ *   test: data structure for test curve
+ *   band: receives for each test point the index of the first band
+ *         containing it (nBands if the point is outside all the bands)
+ *   summaries: receives the aggregated errors of each band
+ *   arena: arena of the call allocating the cursors (released with the arena)
+ *
+ *   return: 0 if there was success, -1 if the allocation failed
+ */
+int validateBands(
+  const struct tube* tubes,
+  size_t nBands,
+  const struct data test,
+  int* band,
+  struct errorSummary* summaries,
+  struct arena* arena) {
+  size_t i, b;
+  size_t *cursors = arenaAlloc(arena, 3 * nBands * sizeof(size_t));  // block, lower and upper cursors by band
+  const struct zoneMap *zones;
+  double error;
+  bool outside;
+
+  if (cursors == NULL) return -1;
+  for (b = 0; b < nBands; b++) {
+    if (tubes[b].lower.n == 0 || tubes[b].upper.n == 0) return 1;
+    zones = &tubes[b].zones;
+    cursors[3*b] = zones->n > 0 && test.n > 0 ? zoneAt(zones, test.x[0]) : 0;
+    cursors[3*b+1] = 1;
+    cursors[3*b+2] = 1;
+    initSummary(&summaries[b]);
+  }
+
+  for (i=0; i < test.n; i++) {
+    band[i] = (int)nBands;
+    for (b = nBands; b-- > 0;) {
+      zones = tubes[b].zones.n > 0 ? &tubes[b].zones : NULL;
+      outside = errorAt(&tubes[b].lower, &tubes[b].upper, zones,
+                        &cursors[3*b], &cursors[3*b+1], &cursors[3*b+2],
+                        test.x[i], test.y[i], &error);
+      if (!outside) band[i] = (int)b;
+      addToSummary(&summaries[b], test.x[i], error, outside);
+    }
+  }
+
+  for (b = 0; b < nBands; b++) finishSummary(&summaries[b]);
+  return 0;
 }
@@ -8,16 +8,30 @@
 #ifndef TUBE_H_
 #define TUBE_H_
 
-double * interpolateValues(double* sourceX, double* sourceY, int sourceLength, double* targetX, int targetLength);
+double interpolateAt(const struct data *source, size_t *j, double targetX);
 
-int compare(double* lower, double* upper, int refLen,
-  double* testY, double* testX, int testLen,
-  struct errorReport* err);
+size_t cursorAt(const struct data *source, double targetX);
+
+double queryAt(const struct data *source, size_t *j, double targetX);
+
+void initSummary(struct errorSummary* summary);
 
 int validate(
   const struct data lower,
   const struct data upper,
   const struct data test,
-  struct errorReport* err);
+  struct errorReport* err,
+  struct errorSummary* summary,
+  size_t maxViolations,
+  struct tubeCursor* cursor,
+  const struct zoneMap* zones);
+
+int validateBands(
+  const struct tube* tubes,
+  size_t nBands,
+  const struct data test,
+  int* band,
+  struct errorSummary* summaries,
+  struct arena* arena);
 
 #endif /* TUBE_H_ */
@@ -0,0 +1,314 @@
+/*
+ * tubeEdit.c
+ *
+ * Functions:
+ * ----------
+ *   rebuildTube: build the tube curves over all the reference points
+ *   editTube: replace a range of reference points and update the tube curves
+ *   freeEditableTubeData: free the arrays of an editable tube
+ *
+ * The curves built over the reference points before (resp. after) the
+ * replaced range are equal to the full curves below (resp. above) some x
+ * value (see window.c). So only the part of the curves between these x values
+ * is built again, over a window of the new reference points, and spliced into
+ * the stored curves: the cost of an update depends on the size of the
+ * replaced range, not on the size of the reference.
+ */
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <math.h>
+
+#include "data_structure.h"
+#include "algorithmRectangle.h"
+#include "tubeSize.h"
+#include "window.h"
+#include "zoneMap.h"
+#include "tubeEdit.h"
+
+#ifndef max
+#define max(a,b) ((a) > (b) ? (a) : (b))
+#endif
+
+/*
+ * Function: reserve
+ * -----------------
+ *   grow the arrays of data so that they can hold n points
+ *   (the capacity is doubled to get an amortized constant cost per point)
+ *
+ *   return: 0 if there was success, -1 if the allocation failed
+ */
+static int reserve(struct data *dat, size_t *capacity, size_t n) {
+  size_t cap = *capacity > 0 ? *capacity : 1;
+  double *x, *y;
+
+  if (n <= *capacity) return 0;
+  while (cap < n) cap *= 2;
+  x = realloc(dat->x, cap * sizeof(double));
+  if (x == NULL) return -1;
+  dat->x = x;
+  y = realloc(dat->y, cap * sizeof(double));
+  if (y == NULL) return -1;
+  dat->y = y;
+  *capacity = cap;
+  return 0;
+}
+
+/*
+ * Function: lowerBound
+ * --------------------
+ *   index of the first point of a curve with an x value not below x
+ *   (curve->n if there is no such point)
+ */
+static size_t lowerBound(const struct data *curve, double x) {
+  size_t lo = 0, hi = curve->n, mid;
+
+  while (lo < hi) {
+    mid = lo + (hi - lo) / 2;
+    if (curve->x[mid] < x) lo = mid + 1;
+    else hi = mid;
+  }
+  return lo;
+}
+
+/*
+ * Function: splice
+ * ----------------
+ *   replace the points [p, q) of a curve by the points [a, b) of part
+ *
+ *   return: 0 if there was success, -1 if the allocation failed
+ */
+static int splice(
+  struct data *curve, size_t *capacity, size_t p, size_t q,
+  const struct data *part, size_t a, size_t b) {
+  const size_t n = curve->n - (q - p) + (b - a);
+
+  if (reserve(curve, capacity, n) != 0) return -1;
+  memmove(curve->x + p + b - a, curve->x + q, (curve->n - q) * sizeof(double));
+  memmove(curve->y + p + b - a, curve->y + q, (curve->n - q) * sizeof(double));
+  memcpy(curve->x + p, part->x + a, (b - a) * sizeof(double));
+  memcpy(curve->y + p, part->y + a, (b - a) * sizeof(double));
+  curve->n = n;
+  return 0;
+}
+
+/*
+ * Function: buildPart
+ * -------------------
+ *   build the tube curves over the reference points [a, b) with the data
+ *   characteristics of the editable tube
+ *
+ *   return: 0 if there was success, -1 if the allocation failed
+ */
+static int buildPart(
+  struct editableTube *et, size_t a, size_t b, struct data *lower, struct data *upper) {
+  struct data ref = {et->reference.x + a, et->reference.y + a, b - a};
+  const size_t nSize = tubeSizeCount(et->tolerances, b - a);
+  struct data size = {malloc(nSize * sizeof(double)), malloc(nSize * sizeof(double)), nSize};
+  int retVal;
+
+  if (size.x == NULL || size.y == NULL) {
+    free(size.x);
+    free(size.y);
+    return -1;
+  }
+  set_tube_size(&size, &ref, et->dat_char, et->tolerances);
+  retVal = getTube(&ref, &size, et->dat_char, lower, upper, NULL);
+  free(size.x);
+  free(size.y);
+  return retVal;
+}
+
+/*
+ * Function: rebuildTube
+ * ---------------------
+ *   build the tube curves over all the reference points of an editable tube
+ *   and store the data characteristics used to build them
+ *
+ *   et: editable tube with at least one reference point
+ *
+ *   return: 0 if there was success, -1 if the allocation failed
+ */
+int rebuildTube(struct editableTube *et) {
+  struct data lower, upper;
+  const size_t n = et->reference.n;
+  size_t i;
+
+  et->dat_char = get_data_char(&et->reference);
+  et->minY = et->maxY = et->reference.y[0];
+  for (i = 1; i < n; i++) {
+    if (et->reference.y[i] < et->minY) et->minY = et->reference.y[i];
+    if (et->reference.y[i] > et->maxY) et->maxY = et->reference.y[i];
+  }
+  if (buildPart(et, 0, n, &lower, &upper) != 0) return -1;
+  free(et->tube.lower.x);
+  free(et->tube.lower.y);
+  free(et->tube.upper.x);
+  free(et->tube.upper.y);
+  et->tube.lower = lower;
+  et->tube.upper = upper;
+  et->capLower = lower.n;
+  et->capUpper = upper.n;
+  et->tube.firstX = et->reference.x[0];
+  et->tube.lastX = et->reference.x[n - 1];
+  return updateZoneMap(&et->tube.lower, &et->tube.upper, &et->tube.zones, &et->capZones, 0);
+}
+
+/*
+ * Function: editTube
+ * ------------------
+ *   replace the reference points [start, end) of an editable tube by m new
+ *   points and update the tube curves. The curves are only built again
+ *   between the x values where they may change, unless the tube size
+ *   depends on the range or magnitude of the reference (rtolx, rtoly) and
+ *   the update changes it, or the tube height depends on the reference
+ *   points (ltoly, see windowMarginBound): then the curves are built again
+ *   entirely.
+ *   The x values of the new points must be sorted and consistent with the
+ *   points before start and after end, and the reference must have at least
+ *   one point after the update (checked by the caller).
+ *
+ *   et: editable tube
+ *   start: index of the first replaced reference point
+ *   end: index following the last replaced reference point
+ *        (start = end = et->reference.n to append points)
+ *   x, y: new reference points
+ *   m: number of new reference points
+ *
+ *   return: 0 if there was success, -1 if the allocation failed
+ */
+int editTube(
+  struct editableTube *et,
+  size_t start,
+  size_t end,
+  const double *x,
+  const double *y,
+  size_t m
+) {
+  struct data *ref = &et->reference;
+  const struct tolerances *tol = &et->tolerances;
+  const size_t n = ref->n;
+  const size_t nNew = n - (end - start) + m;
+  struct data lower, upper;
+  struct data_char dc;
+  double magX, margin, xA, xB, rangeX, rangeY, magY;
+  size_t i, a, b, lo, hi, mid, pLower, pUpper, zone;
+  int rescan = 0;
+
+  // x range where the curves do not change, computed with the current points
+  // (the margin is computed with the largest magnitudes of x and y before and after the update)
+  dc = et->dat_char;
+  dc.mag_x = max(dc.mag_x, max(fabs(ref->x[0]), fabs(ref->x[n - 1])));
+  if (m > 0) dc.mag_x = max(dc.mag_x, max(fabs(x[0]), fabs(x[m - 1])));
+  dc.mag_y = max(fabs(et->minY), fabs(et->maxY));
+  for (i = 0; i < m; i++) dc.mag_y = max(dc.mag_y, fabs(y[i]));
+  margin = windowMarginBound(tol, dc);
+  xA = start == 0 ? -INFINITY : windowXMax(ref, margin, 0, start);
+  xB = end == n ? INFINITY : windowXMin(ref, margin, end, n);
+
+  // Update the reference points
+  for (i = start; i < end; i++) {
+    if (ref->y[i] <= et->minY || ref->y[i] >= et->maxY) rescan = 1;
+  }
+  if (reserve(ref, &et->capReference, nNew) != 0) return -1;
+  memmove(ref->x + start + m, ref->x + end, (n - end) * sizeof(double));
+  memmove(ref->y + start + m, ref->y + end, (n - end) * sizeof(double));
+  memcpy(ref->x + start, x, m * sizeof(double));
+  memcpy(ref->y + start, y, m * sizeof(double));
+  ref->n = nNew;
+  if (rescan) {
+    et->minY = et->maxY = ref->y[0];
+    for (i = 1; i < nNew; i++) {
+      if (ref->y[i] < et->minY) et->minY = ref->y[i];
+      if (ref->y[i] > et->maxY) et->maxY = ref->y[i];
+    }
+  } else {
+    for (i = 0; i < m; i++) {
+      if (y[i] < et->minY) et->minY = y[i];
+      if (y[i] > et->maxY) et->maxY = y[i];
+    }
+  }
+
+  // The tube size changes with the range or magnitude for relative tolerances,
+  // and the curves may change anywhere if the tube height is not the same at all the points.
+  if (isinf(margin)) return rebuildTube(et);
+  rangeX = ref->x[nNew - 1] - ref->x[0];
+  magX = max(ref->x[nNew - 1], fabs(ref->x[0]));
+  rangeY = et->maxY - et->minY;
+  magY = max(et->maxY, fabs(et->minY));
+  if ((tol->rtolx > 0 &&
+       (fabs(rangeX - et->dat_char.range_x) > 0 || fabs(magX - et->dat_char.mag_x) > 0)) ||
+      (tol->rtoly > 0 &&
+       (fabs(rangeY - et->dat_char.range_y) > 0 || fabs(magY - et->dat_char.mag_y) > 0))) {
+    return rebuildTube(et);
+  }
+
+  // Window of the new reference points where the curves are built again:
+  // last start a with a lower limit below xA...
+  lo = 0;
+  hi = start + 1;
+  while (hi - lo > 1) {
+    mid = lo + (hi - lo) / 2;
+    if (windowXMin(ref, margin, mid, nNew) <= xA) lo = mid;
+    else hi = mid;
+  }
+  a = lo;
+  // ...and first end b with an upper limit above xB.
+  lo = start + m;
+  hi = nNew;
+  while (lo < hi) {
+    mid = lo + (hi - lo) / 2;
+    if (windowXMax(ref, margin, a, mid) >= xB) hi = mid;
+    else lo = mid + 1;
+  }
+  b = lo;
+
+  if (b > a) {
+    if (buildPart(et, a, b, &lower, &upper) != 0) return -1;
+  } else {
+    memset(&lower, 0, sizeof(struct data));
+    memset(&upper, 0, sizeof(struct data));
+  }
+  pLower = lowerBound(&et->tube.lower, xA);
+  pUpper = lowerBound(&et->tube.upper, xA);
+  zone = firstChangedZone(&et->tube.zones, &et->tube.upper, pLower, pUpper);
+  if (splice(&et->tube.lower, &et->capLower,
+             pLower, lowerBound(&et->tube.lower, xB),
+             &lower, lowerBound(&lower, xA), lowerBound(&lower, xB)) != 0 ||
+      splice(&et->tube.upper, &et->capUpper,
+             pUpper, lowerBound(&et->tube.upper, xB),
+             &upper, lowerBound(&upper, xA), lowerBound(&upper, xB)) != 0) {
+    free(lower.x);
+    free(lower.y);
+    free(upper.x);
+    free(upper.y);
+    return -1;
+  }
+  free(lower.x);
+  free(lower.y);
+  free(upper.x);
+  free(upper.y);
+  et->tube.firstX = ref->x[0];
+  et->tube.lastX = ref->x[nNew - 1];
+  // Only the blocks of the index from the first replaced points are computed again.
+  return updateZoneMap(&et->tube.lower, &et->tube.upper, &et->tube.zones, &et->capZones, zone);
+}
+
+/*
+ * Function: freeEditableTubeData
+ * ------------------------------
+ *   free the arrays of an editable tube and reset all sizes to 0
+ *
+ *   et: editable tube
+ */
+void freeEditableTubeData(struct editableTube *et) {
+  free(et->reference.x);
+  free(et->reference.y);
+  free(et->tube.lower.x);
+  free(et->tube.lower.y);
+  free(et->tube.upper.x);
+  free(et->tube.upper.y);
+  freeZoneMap(&et->tube.zones);
+  memset(et, 0, sizeof(struct editableTube));
+}
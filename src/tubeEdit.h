@@ -0,0 +1,26 @@
+/*
+ * tubeEdit.h
+ *
+ *  Tube curves updated in place when the reference points are appended or
+ *  locally replaced.
+ */
+
+#ifndef TUBEEDIT_H_
+#define TUBEEDIT_H_
+
+#include "data_structure.h"
+
+int rebuildTube(struct editableTube *et);
+
+int editTube(
+  struct editableTube *et,
+  size_t start,
+  size_t end,
+  const double *x,
+  const double *y,
+  size_t m
+);
+
+void freeEditableTubeData(struct editableTube *et);
+
+#endif /* TUBEEDIT_H_ */
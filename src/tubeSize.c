@@ -10,6 +10,7 @@
  *   maxValue : find maximum value of an array
  *   setStandardBaseAndRatio : calculate standard values for baseX, baseY and ratio
  *   setFormerBaseAndRatio : calculate former standard values for baseX, baseY and ratio
+ *   tubeSizeCount : number of tube sizes (1 if the tube size is the same at all points)
  *   set_tube_size : calculate tube size (half-width and half-height of rectangle)
  */
 
@@ -89,10 +90,18 @@ double maxValue(double* array, size_t size) {
  *   return : a data_char struct
  */
 struct data_char get_data_char(struct data *dat) {
-  double maxX = maxValue(dat->x, dat->n);
-  double minX = minValue(dat->x, dat->n);
-  double maxY = maxValue(dat->y, dat->n);
-  double minY = minValue(dat->y, dat->n);
+  /* Single scan of the data (same result as minValue and maxValue for each variable) */
+  double maxX = dat->x[0];
+  double minX = dat->x[0];
+  double maxY = dat->y[0];
+  double minY = dat->y[0];
+  size_t i;
+  for (i = 0; i < dat->n; i++) {
+    if (dat->x[i] > maxX) maxX = dat->x[i];
+    if (dat->x[i] < minX) minX = dat->x[i];
+    if (dat->y[i] > maxY) maxY = dat->y[i];
+    if (dat->y[i] < minY) minY = dat->y[i];
+  }
   struct data_char d = {
     .range_x=maxX - minX,
     .range_y=maxY - minY,
@@ -102,22 +111,48 @@ struct data_char get_data_char(struct data *dat) {
   return d;
 }
 
+/*
+ * Function: tubeSizeCount
+ * -----------------------
+ *   Number of tube sizes to compute with set_tube_size: the tube size only
+ *   depends on the reference point with the local tolerances ltolx and ltoly,
+ *   otherwise it is the same at all the points and stored once.
+ *
+ *   tol        : struct with tolerance values
+ *   nReference : number of reference points
+ *
+ *   return     : 1 if the tube size is the same at all the points, nReference otherwise
+ */
+size_t tubeSizeCount(struct tolerances tol, size_t nReference) {
+  if (tol.ltolx < 0 || tol.ltolx > 0 || tol.ltoly < 0 || tol.ltoly > 0) {
+    return nReference;
+  }
+  return 1;
+}
+
 /*
  * Function: set_tube_size
  * ------------------
  *   Calculate tube size (half-width and half-height of rectangle)
  *
  *   refData   : pointer to struct with the reference data
- *   tube_size : pointer to struct with the tube size
+ *   tube_size : pointer to struct with the tube size: tube_size->n is either
+ *               the number of reference points or 1 if the tube size is the
+ *               same at all the points (see tubeSizeCount)
+ *   dat_char  : data characteristics of the reference (see get_data_char)
  *   tol       : struct with tolerance values
  *
  *   return    : void (modifies tube_size in place)
  */
-void set_tube_size(struct data *tube_size, struct data *refData, struct tolerances tol) {
+void set_tube_size(
+  struct data *tube_size,
+  struct data *refData,
+  struct data_char dat_char,
+  struct tolerances tol
+) {
   size_t i;
-  struct data_char dat_char = get_data_char(refData);
 
-  for (i = 0; i < refData->n; i++)
+  for (i = 0; i < tube_size->n; i++)
   {
     tube_size->x[i] = max(
       max(tol.atolx, tol.rtolx * dat_char.range_x),
@@ -10,7 +10,14 @@
 #ifndef TUBESIZE_H_
 #define TUBESIZE_H_
 
-void set_tube_size(struct data *tube_size, struct data *refData, struct tolerances tol);
+size_t tubeSizeCount(struct tolerances tol, size_t nReference);
+
+void set_tube_size(
+  struct data *tube_size,
+  struct data *refData,
+  struct data_char dat_char,
+  struct tolerances tol
+);
 
 struct data_char get_data_char(struct data *dat);
 
@@ -0,0 +1,359 @@
+/*
+ * window.c
+ *
+ * Functions:
+ * ----------
+ *   windowMargin: x distance from the window limits where the curves may differ
+ *   windowMarginBound: upper bound of the margin computed from the tolerances
+ *   windowXMin: lower limit of the valid x range of a window
+ *   windowXMax: upper limit of the valid x range of a window
+ *   buildWindow: build the tube curves over a range of reference points
+ *   nextWindowStart: find the first reference point of the following window
+ *   freeWindow: free the curves of a window
+ *   initConfirmedTube: reset the confirmed points of the tube curves
+ *   confirmCurves: append the points of the curves of a window to the confirmed points
+ *   confirmedTestEnd: find the test points which can be validated
+ *   discardConfirmed: discard the confirmed points before the cursors
+ *   freeConfirmedTube: free the confirmed points
+ *
+ * The corners of the tube around a reference point only depend on the
+ * neighboring points, and the loops removed from the curves span at most
+ * twice the tube width in x. So, away from the window limits, the curves
+ * built over a window are equal to the curves built over all the reference
+ * points: the x range where they are equal is limited by a margin of several
+ * tube widths and several distinct reference x values.
+ * This only holds if the tube height is the same at all the points: otherwise
+ * a tube curve may be flat over reference points of different values, and the
+ * segment left where its corners are removed (see removeZeroSlope) may span
+ * any number of points. The margin is then infinite, so that the curves are
+ * built over all the reference points.
+ */
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <math.h>
+
+#include "data_structure.h"
+#include "algorithmRectangle.h"
+#include "window.h"
+
+/* Number of distinct reference x values added to the margin at the window limits */
+#define WINDOW_MARGIN_POINTS 3
+
+/*
+ * Function: windowMargin
+ * ----------------------
+ *   x distance from the window limits where the curves may differ from
+ *   the curves built over all the reference points
+ *
+ *   tube_size: tube size of all the reference points
+ *
+ *   return: margin in x (four times the maximum tube half-width),
+ *           infinity if the tube half-height is not the same at all the points
+ */
+double windowMargin(const struct data *tube_size) {
+  double maxX = 0, minY = tube_size->y[0], maxY = tube_size->y[0];
+  size_t i;
+
+  for (i = 0; i < tube_size->n; i++) {
+    if (tube_size->x[i] > maxX) maxX = tube_size->x[i];
+    if (tube_size->y[i] < minY) minY = tube_size->y[i];
+    if (tube_size->y[i] > maxY) maxY = tube_size->y[i];
+  }
+  return maxY > minY ? INFINITY : 4 * maxX;
+}
+
+/*
+ * Function: windowMarginBound
+ * ---------------------------
+ *   upper bound of windowMargin computed from the tolerances and the data
+ *   characteristics, without the tube size of each reference point
+ *   (see set_tube_size)
+ *
+ *   tol: tolerance values
+ *   dat_char: data characteristics of the reference
+ *
+ *   return: margin in x, infinity if the tube half-height may not be the
+ *           same at all the points (ltoly larger than the other tolerances)
+ */
+double windowMarginBound(const struct tolerances *tol, struct data_char dat_char) {
+  double maxX = tol->atolx;
+  double minY = tol->atoly;
+
+  if (tol->rtoly * dat_char.range_y > minY) minY = tol->rtoly * dat_char.range_y;
+  if (tol->ltoly * dat_char.mag_y > minY) return INFINITY;
+  if (tol->rtolx * dat_char.range_x > maxX) maxX = tol->rtolx * dat_char.range_x;
+  if (tol->rtolx * dat_char.mag_x > maxX) maxX = tol->rtolx * dat_char.mag_x;
+  if (tol->ltolx * dat_char.mag_x > maxX) maxX = tol->ltolx * dat_char.mag_x;
+  if (1e-10 > maxX) maxX = 1e-10;
+  return 4 * maxX;
+}
+
+/*
+ * Function: windowXMin
+ * --------------------
+ *   lower limit of the valid x range of the curves built over the reference
+ *   points [start, end), if there are reference points before start
+ *
+ *   reference: all the reference points
+ *   margin: margin returned by windowMargin
+ *   start: index of the first reference point of the window
+ *   end: index following the last reference point of the window
+ *
+ *   return: x value after WINDOW_MARGIN_POINTS increases of x from start,
+ *           plus margin (infinity if there is no such point)
+ */
+double windowXMin(const struct data *reference, double margin, size_t start, size_t end) {
+  size_t j = start;
+  int k = 0;
+
+  while (k < WINDOW_MARGIN_POINTS && ++j < end) {
+    if (reference->x[j] > reference->x[j - 1]) k++;
+  }
+  return k < WINDOW_MARGIN_POINTS ? INFINITY : reference->x[j] + margin;
+}
+
+/*
+ * Function: windowXMax
+ * --------------------
+ *   upper limit of the valid x range of the curves built over the reference
+ *   points [start, end), if there are reference points after end
+ *
+ *   reference: all the reference points
+ *   margin: margin returned by windowMargin
+ *   start: index of the first reference point of the window
+ *   end: index following the last reference point of the window
+ *
+ *   return: x value before WINDOW_MARGIN_POINTS decreases of x from end - 1,
+ *           minus margin (minus infinity if there is no such point)
+ */
+double windowXMax(const struct data *reference, double margin, size_t start, size_t end) {
+  size_t j = end - 1;
+  int k = 0;
+
+  if (end <= start) return -INFINITY;
+  while (k < WINDOW_MARGIN_POINTS && j > start) {
+    j--;
+    if (reference->x[j] < reference->x[j + 1]) k++;
+  }
+  return k < WINDOW_MARGIN_POINTS ? -INFINITY : reference->x[j] - margin;
+}
+
+/*
+ * Function: buildWindow
+ * ---------------------
+ *   build the tube curves over the reference points [start, end)
+ *
+ *   reference: all the reference points
+ *   tube_size: tube size of all the reference points (see tubeSizeCount)
+ *   dat_char: data characteristics of all the reference points
+ *   margin: margin returned by windowMargin
+ *   start: index of the first reference point of the window
+ *   end: index following the last reference point of the window
+ *   win: window receiving the curves (allocated by this function,
+ *        to be released with freeWindow) and the valid x range
+ *
+ *   return: 0 if there was success, -1 if the allocation failed
+ *           (the curves of win are then empty)
+ */
+int buildWindow(
+  struct data *reference,
+  struct data *tube_size,
+  struct data_char dat_char,
+  double margin,
+  size_t start,
+  size_t end,
+  struct tubeWindow *win
+) {
+  struct data ref = {reference->x + start, reference->y + start, end - start};
+  struct data size = *tube_size;
+
+  if (tube_size->n != 1) {
+    size.x += start;
+    size.y += start;
+    size.n = end - start;
+  }
+
+  win->start = start;
+  win->end = end;
+  win->xMin = start == 0 ? -INFINITY : windowXMin(reference, margin, start, end);
+  win->xMax = end == reference->n ? INFINITY : windowXMax(reference, margin, start, end);
+  return getTube(&ref, &size, dat_char, &win->lower, &win->upper, NULL);
+}
+
+/*
+ * Function: nextWindowStart
+ * -------------------------
+ *   find the first reference point of the window following win, so that the
+ *   valid x ranges of both windows overlap
+ *
+ *   reference: all the reference points
+ *   margin: margin returned by windowMargin
+ *   win: current window
+ *
+ *   return: index of the first reference point of the following window,
+ *           win->start if the current window is too small to find one
+ */
+size_t nextWindowStart(struct data *reference, double margin, const struct tubeWindow *win) {
+  // The lower limit of the valid x range increases with the first point:
+  // binary search of the last point with a lower limit not above win->xMax.
+  size_t lo = win->start, hi = win->end;
+  size_t mid;
+
+  while (hi - lo > 1) {
+    mid = lo + (hi - lo) / 2;
+    if (windowXMin(reference, margin, mid, reference->n) <= win->xMax) lo = mid;
+    else hi = mid;
+  }
+  return lo;
+}
+
+/*
+ * Function: freeWindow
+ * --------------------
+ *   free the curves of a window
+ *
+ *   win: window filled by buildWindow
+ */
+void freeWindow(struct tubeWindow *win) {
+  if (win->lower.x != NULL) free(win->lower.x);
+  if (win->lower.y != NULL) free(win->lower.y);
+  if (win->upper.x != NULL) free(win->upper.x);
+  if (win->upper.y != NULL) free(win->upper.y);
+  memset(&win->lower, 0, sizeof(struct data));
+  memset(&win->upper, 0, sizeof(struct data));
+}
+
+/*
+ * Function: initConfirmedTube
+ * ---------------------------
+ *   reset the confirmed points of the tube curves
+ *
+ *   ct: confirmed points
+ */
+void initConfirmedTube(struct confirmedTube *ct) {
+  memset(ct, 0, sizeof(struct confirmedTube));
+  ct->xMax = -INFINITY;
+  ct->cursor.jLower = 1;
+  ct->cursor.jUpper = 1;
+}
+
+/*
+ * Function: appendCurve
+ * ---------------------
+ *   append the points of a curve with xMin <= x < xMax to data
+ *
+ *   return: 0 if there was success, -1 if the allocation failed
+ */
+static int appendCurve(
+  struct data *dat, size_t *capacity, const struct data *curve, double xMin, double xMax) {
+  size_t i, cap;
+  double *x, *y;
+
+  for (i = 0; i < curve->n; i++) {
+    if (curve->x[i] < xMin || curve->x[i] >= xMax) continue;
+    if (dat->n == *capacity) {
+      cap = *capacity > 0 ? 2 * *capacity : 64;
+      x = realloc(dat->x, cap * sizeof(double));
+      if (x == NULL) return -1;
+      dat->x = x;
+      y = realloc(dat->y, cap * sizeof(double));
+      if (y == NULL) return -1;
+      dat->y = y;
+      *capacity = cap;
+    }
+    dat->x[dat->n] = curve->x[i];
+    dat->y[dat->n] = curve->y[i];
+    dat->n++;
+  }
+  return 0;
+}
+
+/*
+ * Function: confirmCurves
+ * -----------------------
+ *   append the points of the curves of a window with ct->xMax <= x < xMax
+ *   to the confirmed points (the valid x range of the window must contain
+ *   [ct->xMax, xMax))
+ *
+ *   ct: confirmed points
+ *   lower, upper: curves of the window
+ *   xMax: upper limit of the valid x range of the window
+ *
+ *   return: 0 if there was success, -1 if the allocation failed
+ */
+int confirmCurves(
+  struct confirmedTube *ct,
+  const struct data *lower,
+  const struct data *upper,
+  double xMax
+) {
+  if (appendCurve(&ct->lower, &ct->capLower, lower, ct->xMax, xMax) != 0 ||
+      appendCurve(&ct->upper, &ct->capUpper, upper, ct->xMax, xMax) != 0) {
+    return -1;
+  }
+  ct->xMax = xMax;
+  return 0;
+}
+
+/*
+ * Function: confirmedTestEnd
+ * --------------------------
+ *   find the test points which can be validated against the confirmed points:
+ *   the interpolation of the curves at a test point only uses confirmed
+ *   points if both curves have a confirmed point with a larger or equal x value
+ *
+ *   ct: confirmed points
+ *   test: test points
+ *   i: index of the first test point not yet validated
+ *
+ *   return: index following the last test point which can be validated
+ */
+size_t confirmedTestEnd(const struct confirmedTube *ct, const struct data *test, size_t i) {
+  double xLimit;
+
+  if (isinf(ct->xMax) && ct->xMax > 0) return test->n;
+  if (ct->lower.n == 0 || ct->upper.n == 0) return i;
+  xLimit = ct->lower.x[ct->lower.n - 1];
+  if (ct->upper.x[ct->upper.n - 1] < xLimit) xLimit = ct->upper.x[ct->upper.n - 1];
+  while (i < test->n && test->x[i] <= xLimit) i++;
+  return i;
+}
+
+/*
+ * Function: discardConfirmed
+ * --------------------------
+ *   discard the confirmed points which are no longer needed to validate the
+ *   next test points (the points before the cursors minus one)
+ *
+ *   ct: confirmed points
+ */
+void discardConfirmed(struct confirmedTube *ct) {
+  const size_t dl = ct->cursor.jLower - 1;
+  const size_t du = ct->cursor.jUpper - 1;
+
+  memmove(ct->lower.x, ct->lower.x + dl, (ct->lower.n - dl) * sizeof(double));
+  memmove(ct->lower.y, ct->lower.y + dl, (ct->lower.n - dl) * sizeof(double));
+  ct->lower.n -= dl;
+  ct->cursor.jLower = 1;
+  memmove(ct->upper.x, ct->upper.x + du, (ct->upper.n - du) * sizeof(double));
+  memmove(ct->upper.y, ct->upper.y + du, (ct->upper.n - du) * sizeof(double));
+  ct->upper.n -= du;
+  ct->cursor.jUpper = 1;
+}
+
+/*
+ * Function: freeConfirmedTube
+ * ---------------------------
+ *   free the confirmed points
+ *
+ *   ct: confirmed points
+ */
+void freeConfirmedTube(struct confirmedTube *ct) {
+  free(ct->lower.x);
+  free(ct->lower.y);
+  free(ct->upper.x);
+  free(ct->upper.y);
+  initConfirmedTube(ct);
+}
@@ -0,0 +1,82 @@
+/*
+ * window.h
+ *
+ *  Tube curves built over a window of the reference points, so that the tube
+ *  can be built lazily or with a bounded memory usage.
+ */
+
+#ifndef WINDOW_H_
+#define WINDOW_H_
+
+#include "data_structure.h"
+
+/* Initial number of reference points of a window */
+#define WINDOW_POINTS 4096
+
+/*
+ * Tube curves built over the reference points [start, end).
+ * For x values in [xMin, xMax), the curves are equal to the curves of the
+ * tube built over all the reference points.
+ */
+struct tubeWindow {
+  size_t start;       /* Index of the first reference point */
+  size_t end;         /* Index following the last reference point */
+  double xMin;        /* Lower limit of the valid x range */
+  double xMax;        /* Upper limit of the valid x range */
+  struct data lower;  /* Lower curve of the tube */
+  struct data upper;  /* Upper curve of the tube */
+};
+
+/*
+ * Points of the tube curves confirmed by successive windows: they are equal
+ * to the points of the curves built over all the reference points with
+ * x values below xMax. Test points are validated against these points, so
+ * that the interpolated values are the same as with the full curves.
+ */
+struct confirmedTube {
+  struct data lower;         /* Confirmed points of the lower curve not yet discarded */
+  struct data upper;         /* Confirmed points of the upper curve not yet discarded */
+  size_t capLower;           /* Capacity of the lower curve arrays */
+  size_t capUpper;           /* Capacity of the upper curve arrays */
+  double xMax;               /* Upper limit of the x range of the confirmed points */
+  struct tubeCursor cursor;  /* Cursors in the confirmed points */
+};
+
+double windowMargin(const struct data *tube_size);
+
+double windowMarginBound(const struct tolerances *tol, struct data_char dat_char);
+
+double windowXMin(const struct data *reference, double margin, size_t start, size_t end);
+
+double windowXMax(const struct data *reference, double margin, size_t start, size_t end);
+
+int buildWindow(
+  struct data *reference,
+  struct data *tube_size,
+  struct data_char dat_char,
+  double margin,
+  size_t start,
+  size_t end,
+  struct tubeWindow *win
+);
+
+size_t nextWindowStart(struct data *reference, double margin, const struct tubeWindow *win);
+
+void freeWindow(struct tubeWindow *win);
+
+void initConfirmedTube(struct confirmedTube *ct);
+
+int confirmCurves(
+  struct confirmedTube *ct,
+  const struct data *lower,
+  const struct data *upper,
+  double xMax
+);
+
+size_t confirmedTestEnd(const struct confirmedTube *ct, const struct data *test, size_t i);
+
+void discardConfirmed(struct confirmedTube *ct);
+
+void freeConfirmedTube(struct confirmedTube *ct);
+
+#endif /* WINDOW_H_ */
@@ -0,0 +1,205 @@
+/*
+ * zoneMap.c
+ *
+ * Functions:
+ * ----------
+ *   updateZoneMap: compute the blocks of the index from a given block
+ *   zoneAt: find the block of an x value
+ *   firstChangedZone: find the first block changed by an update of the curves
+ *   freeZoneMap: free the arrays of the index
+ *
+ * The blocks are delimited by every ZONE_POINTS-th point of the lower curve.
+ * A tube curve interpolated at a test x value lies between the two points of
+ * its segment: so over a block, the lower curve is below the maximum of the
+ * points of the segments which can be interpolated in the block, and the
+ * upper curve above their minimum. A test value strictly between these
+ * bounds is inside the tube, and its error is 0 without interpolating the
+ * curves. The bounds are tightened by a margin covering the rounding errors
+ * of the interpolation, so that the result is exactly the same.
+ */
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <math.h>
+#include <float.h>
+
+#include "data_structure.h"
+#include "tube.h"
+#include "zoneMap.h"
+
+/* Rounding margin of the bounds, relatively to the largest magnitude of the points */
+#define ZONE_ROUNDING (16 * DBL_EPSILON)
+
+/*
+ * Function: reserveZones
+ * ----------------------
+ *   grow the arrays of the index so that they can hold n blocks
+ *   (the capacity is doubled to get an amortized constant cost per block)
+ *
+ *   return: 0 if there was success, -1 if the allocation failed
+ */
+static int reserveZones(struct zoneMap *zones, size_t *capacity, size_t n) {
+  size_t cap = *capacity > 0 ? *capacity : 16;
+  double *x, *lower, *upper;
+
+  if (n + 1 <= *capacity) return 0;
+  while (cap < n + 1) cap *= 2;
+  x = realloc(zones->x, cap * sizeof(double));
+  if (x == NULL) return -1;
+  zones->x = x;
+  lower = realloc(zones->lower, cap * sizeof(double));
+  if (lower == NULL) return -1;
+  zones->lower = lower;
+  upper = realloc(zones->upper, cap * sizeof(double));
+  if (upper == NULL) return -1;
+  zones->upper = upper;
+  *capacity = cap;
+  return 0;
+}
+
+/*
+ * Function: segmentRange
+ * ----------------------
+ *   range of the points of a curve whose segments can be interpolated for
+ *   x values in [xA, xB] (see interpolateAt)
+ *
+ *   a, b: on return, indices of the first and last points
+ */
+static void segmentRange(const struct data *curve, double xA, double xB, size_t *a, size_t *b) {
+  *a = cursorAt(curve, xA) - 1;
+  *b = cursorAt(curve, xB);
+  if (*b > curve->n - 1) *b = curve->n - 1;
+}
+
+/*
+ * Function: updateZoneMap
+ * -----------------------
+ *   compute the blocks of the index of the tube curves, from the block
+ *   first (the blocks before are not changed)
+ *
+ *   lower: lower curve of the tube
+ *   upper: upper curve of the tube
+ *   zones: block index
+ *   capacity: capacity of the arrays of the index (0 if not allocated)
+ *   first: index of the first block computed again
+ *
+ *   return: 0 if there was success, -1 if the allocation failed
+ */
+int updateZoneMap(
+  const struct data *lower,
+  const struct data *upper,
+  struct zoneMap *zones,
+  size_t *capacity,
+  size_t first
+) {
+  size_t n, k, i, a, b;
+  double xA, xB, maxLower, minUpper, mag;
+
+  if (lower->n < 2 || upper->n < 1) {
+    zones->n = 0;
+    return 0;
+  }
+  n = (lower->n - 1 + ZONE_POINTS - 1) / ZONE_POINTS;
+  if (reserveZones(zones, capacity, n) != 0) {
+    zones->n = 0;
+    return -1;
+  }
+  if (first > zones->n) first = zones->n;
+  for (k = first; k < n; k++) {
+    xA = lower->x[k * ZONE_POINTS];
+    xB = lower->x[k + 1 < n ? (k + 1) * ZONE_POINTS : lower->n - 1];
+    zones->x[k] = xA;
+    zones->x[k + 1] = xB;
+    maxLower = -INFINITY;
+    minUpper = INFINITY;
+    mag = 0;
+    segmentRange(lower, xA, xB, &a, &b);
+    for (i = a; i <= b; i++) {
+      if (lower->y[i] > maxLower) maxLower = lower->y[i];
+      if (fabs(lower->y[i]) > mag) mag = fabs(lower->y[i]);
+    }
+    segmentRange(upper, xA, xB, &a, &b);
+    for (i = a; i <= b; i++) {
+      if (upper->y[i] < minUpper) minUpper = upper->y[i];
+      if (fabs(upper->y[i]) > mag) mag = fabs(upper->y[i]);
+    }
+    zones->lower[k] = maxLower + ZONE_ROUNDING * mag;
+    zones->upper[k] = minUpper - ZONE_ROUNDING * mag;
+  }
+  zones->n = n;
+  return 0;
+}
+
+/*
+ * Function: zoneAt
+ * ----------------
+ *   binary search of the block of an x value
+ *
+ *   zones: block index
+ *   x: x value
+ *
+ *   return: index of the first block whose upper limit is not below x
+ *           (zones->n if there is no such block)
+ */
+size_t zoneAt(const struct zoneMap *zones, double x) {
+  size_t lo = 0, hi = zones->n, mid;
+
+  while (lo < hi) {
+    mid = lo + (hi - lo) / 2;
+    if (zones->x[mid + 1] < x) lo = mid + 1;
+    else hi = mid;
+  }
+  return lo;
+}
+
+/*
+ * Function: firstChangedZone
+ * --------------------------
+ *   first block of the index which may change when the points of the curves
+ *   from pLower (resp. pUpper) are replaced: the blocks before only depend
+ *   on the points before
+ *
+ *   zones: block index of the curves before the update
+ *   upper: upper curve before the update
+ *   pLower, pUpper: indices of the first replaced points of the curves
+ *
+ *   return: index of the first block to be computed again
+ */
+size_t firstChangedZone(
+  const struct zoneMap *zones,
+  const struct data *upper,
+  size_t pLower,
+  size_t pUpper
+) {
+  // The limits and the points of the lower curve of block k have indices up to (k + 1) * ZONE_POINTS.
+  size_t hi = pLower > 0 ? (pLower - 1) / ZONE_POINTS : 0;
+  size_t lo = 0, mid;
+
+  if (hi > zones->n) hi = zones->n;
+  if (pUpper < 2) return 0;
+  // The points of the upper curve of block k have indices below pUpper if its upper limit is
+  // not above the x value of the point pUpper - 1.
+  while (lo < hi) {
+    mid = lo + (hi - lo) / 2;
+    if (zones->x[mid + 1] > upper->x[pUpper - 1]) hi = mid;
+    else lo = mid + 1;
+  }
+  return lo;
+}
+
+/*
+ * Function: freeZoneMap
+ * ---------------------
+ *   free the arrays of the index and reset the number of blocks to 0
+ *
+ *   zones: block index
+ */
+void freeZoneMap(struct zoneMap *zones) {
+  free(zones->x);
+  free(zones->lower);
+  free(zones->upper);
+  zones->x = NULL;
+  zones->lower = NULL;
+  zones->upper = NULL;
+  zones->n = 0;
+}
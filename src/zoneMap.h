@@ -0,0 +1,35 @@
+/*
+ * zoneMap.h
+ *
+ *  Block index of the tube curves, so that the test points far inside the
+ *  tube are validated without interpolating the curves.
+ */
+
+#ifndef ZONEMAP_H_
+#define ZONEMAP_H_
+
+#include "data_structure.h"
+
+/* Number of points of the lower curve in a block */
+#define ZONE_POINTS 32
+
+int updateZoneMap(
+  const struct data *lower,
+  const struct data *upper,
+  struct zoneMap *zones,
+  size_t *capacity,
+  size_t first
+);
+
+size_t zoneAt(const struct zoneMap *zones, double x);
+
+size_t firstChangedZone(
+  const struct zoneMap *zones,
+  const struct data *upper,
+  size_t pLower,
+  size_t pUpper
+);
+
+void freeZoneMap(struct zoneMap *zones);
+
+#endif /* ZONEMAP_H_ */
@@ -0,0 +1,582 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import gc
+import tempfile
+from test_import import *
+
+TOL = dict(atolx=0.002, atoly=0.002)
+
+
+def read_data(test_dir):
+    ref = pd.read_csv(os.path.join(test_dir, 'trended.csv'))
+    test = pd.read_csv(os.path.join(test_dir, 'simulated.csv'))
+    return ref.iloc(axis=1)[0], ref.iloc(axis=1)[1], test.iloc(axis=1)[0], test.iloc(axis=1)[1]
+
+
+def test_in_memory(test_dir):
+    """Results returned in memory must match the files written by compareAndReport."""
+    res = pyfunnel.compare(*read_data(test_dir), **TOL)
+    for attr, f in [('lower', 'lowerBound.csv'), ('upper', 'upperBound.csv'), ('errors', 'errors.csv')]:
+        ref = pd.read_csv(os.path.join(test_dir, 'results', f))
+        arr = getattr(res, attr)
+        assert np.allclose(arr.x, ref.iloc(axis=1)[0], rtol=1e-12), "x values differ for {}.".format(f)
+        assert np.allclose(arr.y, ref.iloc(axis=1)[1], rtol=1e-12), "y values differ for {}.".format(f)
+    assert len(res.violations.x) == np.count_nonzero(res.errors.y)
+
+
+def test_write(test_dir):
+    """Writing the results in memory must yield the same files as compareAndReport."""
+    res = pyfunnel.compare(*read_data(test_dir), **TOL)
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        res.write(tmp_dir)
+        for f in ['reference.csv', 'test.csv', 'errors.csv', 'lowerBound.csv', 'upperBound.csv']:
+            with open(os.path.join(tmp_dir, f)) as f1, open(os.path.join(test_dir, 'results', f)) as f2:
+                assert f1.read() == f2.read(), "File {} differs.".format(f)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_lifetime(test_dir):
+    """Arrays must stay valid after the results object is deleted."""
+    res = pyfunnel.compare(*read_data(test_dir), **TOL)
+    lower_y = res.lower.y
+    expected = lower_y.copy()
+    del res
+    gc.collect()
+    assert np.array_equal(lower_y, expected)
+
+
+def test_input_conversion():
+    """C-contiguous float64 input data must be passed to the library without copy."""
+    arr = np.linspace(0, 1, 11)
+    assert pyfunnel.core._as_double_array(arr) is arr
+    series = pd.Series(arr)
+    assert np.shares_memory(pyfunnel.core._as_double_array(series), series.values)
+    assert np.shares_memory(pyfunnel.core._as_double_array(memoryview(arr)), arr)
+    strided = pyfunnel.core._as_double_array(arr[::2])
+    assert strided.flags['C_CONTIGUOUS'] and np.array_equal(strided, arr[::2])
+    converted = pyfunnel.core._as_double_array(np.arange(5, dtype=np.int32))
+    assert converted.dtype == np.float64
+    try:
+        pyfunnel.core._as_double_array([0, 1, 'a'])
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("Non numeric values must raise TypeError.")
+
+
+def test_engine(test_dir):
+    """Engine results must match compare, with buffers reused across calls."""
+    data = read_data(test_dir)
+    expected = pyfunnel.compare(*data, **TOL)
+    engine = pyfunnel.FunnelEngine()
+    res = engine.compare(*data, copy=True, **TOL)
+    buffers = dict(engine._buffers)
+    for attr in ['lower', 'upper', 'errors', 'violations']:
+        for ax in [0, 1]:
+            assert np.array_equal(getattr(res, attr)[ax], getattr(expected, attr)[ax])
+    # Smaller data with integer values (converted into the engine input buffers).
+    res_small = engine.compare([0, 1, 2], [0, 1, 0], [0, 1, 2], [0, 2, 0], atoly=0.5)
+    assert list(res_small.errors.y) == [0, 0.5, 0]
+    assert all(engine._buffers[k] is buffers[k] for k in buffers)
+    # Copies are not affected by subsequent calls.
+    for attr in ['lower', 'upper', 'errors', 'violations']:
+        for ax in [0, 1]:
+            assert np.array_equal(getattr(res, attr)[ax], getattr(expected, attr)[ax])
+
+
+def test_funnel(test_dir):
+    """Validating against a funnel must yield the same results as compare."""
+    xRef, yRef, xTest, yTest = read_data(test_dir)
+    expected = pyfunnel.compare(xRef, yRef, xTest, yTest, **TOL)
+    funnel = pyfunnel.Funnel(xRef, yRef, **TOL)
+    for attr in ['lower', 'upper']:
+        for ax in [0, 1]:
+            assert np.array_equal(getattr(funnel, attr)[ax], getattr(expected, attr)[ax])
+    for shift in [0, 0.1, 0]:
+        res = funnel.validate(xTest, yTest + shift)
+        exp = expected if shift == 0 else pyfunnel.compare(xRef, yRef, xTest, yTest + shift, **TOL)
+        for attr in ['lower', 'upper', 'errors', 'violations']:
+            for ax in [0, 1]:
+                assert np.array_equal(getattr(res, attr)[ax], getattr(exp, attr)[ax])
+    try:
+        funnel.validate(xTest[:-1], yTest[:-1])
+    except RuntimeError as e:
+        assert "maximum x values are different" in str(e)
+    else:
+        raise AssertionError("Different x ranges must raise RuntimeError.")
+
+
+def test_summary(test_dir):
+    """Aggregated errors must match the errors computed point by point."""
+    data = read_data(test_dir)
+    for shift in [0, 0.01]:
+        xRef, yRef, xTest, yTest = data[0], data[1], data[2], data[3] + shift
+        res = pyfunnel.compare(xRef, yRef, xTest, yTest, **TOL)
+        x, e = res.errors.x, res.errors.y
+        expected = dict(
+            passed=len(res.violations.x) == 0,
+            violations=len(res.violations.x),
+            max_error=e.max(),
+            error_integral=np.sum(0.5 * (e[1:] + e[:-1]) * np.diff(x)),
+            fraction_outside=np.sum(
+                0.5 * ((e[1:] > 0) * 1. + (e[:-1] > 0)) * np.diff(x)) / (x[-1] - x[0]),
+            first_violation_x=res.violations.x[0] if len(res.violations.x) else None,
+            complete=True,
+        )
+        for summary in (
+            pyfunnel.compareAndReport(xRef, yRef, xTest, yTest, summary_only=True, **TOL),
+            pyfunnel.Funnel(xRef, yRef, **TOL).validate(xTest, yTest, summary_only=True),
+        ):
+            assert sorted(summary) == sorted(expected)
+            for k in expected:
+                if expected[k] is None:
+                    assert summary[k] is None
+                    continue
+                assert np.isclose(summary[k], expected[k], rtol=1e-12, atol=0), \
+                    "{}: {} != {}".format(k, summary[k], expected[k])
+    assert expected['violations'] > 0
+
+
+def test_stream(test_dir):
+    """Feeding test values chunk by chunk must yield the same results as validate."""
+    xRef, yRef, xTest, yTest = read_data(test_dir)
+    yTest = yTest + 0.01
+    funnel = pyfunnel.Funnel(xRef, yRef, **TOL)
+    expected = funnel.validate(xTest, yTest)
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        expected.write(tmp_dir)
+        errors_file = os.path.join(tmp_dir, 'errors_stream.csv')
+        stream = funnel.stream(errors_file=errors_file)
+        violations = [stream.feed(xTest[i:i + 7], yTest[i:i + 7]) for i in range(0, len(xTest), 7)]
+        for ax in [0, 1]:
+            assert np.array_equal(np.concatenate([v[ax] for v in violations]),
+                                  expected.violations[ax])
+        with open(errors_file) as f1, open(os.path.join(tmp_dir, 'errors.csv')) as f2:
+            assert f1.read() == f2.read()
+    finally:
+        shutil.rmtree(tmp_dir)
+    assert stream.summary == funnel.validate(xTest, yTest, summary_only=True)
+    try:
+        stream.feed(xTest[:2], yTest[:2])
+    except RuntimeError as e:
+        assert "must increase" in str(e)
+    else:
+        raise AssertionError("Decreasing x values must raise RuntimeError.")
+    # The x range is checked with the same tolerance as validate.
+    xTest = np.array(xTest)
+    xTest[-1] = xRef.iloc[-1] + 1e-12
+    stream = funnel.stream()
+    stream.feed(xTest, yTest)
+    assert stream.summary == funnel.validate(xTest, yTest, summary_only=True)
+
+
+def test_files(test_dir):
+    """Comparing CSV files chunk by chunk must yield the same files as compareAndReport."""
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        retVal = pyfunnel.compareFiles(os.path.join(test_dir, 'trended.csv'),
+                                       os.path.join(test_dir, 'simulated.csv'),
+                                       tmp_dir, chunk_size=7, **TOL)
+        assert retVal == 0
+        for f in ['reference.csv', 'test.csv', 'errors.csv', 'lowerBound.csv', 'upperBound.csv']:
+            with open(os.path.join(tmp_dir, f)) as f1, open(os.path.join(test_dir, 'results', f)) as f2:
+                assert f1.read() == f2.read(), "File {} differs.".format(f)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_files_random():
+    """Comparing random CSV files must yield the files of compareAndReport for any chunk size."""
+    rng = np.random.RandomState(1)
+    tolerances = [
+        dict(atolx=10, atoly=1e-3, ltolx=0.01, ltoly=1, rtoly=1e-3),  # wide funnel
+        dict(atolx=10, atoly=0.01),
+        dict(atolx=0.5, atoly=0.01, ltolx=0.01, rtolx=0.02, rtoly=0.05),
+        dict(ltoly=1),
+    ]
+    files = ['reference.csv', 'test.csv', 'errors.csv', 'lowerBound.csv', 'upperBound.csv']
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        for it in range(24):
+            n = rng.randint(2, 400)
+            # Duplicate x values, and reference x values out of order for one case out of three
+            x = np.round(np.linspace(0, 100, n) + (it % 3 == 0) * rng.rand(n) * 2, 1)
+            x[0], x[-1] = 0, 102
+            y = [np.sign(np.sin(x / rng.uniform(1, 10))), rng.randn(n).cumsum()][it % 2]
+            xTest = np.sort(np.concatenate([[0, 102], rng.rand(rng.randint(0, 400)) * 102]))
+            yTest = np.interp(xTest, x, y) + rng.randn(len(xTest)) * 0.1
+            tol = tolerances[it % len(tolerances)]
+            for f, xf, yf in [('ref.csv', x, y), ('test.csv', xTest, yTest)]:
+                np.savetxt(os.path.join(tmp_dir, f), np.c_[xf, yf], fmt='%.17g',
+                           delimiter=',', header='x,y', comments='')
+            expected = pyfunnel.compareAndReport(
+                x, y, xTest, yTest, outputDirectory=os.path.join(tmp_dir, 'expected'), **tol)
+            for chunk_size in [1, 2, 3, 5, 17, 1000]:
+                retVal = pyfunnel.compareFiles(
+                    os.path.join(tmp_dir, 'ref.csv'), os.path.join(tmp_dir, 'test.csv'),
+                    os.path.join(tmp_dir, 'files'), chunk_size=chunk_size, **tol)
+                assert retVal == expected == 0
+                for f in files:
+                    with open(os.path.join(tmp_dir, 'files', f)) as f1, \
+                            open(os.path.join(tmp_dir, 'expected', f)) as f2:
+                        assert f1.read() == f2.read(),\
+                            "File {} differs with chunk size {} and {}.".format(f, chunk_size, tol)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_range(test_dir):
+    """Validating an x range must yield the errors of the test values in this range."""
+    xRef, yRef, xTest, yTest = read_data(test_dir)
+    funnel = pyfunnel.Funnel(xRef, yRef, **TOL)
+    expected = funnel.validate(xTest, yTest + 0.01)
+    x_min, x_max = xTest.iloc[len(xTest) // 3], xTest.iloc[len(xTest) // 2] + 1e-3
+    in_range = (xTest >= x_min).values & (xTest <= x_max).values
+    res = funnel.validate(xTest, yTest + 0.01, x_min=x_min, x_max=x_max)
+    assert np.array_equal(res.test.x, xTest[in_range])
+    for ax in [0, 1]:
+        assert np.array_equal(res.errors[ax], expected.errors[ax][in_range])
+    # The output arrays are sized to the test values in range.
+    assert len(res.errors.x.base) == np.count_nonzero(in_range)
+    summary = funnel.validate(xTest, yTest + 0.01, summary_only=True, x_min=x_min, x_max=x_max)
+    assert summary['violations'] == np.count_nonzero(expected.errors.y[in_range])
+    # The test values do not need to span the x range of the reference.
+    res = funnel.validate(xTest[in_range], yTest[in_range] + 0.01, x_min=x_min)
+    assert np.array_equal(res.errors.y, expected.errors.y[in_range])
+    try:
+        funnel.validate(xTest, yTest, x_max=xRef.iloc[-1] + 1)
+    except RuntimeError as e:
+        assert "within the x range" in str(e)
+    else:
+        raise AssertionError("Range out of the reference x range must raise RuntimeError.")
+
+
+def test_zone_map():
+    """Validating with the block index of the funnel must yield the same errors as without."""
+    x = np.linspace(0, 100, 5001)
+    y = np.sin(x)
+    funnel = pyfunnel.Funnel(x, y, atolx=0.05, atoly=0.1)
+    assert funnel._tube.zones.n > 0
+    yTest = y + 0.12 * np.sin(7 * x)  # mostly inside, with some values outside
+    expected = funnel.validate(x, yTest)
+    summary = funnel.validate(x, yTest, summary_only=True)
+    n = funnel._tube.zones.n
+    funnel._tube.zones.n = 0  # validation without the block index
+    try:
+        res = funnel.validate(x, yTest)
+        assert np.array_equal(res.errors.y, expected.errors.y)
+        assert funnel.validate(x, yTest, summary_only=True) == summary
+    finally:
+        funnel._tube.zones.n = n
+    assert 0 < summary['violations'] < len(x)
+
+
+def test_bounds(test_dir):
+    """Bounds queried in any order must match the bounds used by validate."""
+    xRef, yRef, xTest, yTest = read_data(test_dir)
+    funnel = pyfunnel.Funnel(xRef, yRef, **TOL)
+    yTest = yTest + 0.01
+    errors = funnel.validate(xTest, yTest).errors
+    rng = np.random.RandomState(0)
+    order = rng.permutation(len(xTest))
+    assert np.array_equal(funnel.contains(xTest.values[order], yTest.values[order]),
+                          errors.y[order] == 0)
+    # Binary search for small batches, sort and merge for large batches.
+    xQuery = np.linspace(xRef.iloc[0], xRef.iloc[-1], 5000)
+    expected = funnel.bounds(xQuery)
+    for size in [100, len(xQuery)]:
+        order = rng.permutation(len(xQuery))[:size]
+        for ax, bound in enumerate(funnel.bounds(xQuery[order])):
+            assert np.array_equal(bound, expected[ax][order])
+    try:
+        funnel.bounds([xRef.iloc[-1] + 1])
+    except RuntimeError as e:
+        assert "within the x range" in str(e)
+    else:
+        raise AssertionError("Query out of the reference x range must raise RuntimeError.")
+
+
+def test_min_tolerance():
+    """The smallest passing tolerance must pass and a slightly smaller value must fail."""
+    x = np.linspace(0, 10, 1001)
+    y = np.sin(x)
+    yTest = np.sin(x - 0.05)
+    for axis, kind, tol in [('y', 'atol', {}), ('y', 'rtol', {}), ('x', 'atol', dict(atoly=1e-3))]:
+        value = pyfunnel.find_min_tolerance(x, y, x, yTest, axis=axis, kind=kind, **tol)
+        tol[kind + axis] = value
+        assert pyfunnel.compare(x, y, x, yTest, **tol).violations.x.size == 0
+        tol[kind + axis] = value * (1 - 2e-6)
+        assert pyfunnel.compare(x, y, x, yTest, **tol).violations.x.size > 0
+    assert pyfunnel.find_min_tolerance(x, y, x, y) == 0
+    try:
+        pyfunnel.find_min_tolerance(x, y, x, y + 5, axis='x')
+    except RuntimeError as e:
+        assert "No tolerance value found" in str(e)
+    else:
+        raise AssertionError("Test values out of any funnel must raise RuntimeError.")
+
+
+def test_bands(test_dir):
+    """Grading with several bands must match the validation against each band."""
+    xRef, yRef, xTest, yTest = read_data(test_dir)
+    yTest = yTest + 0.01
+    bands = [dict(atolx=0.002, atoly=0.002), dict(atolx=0.002, atoly=0.01), dict(atoly=0.05)]
+    band, summaries = pyfunnel.compareBands(xRef, yRef, xTest, yTest, bands)
+    expected = np.full(len(xTest), len(bands))
+    for i in reversed(range(len(bands))):
+        funnel = pyfunnel.Funnel(xRef, yRef, **bands[i])
+        expected[funnel.validate(xTest, yTest).errors.y == 0] = i
+        assert summaries[i] == funnel.validate(xTest, yTest, summary_only=True)
+    assert np.array_equal(band, expected)
+    assert len(set(band)) > 1
+
+
+def test_profile(test_dir):
+    """Funnels built with a reference profile must match funnels built from scratch."""
+    xRef, yRef = read_data(test_dir)[:2]
+    x = np.linspace(0, 10, 2001)
+    y = np.round(np.sin(x) * np.cos(3 * x), 2)  # Identical points and flat segments.
+    for xr, yr in [(xRef, yRef), (x, y)]:
+        profile = pyfunnel.ReferenceProfile(xr, yr)
+        for tol in [TOL, dict(atoly=0.05), dict(ltolx=0.01, rtoly=0.1), dict(atolx=0.2, atoly=0.3)]:
+            funnel = pyfunnel.Funnel(xr, yr, **tol)
+            for f in [pyfunnel.Funnel(xr, yr, profile=profile, **tol), profile.funnel(**tol)]:
+                for attr in ['lower', 'upper']:
+                    assert np.array_equal(getattr(f, attr), getattr(funnel, attr))
+    assert pyfunnel.ReferenceProfile(x, y).hash == profile.hash
+    try:
+        pyfunnel.Funnel(x, y + 1e-9, profile=profile, **TOL)
+    except RuntimeError as e:
+        assert "do not match the reference profile" in str(e)
+    else:
+        raise AssertionError("Other reference values must raise RuntimeError.")
+
+
+def test_decimation():
+    """Bounds built around decimated reference values must stay within the given fraction."""
+    x = np.linspace(0, 100, 10001)
+    # Piecewise constant setpoints on top of a piecewise linear trend.
+    y = np.repeat([0., 1., 0.5, 2.], 2501)[:x.size] + np.interp(x, [0, 50, 100], [0, 0.3, 0])
+    grid = np.linspace(0, 100, 100001)
+    for tol, fraction in [(dict(atolx=0.5, atoly=0.05), 0.01), (dict(atoly=0.1, rtoly=0.1), 0.1)]:
+        funnel = pyfunnel.Funnel(x, y, **tol)
+        decimated = pyfunnel.Funnel(x, y, decimation=fraction, **tol)
+        assert funnel.decimation is None
+        assert decimated.decimation['reference_points'] == x.size
+        assert decimated.decimation['reduction'] > 0.99
+        height = max(tol.get('atoly', 0), tol.get('rtoly', 0) * np.ptp(y))
+        for attr in ['lower', 'upper']:
+            c0, c1 = getattr(funnel, attr), getattr(decimated, attr)
+            diff = np.interp(grid, c0.x, c0.y) - np.interp(grid, c1.x, c1.y)
+            assert np.max(np.abs(diff)) <= fraction * height * (1 + 1e-9)
+    assert pyfunnel.Funnel(x, np.sin(x), decimation=0, **TOL).decimation['reduction'] == 0
+    try:
+        pyfunnel.Funnel(x, y, decimation=-1, **TOL)
+    except RuntimeError as e:
+        assert "fraction must be positive" in str(e)
+    else:
+        raise AssertionError("Negative decimation fraction must raise RuntimeError.")
+
+
+def test_simplify():
+    """Removing the collinear points of the bounds must not change the interpolated bounds."""
+    # Linear segments: the bounds have a corner near each reference point before simplification.
+    x = np.arange(0, 10001.)
+    y = np.interp(x, [0, 3000, 6000, 10000], [0, 30, 30, -10])
+    res = pyfunnel.compare(x, y, x, y + 0.05, atolx=1, atoly=0.1)
+    funnel = pyfunnel.Funnel(x, y, atolx=1, atoly=0.1)
+    xQuery = np.linspace(0, 10000, 20001)
+    for ax, attr in enumerate(['lower', 'upper']):
+        curve = getattr(res, attr)
+        assert len(curve.x) < 10
+        assert np.array_equal(curve.x, getattr(funnel, attr).x)
+        assert np.allclose(np.interp(xQuery, curve.x, curve.y), funnel.bounds(xQuery)[ax],
+                           rtol=0, atol=1e-14 * np.abs(y).max())
+    assert np.array_equal(res.errors.y, funnel.validate(x, y + 0.05).errors.y)
+
+
+def test_editable():
+    """Updating a funnel must yield the same bounds as a new funnel."""
+    # The magnitude of x is set by the first value and is not changed by the updates.
+    x = np.linspace(-100, 0, 2001)
+    y = np.sin(x * 3) + 0.2 * np.sin(x * 17)
+    tol = dict(atolx=0.05, atoly=0.1)
+    funnel = pyfunnel.EditableFunnel(x[:1500], y[:1500], **tol)
+    funnel.update(x[1500:1800], y[1500:1800])
+    funnel.update(x[1800:], y[1800:])
+    y[700:720] += 1
+    funnel.replace_range(700, 720, x[700:720], y[700:720])
+    funnel.replace_range(1000, 1010, [], [])
+    x, y = np.delete(x, range(1000, 1010)), np.delete(y, range(1000, 1010))
+    expected = pyfunnel.Funnel(x, y, **tol)
+    for attr in ['reference', 'lower', 'upper']:
+        for ax in [0, 1]:
+            assert np.array_equal(getattr(funnel, attr)[ax], getattr(expected, attr)[ax])
+    assert funnel.validate(x, y, summary_only=True)['passed']
+    # With a funnel height set by ltoly, an update may change the bounds far from the new values.
+    xLocal = np.linspace(0, 100, 400)
+    yLocal = np.random.RandomState(0).randint(0, 5, 400).astype(float)
+    tol = dict(atolx=0.5, atoly=1e-3, ltoly=1)
+    local = pyfunnel.EditableFunnel(xLocal[:150], yLocal[:150], **tol)
+    for i in range(150, 400, 50):
+        local.update(xLocal[i:i + 50], yLocal[i:i + 50])
+    expected = pyfunnel.Funnel(xLocal, yLocal, **tol)
+    for attr in ['lower', 'upper']:
+        for ax in [0, 1]:
+            assert np.array_equal(getattr(local, attr)[ax], getattr(expected, attr)[ax])
+    try:
+        funnel.update([-1], [0])
+    except RuntimeError as e:
+        assert "must be increasing" in str(e)
+    else:
+        raise AssertionError("Decreasing x values must raise RuntimeError.")
+
+
+def test_fail_fast():
+    """Validation must stop at the k-th violation, with the tube built lazily."""
+    x = np.linspace(0, 1000, 50001)
+    y = np.sin(x * 7) + 0.3 * np.sin(x * 31)
+    xTest = np.linspace(0, 1000, 30001)
+    yTest = np.sin(xTest * 7) + 0.3 * np.sin(xTest * 31) + 0.3 * (xTest > 600)
+    tol = dict(atolx=0.05, atoly=0.2)
+    full = pyfunnel.compare(x, y, xTest, yTest, **tol)
+    first = full.violations.x[0]
+    # Lazy building must yield the same results as the full tube.
+    expected = pyfunnel.compareAndReport(x, y, xTest, yTest, summary_only=True, **tol)
+    lazy = pyfunnel.compareAndReport(x, y, xTest, yTest, max_violations=len(xTest), **tol)
+    assert lazy == expected and lazy['complete']
+    for k in (1, 10):
+        for summary in (
+            pyfunnel.compareAndReport(x, y, xTest, yTest, max_violations=k, **tol),
+            pyfunnel.Funnel(x, y, **tol).validate(xTest, yTest, max_violations=k),
+        ):
+            assert summary['violations'] == k and not summary['complete']
+            assert summary['first_violation_x'] == first
+    summary = pyfunnel.compareAndReport(x, y, x, y, max_violations=1, **tol)
+    assert summary['passed'] and summary['complete'] and summary['first_violation_x'] is None
+
+
+def test_oscillating():
+    """Loops of the tube curves must be removed for a reference with many local extrema."""
+    x = np.linspace(0, 1000, 20000)
+    y = np.sin(x * 7) + 0.3 * np.sin(x * 31)
+    res = pyfunnel.compare(x, y, x, y, atolx=0.5, atoly=0.2)
+    for curve in (res.lower, res.upper):
+        assert np.all(np.diff(curve.x) > 0), "Tube curve x values must be increasing."
+    assert not np.any(res.errors.y)
+
+
+def test_scale():
+    """Series beyond 2^31 points must be indexed without overflow.
+
+    The test needs about 16 GB of disk space for the memory-mapped x values: it is only
+    run if the environment variable FUNNEL_SCALE_POINTS is set to the number of points
+    (for instance 2200000000).
+    """
+    n = int(os.environ.get('FUNNEL_SCALE_POINTS', 0))
+    if n == 0:
+        return
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        x = np.memmap(os.path.join(tmp_dir, 'x.bin'), dtype=np.float64, mode='w+', shape=(n,))
+        chunk = 1 << 24
+        for start in range(0, n, chunk):
+            stop = min(start + chunk, n)
+            x[start:stop] = np.arange(start, stop, dtype=np.float64)
+        # Files of zeros are sparse: only x uses disk space.
+        y = np.memmap(os.path.join(tmp_dir, 'y.bin'), dtype=np.float64, mode='w+', shape=(n,))
+        yTest = np.memmap(os.path.join(tmp_dir, 'yTest.bin'), dtype=np.float64, mode='w+',
+                          shape=(n,))
+        if n > 2**31 + 7:
+            outside = np.array([2**31 - 1, 2**31, 2**31 + 7, n - 2])
+        else:
+            outside = np.array([n - 1000, n - 500, n - 2])
+        yTest[outside] = 1
+        summary = pyfunnel.compareAndReport(x, y, x, yTest, atoly=0.5, max_violations=n)
+        assert summary['complete'] and summary['violations'] == len(outside)
+        assert summary['first_violation_x'] == outside[0]
+        del x, y, yTest
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_soak():
+    """Repeated calls must not grow the memory of the process (temporary arrays released)."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return
+    # Maximum resident set size in kB on Linux, in bytes on macOS.
+    scale = 1024 if sys.platform == 'darwin' else 1
+    x = np.linspace(0, 10, 51)
+    y = np.sin(x)
+    yTest = y + 0.05 * (x > 5)
+    tols = [dict(atolx=0.01, atoly=0.02), dict(atolx=0.01, ltoly=0.02)]
+    rss = []
+    for i in range(100000):
+        tol = tols[i % 2]
+        if i % 4 < 2:
+            pyfunnel.compare(x, y, x, yTest, **tol)
+        else:
+            pyfunnel.compareAndReport(x, y, x, yTest, max_violations=1, **tol)
+        stats = pyfunnel.allocation_stats()
+        assert stats['peak_bytes'] > 0 and stats['allocations'] > 0
+        if i in (9999, 99999):
+            rss.append(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // scale)
+    assert rss[1] - rss[0] < 1024, "Memory grew by {} kB.".format(rss[1] - rss[0])
+
+
+def test_threads(test_dir):
+    """Concurrent calls must yield the same results as serial calls."""
+    try:
+        from concurrent.futures import ThreadPoolExecutor
+    except ImportError:  # Python 2 without the futures backport
+        print("Skipping test_threads: concurrent.futures is not available.")
+        return
+    data = read_data(test_dir)
+    cases = [dict(atolx=a, atoly=a) for a in (0.001, 0.002, 0.005, 0.01)] * 4
+    expected = [pyfunnel.compare(*data, **tol) for tol in cases]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda tol: pyfunnel.compare(*data, **tol), cases))
+    for res, exp in zip(results, expected):
+        for attr in ['lower', 'upper', 'errors', 'violations']:
+            for ax in [0, 1]:
+                assert np.array_equal(getattr(res, attr)[ax], getattr(exp, attr)[ax])
+    # Error messages are reported per call.
+    try:
+        pyfunnel.compare([0, 1], [0, 1], [0, 2], [0, 1])
+    except RuntimeError as e:
+        assert "maximum x values are different" in str(e)
+    else:
+        raise AssertionError("Different x ranges must raise RuntimeError.")
+
+
+if __name__ == "__main__":
+    test_dir = sys.argv[1]
+    test_in_memory(test_dir)
+    test_write(test_dir)
+    test_lifetime(test_dir)
+    test_input_conversion()
+    test_engine(test_dir)
+    test_funnel(test_dir)
+    test_summary(test_dir)
+    test_stream(test_dir)
+    test_files(test_dir)
+    test_files_random()
+    test_range(test_dir)
+    test_zone_map()
+    test_bounds(test_dir)
+    test_min_tolerance()
+    test_bands(test_dir)
+    test_profile(test_dir)
+    test_decimation()
+    test_simplify()
+    test_editable()
+    test_fail_fast()
+    test_oscillating()
+    test_scale()
+    test_soak()
+    test_threads(test_dir)